@@ -0,0 +1,141 @@
+"""
+Throughput of the sync and async fulfillment handlers
+
+SQS batches of orders go through lambda_handler, sequentially and on its
+thread pool, and through async_lambda_handler. DynamoDB and SQS are local
+stand-ins that sleep for --latency-ms per call, so the numbers reflect how
+well each path overlaps I/O rather than moto's own overhead. Saga
+checkpoints and status writes all go through the DynamoDB stand-in.
+
+Usage:
+    python benchmarks/async_fulfillment.py [--batches 20] [--batch-size 10]
+        [--latency-ms 5] [--concurrency 10] [--output results.json]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT, 'src', 'lambda')
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+class StandInClient:
+    """Low-level client stand-in that takes latency seconds per call and counts calls"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self, response):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+        return response
+
+    def update_item(self, **kwargs):
+        return self._call({})
+
+    def get_item(self, **kwargs):
+        return self._call({})
+
+    def send_message(self, **kwargs):
+        return self._call({'MessageId': str(uuid.uuid4())})
+
+def load_fulfillment():
+    os.environ.update(
+        AWS_DEFAULT_REGION='us-east-1', ORDERS_TABLE='bench-orders',
+        DLQ_URL='https://sqs.us-east-1.amazonaws.com/123456789012/bench-dlq',
+        METRICS_ENABLED='false', LOG_LEVEL='WARNING'
+    )
+    path = os.path.join(LAMBDA_DIR, 'order-fulfillment')
+    sys.path[:0] = [path, os.path.join(LAMBDA_DIR, 'shared')]
+    spec = importlib.util.spec_from_file_location('order_fulfillment', os.path.join(path, 'lambda_function.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['order_fulfillment'] = module
+    spec.loader.exec_module(module)
+    return module
+
+def make_batches(count, size):
+    batches = []
+    for b in range(count):
+        records = []
+        for n in range(size):
+            order = {
+                'order_id': f'ORDER{b:04d}{n:03d}',
+                'customer_id': 'CUST001',
+                'items': [{'product_id': f'PROD{n % 5}', 'quantity': 1, 'price': '9.99', 'total': '9.99'}],
+                'total_amount': '9.99'
+            }
+            records.append({'messageId': f'msg-{b}-{n}', 'body': json.dumps(order)})
+        batches.append({'Records': records})
+    return batches
+
+def run(handler, batches, clients):
+    for client in clients:
+        client.calls = 0
+    latencies = []
+    failures = 0
+    started = time.perf_counter()
+    for event in batches:
+        invocation_started = time.perf_counter()
+        failures += len(handler(event, None)['batchItemFailures'])
+        latencies.append((time.perf_counter() - invocation_started) * 1000)
+    elapsed = time.perf_counter() - started
+    orders = sum(len(event['Records']) for event in batches)
+    return {
+        'orders_per_s': orders / elapsed,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'retried': failures,
+        'calls': sum(client.calls for client in clients)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batches', type=int, default=20, help='SQS batches per handler')
+    parser.add_argument('--batch-size', type=int, default=10, help='orders per batch')
+    parser.add_argument('--latency-ms', type=float, default=5, help='latency of every stand-in call')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='FULFILLMENT_MAX_WORKERS of the threaded run and ASYNC_MAX_CONCURRENCY of the async one')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    fulfillment = load_fulfillment()
+    import aws_clients
+    dynamodb = StandInClient(args.latency_ms / 1000)
+    sqs = StandInClient(args.latency_ms / 1000)
+    aws_clients._clients.update(dynamodb=dynamodb, sqs=sqs)
+
+    batches = make_batches(args.batches, args.batch_size)
+    modes = (
+        ('sync', fulfillment.lambda_handler, {'MAX_WORKERS': 1}),
+        ('sync-threads', fulfillment.lambda_handler, {'MAX_WORKERS': args.concurrency}),
+        ('async', fulfillment.async_lambda_handler, {'ASYNC_MAX_CONCURRENCY': args.concurrency})
+    )
+    results = {'config': {k: v for k, v in vars(args).items() if k != 'output'}}
+    for name, handler, settings in modes:
+        for attribute, value in settings.items():
+            setattr(fulfillment, attribute, value)
+        # Distinct order IDs per mode so saga checkpoints never carry over
+        results[name] = run(handler, [
+            {'Records': [dict(record, body=record['body'].replace('ORDER', f'{name.upper()}-')) for record in event['Records']]}
+            for event in batches
+        ], (dynamodb, sqs))
+        print(f"{name:13s} {results[name]['orders_per_s']:8.1f} orders/s  p50 {results[name]['p50_ms']:8.2f} ms"
+              f"  p95 {results[name]['p95_ms']:8.2f} ms  calls {results[name]['calls']}  retried {results[name]['retried']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
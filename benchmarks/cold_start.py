@@ -0,0 +1,130 @@
+"""
+Measures lambda cold start: module import and first request time
+
+Each sample runs in a fresh interpreter. botocore's HTTP layer is loaded
+and stubbed before the timer starts, so boto3, the resource layer and the
+lambda's own imports and client setup are what gets measured.
+
+Usage:
+    python benchmarks/cold_start.py [--ref baseline] [--runs 10]
+
+With --ref, the same measurement is taken for src/lambda at that git ref
+so the two can be compared.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import io
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_ORDER = {
+    'customer_id': 'CUST123',
+    'items': [{'product_id': 'PROD001', 'quantity': 2, 'price': 29.99}],
+    'total_amount': 59.98
+}
+
+# Runs inside the child interpreter; prints import and first request times in ms.
+# HTTP is answered in-process with an empty JSON body, so the measurement covers
+# imports, client construction and request serialization but not the network.
+CHILD = r'''
+import json, os, sys, time
+os.environ.update(AWS_DEFAULT_REGION='us-east-1', AWS_ACCESS_KEY_ID='bench', AWS_SECRET_ACCESS_KEY='bench')
+os.environ.update(ORDERS_TABLE='bench-orders', ORDER_QUEUE_URL='https://sqs.us-east-1.amazonaws.com/123456789012/bench-queue',
+                  DLQ_URL='https://sqs.us-east-1.amazonaws.com/123456789012/bench-dlq')
+import botocore.httpsession
+from botocore.awsrequest import AWSResponse
+
+class EmptyBody:
+    def stream(self, **kwargs):
+        return [b'{}']
+
+def send(self, request):
+    return AWSResponse(request.url, 200, {'Content-Type': 'application/x-amz-json-1.0'}, EmptyBody())
+
+botocore.httpsession.URLLib3Session.send = send
+
+lambda_dir, shared_dir, event = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+start = time.perf_counter()
+sys.path[:0] = [lambda_dir, shared_dir]
+import lambda_function
+imported = time.perf_counter()
+lambda_function.lambda_handler(event, None)
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_request_ms': (done - imported) * 1000}))
+'''
+
+def measure(src_dir, runs):
+    """
+    Measures both lambdas under src_dir
+
+    Args:
+        src_dir: Directory holding the lambda folders (src/lambda)
+        runs: Number of fresh interpreters per lambda
+
+    Returns:
+        Dict of per-lambda median timings
+    """
+    events = {
+        'order-validator': {'order': SAMPLE_ORDER},
+        'order-fulfillment': {'order': dict(SAMPLE_ORDER, order_id='ORDER123', total_amount='59.98')}
+    }
+    results = {}
+    for name, event in events.items():
+        samples = []
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, '-c', CHILD, os.path.join(src_dir, name),
+                 os.path.join(src_dir, 'shared'), json.dumps(event)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+        import_ms = statistics.median(s['import_ms'] for s in samples)
+        request_ms = statistics.median(s['first_request_ms'] for s in samples)
+        results[name] = {
+            'import_ms': round(import_ms, 2),
+            'first_request_ms': round(request_ms, 2),
+            'total_ms': round(import_ms + request_ms, 2)
+        }
+    return results
+
+def checkout(ref, target):
+    """
+    Extracts src/lambda at a git ref
+
+    Returns:
+        Path of the extracted src/lambda directory
+    """
+    archive = subprocess.run(['git', 'archive', ref, 'src/lambda'], cwd=ROOT, check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return os.path.join(target, 'src', 'lambda')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ref', help='git ref to compare against')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    report = {'current': measure(os.path.join(ROOT, 'src', 'lambda'), args.runs)}
+    if args.ref:
+        with tempfile.TemporaryDirectory() as tmp:
+            report[args.ref] = measure(checkout(args.ref, tmp), args.runs)
+
+    for label, results in report.items():
+        for name, timing in results.items():
+            print(f"{label:>12} {name:<18} import {timing['import_ms']:8.2f} ms  "
+                  f"first request {timing['first_request_ms']:8.2f} ms  total {timing['total_ms']:8.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Contention benchmark for inventory reservations on hot SKUs
+
+Worker threads reserve and then commit or release orders whose products
+are mostly drawn from a few hot SKUs, against the in-memory backend or
+the DynamoDB backend on moto. Reports reservation throughput and latency,
+how many reservations were refused for lack of stock, transaction
+retries, and checks that no stock was oversold.
+
+moto is not thread-safe, so its calls are serialized, and it never
+reports transaction conflicts; against moto the numbers show client-side
+cost and correctness rather than DynamoDB's behaviour under contention.
+With --shards the hot SKUs are split into shard items before the run, to
+compare the cost of sharded reservations and check they stay exact.
+
+Usage:
+    python benchmarks/inventory_contention.py [--backend memory|dynamodb]
+        [--workers 8] [--orders 2000] [--hot-skus 3] [--stock 1000]
+        [--shards 0] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src', 'lambda', 'order-fulfillment'), os.path.join(ROOT, 'src', 'lambda', 'shared')]
+
+from inventory import DynamoDBInventoryBackend, InMemoryInventoryBackend
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+class SerializedClient:
+    """Makes one call at a time through a client, as moto requires"""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return method(*args, **kwargs)
+
+        return call
+
+def create_tables(stock):
+    import boto3
+    client = boto3.client('dynamodb')
+    client.create_table(
+        TableName='bench-inventory',
+        KeySchema=[{'AttributeName': 'product_id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'product_id', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    client.create_table(
+        TableName='bench-reservations',
+        KeySchema=[{'AttributeName': 'order_id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'order_id', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    for product_id, available in stock.items():
+        client.put_item(TableName='bench-inventory',
+                        Item={'product_id': {'S': product_id}, 'available': {'N': str(available)}})
+
+def run(args, backend, stock):
+    rng = random.Random(args.seed)
+    hot = [f'HOT{n}' for n in range(args.hot_skus)]
+    cold = [f'COLD{n:03d}' for n in range(100)]
+    orders = []
+    for n in range(args.orders):
+        products = [rng.choice(hot) if rng.random() < args.hot_share else rng.choice(cold) for _ in range(rng.randint(1, 4))]
+        quantities = {}
+        for product_id in products:
+            quantities[product_id] = quantities.get(product_id, 0) + rng.randint(1, 2)
+        orders.append((f'ORDER{n:06d}', quantities, rng.random() < args.release_share))
+
+    latencies = []
+    outcomes = {'reserved': 0, 'refused': 0, 'committed': 0, 'released': 0}
+    committed = {}
+    lock = threading.Lock()
+
+    def fulfill(order):
+        order_id, quantities, release = order
+        started = time.perf_counter()
+        result = backend.reserve(order_id, quantities, int(time.time()) + 900)
+        elapsed = (time.perf_counter() - started) * 1000
+        if result['success']:
+            if release:
+                backend.release(order_id)
+            else:
+                backend.commit(order_id)
+        with lock:
+            latencies.append(elapsed)
+            if not result['success']:
+                outcomes['refused'] += 1
+                return
+            outcomes['reserved'] += 1
+            outcomes['released' if release else 'committed'] += 1
+            if not release:
+                for product_id, quantity in quantities.items():
+                    committed[product_id] = committed.get(product_id, 0) + quantity
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(fulfill, orders))
+    elapsed = time.perf_counter() - started
+
+    remaining = backend.get_stock(list(stock))
+    # Whatever was not committed must be back in stock, and nothing may go below zero
+    mismatches = {
+        product_id: {'expected': available - committed.get(product_id, 0), 'actual': remaining[product_id]}
+        for product_id, available in stock.items()
+        if remaining[product_id] < 0 or remaining[product_id] != available - committed.get(product_id, 0)
+    }
+    return {
+        'config': {k: v for k, v in vars(args).items() if k != 'output'},
+        'reservations_per_s': len(orders) / elapsed,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'outcomes': outcomes,
+        'retries': getattr(backend, 'conflicts', 0),
+        'stock_mismatches': mismatches
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=('memory', 'dynamodb'), default='memory')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent reserving threads')
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--hot-skus', type=int, default=3, help='number of hot products')
+    parser.add_argument('--hot-share', type=float, default=0.8, help='fraction of lines on hot products')
+    parser.add_argument('--release-share', type=float, default=0.1, help='fraction of orders released instead of committed')
+    parser.add_argument('--stock', type=int, default=1000, help='initial stock per product')
+    parser.add_argument('--shards', type=int, default=0, help='shard hot products into this many items (dynamodb only)')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    stock = {f'HOT{n}': args.stock for n in range(args.hot_skus)}
+    stock.update({f'COLD{n:03d}': args.stock for n in range(100)})
+
+    if args.backend == 'memory':
+        results = run(args, InMemoryInventoryBackend(stock), stock)
+    else:
+        os.environ.update(AWS_DEFAULT_REGION='us-east-1', AWS_ACCESS_KEY_ID='bench', AWS_SECRET_ACCESS_KEY='bench')
+        from moto import mock_dynamodb
+        import aws_clients
+        from aws_clients import DynamoDB
+        with mock_dynamodb():
+            create_tables(stock)
+            aws_clients._clients['dynamodb'] = SerializedClient(aws_clients.get_client('dynamodb'))
+            backend = DynamoDBInventoryBackend(DynamoDB(), 'bench-inventory', 'bench-reservations')
+            if args.shards:
+                for n in range(args.hot_skus):
+                    backend.shard_product(f'HOT{n}', args.shards)
+            results = run(args, backend, stock)
+
+    print(f"{args.backend}: {results['reservations_per_s']:.1f} reservations/s  p50 {results['p50_ms']:.3f} ms"
+          f"  p95 {results['p95_ms']:.3f} ms  p99 {results['p99_ms']:.3f} ms")
+    print('outcomes ' + '  '.join(f"{k} {v}" for k, v in results['outcomes'].items())
+          + f"  retries {results['retries']}")
+    print('stock mismatches: ' + (json.dumps(results['stock_mismatches']) if results['stock_mismatches'] else 'none'))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""
+End-to-end load test of the validator -> SQS -> fulfillment pipeline
+
+Both lambdas run in-process against moto's DynamoDB and SQS. A synthetic
+order stream is sent through the validator, the order queue is drained in
+SQS batches into the fulfillment handler, and messages are deleted unless
+reported as batch item failures, as the Lambda event source mapping does.
+Records carry their message attributes in Lambda's event shape, so binary
+and thin order messages are read as in production. With
+INVENTORY_BACKEND=dynamodb the inventory and reservations tables are
+created and every catalog product is stocked.
+
+Reports throughput, p50/p95/p99 invocation latency and DynamoDB and SQS
+calls per operation for each stage, latency per fulfillment step from
+the step metrics, plus order outcomes. Messages that
+fulfillment reports for retry stay invisible and are counted, not
+redelivered.
+
+Usage:
+    python benchmarks/load_test.py [--orders 500] [--items uniform:1:10]
+        [--validator-batch 0] [--sqs-batch-size 10] [--seed 7]
+        [--env FULFILLMENT_MAX_WORKERS=4] [--output results.json]
+        [--baseline previous.json] [--tolerance 0.2]
+
+Item count distributions: fixed:N, uniform:LOW:HIGH, lognormal:MU:SIGMA
+(capped at --max-items). Products are drawn from a catalog of --skus
+products with Zipf popularity of exponent --skew.
+
+With --baseline, per-stage p95 latency, throughput and call counts are
+compared with an earlier results file and the script exits non-zero if
+any is worse by more than --tolerance.
+"""
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT, 'src', 'lambda')
+
+def load_lambda(name, directory):
+    """Imports a lambda_function.py under its own name, with its directory importable"""
+    path = os.path.join(LAMBDA_DIR, directory)
+    sys.path.insert(0, path)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(path, 'lambda_function.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def item_counts(spec, max_items, rng):
+    """Yields item counts following a fixed, uniform or lognormal distribution"""
+    kind, *params = spec.split(':')
+    if kind == 'fixed':
+        draw = lambda: int(params[0])
+    elif kind == 'uniform':
+        draw = lambda: rng.randint(int(params[0]), int(params[1]))
+    elif kind == 'lognormal':
+        draw = lambda: int(round(rng.lognormvariate(float(params[0]), float(params[1]))))
+    else:
+        raise ValueError(f"Unknown item distribution: {spec}")
+    while True:
+        yield min(max(draw(), 1), max_items)
+
+def make_orders(count, spec, max_items, skus, skew, rng):
+    """Builds orders whose products follow a Zipf distribution over the catalog"""
+    counts = item_counts(spec, max_items, rng)
+    catalog = [f'PROD{n:05d}' for n in range(skus)]
+    weights = list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(skus)))
+    orders = []
+    for i in range(count):
+        items = [
+            {'product_id': product_id, 'quantity': rng.randint(1, 3), 'price': round(rng.uniform(1, 50), 2)}
+            for product_id in rng.choices(catalog, cum_weights=weights, k=next(counts))
+        ]
+        orders.append({
+            'customer_id': f'CUST{i % 100:03d}',
+            'items': items,
+            'total_amount': round(sum(item['quantity'] * item['price'] for item in items), 2)
+        })
+    return orders
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def summarize(latencies_ms, units, elapsed, calls):
+    return {
+        'invocations': len(latencies_ms),
+        'units': units,
+        'elapsed_s': elapsed,
+        'throughput_per_s': units / elapsed if elapsed else None,
+        'p50_ms': percentile(latencies_ms, 0.50),
+        'p95_ms': percentile(latencies_ms, 0.95),
+        'p99_ms': percentile(latencies_ms, 0.99),
+        'calls': dict(sorted(calls.items()))
+    }
+
+def count_calls(client, calls):
+    """Counts API calls made through a botocore client by operation"""
+    service = client.meta.service_model.service_name
+
+    def before_call(model, **kwargs):
+        calls[f'{service}.{model.name}'] += 1
+
+    client.meta.events.register('before-call', before_call)
+
+def lambda_record(message):
+    """Turns a ReceiveMessage message into an SQS event record as Lambda delivers it"""
+    return {
+        'messageId': message['MessageId'],
+        'body': message['Body'],
+        'messageAttributes': {
+            name: {'stringValue': value.get('StringValue'), 'dataType': value['DataType']}
+            for name, value in message.get('MessageAttributes', {}).items()
+        }
+    }
+
+def create_inventory_tables(dynamodb, skus, stock):
+    """Creates the inventory and reservations tables, every catalog product holding stock units"""
+    for table, key in ((os.environ['INVENTORY_TABLE'], 'product_id'), (os.environ['RESERVATIONS_TABLE'], 'order_id')):
+        dynamodb.create_table(
+            TableName=table,
+            KeySchema=[{'AttributeName': key, 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': key, 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+    requests = [
+        {'PutRequest': {'Item': {'product_id': {'S': f'PROD{n:05d}'}, 'available': {'N': str(stock)}}}}
+        for n in range(skus)
+    ]
+    for i in range(0, len(requests), 25):
+        dynamodb.batch_write_item(RequestItems={os.environ['INVENTORY_TABLE']: requests[i:i + 25]})
+
+def run(args):
+    import boto3
+
+    dynamodb = boto3.client('dynamodb')
+    dynamodb.create_table(
+        TableName=os.environ['ORDERS_TABLE'],
+        KeySchema=[{'AttributeName': 'order_id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'order_id', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    if os.environ.get('INVENTORY_BACKEND') == 'dynamodb':
+        # Enough stock that every order can be reserved, up to 3 units per line
+        create_inventory_tables(dynamodb, args.skus, 3 * args.max_items * args.orders)
+    sqs = boto3.client('sqs')
+    queue_url = sqs.create_queue(QueueName='load-test-orders')['QueueUrl']
+    dlq_url = sqs.create_queue(QueueName='load-test-dlq')['QueueUrl']
+    os.environ['ORDER_QUEUE_URL'] = queue_url
+    os.environ['DLQ_URL'] = dlq_url
+
+    sys.path.insert(0, os.path.join(LAMBDA_DIR, 'shared'))
+    validator = load_lambda('order_validator', 'order-validator')
+    fulfillment = load_lambda('order_fulfillment', 'order-fulfillment')
+
+    import aws_clients
+    from metrics import InMemorySink
+    step_metrics = fulfillment.metrics.sink = InMemorySink()
+    calls = Counter()
+    for service in ('dynamodb', 'sqs'):
+        count_calls(aws_clients.get_client(service), calls)
+
+    rng = random.Random(args.seed)
+    orders = make_orders(args.orders, args.items, args.max_items, args.skus, args.skew, rng)
+    outcomes = Counter()
+
+    # Validator stage
+    latencies = []
+    calls.clear()
+    started = time.perf_counter()
+    if args.validator_batch:
+        for i in range(0, len(orders), args.validator_batch):
+            t0 = time.perf_counter()
+            response = validator.lambda_handler({'orders': orders[i:i + args.validator_batch]}, None)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            for result in response['results']:
+                outcomes[f"validator_{result['status'].lower()}"] += 1
+    else:
+        for order in orders:
+            t0 = time.perf_counter()
+            response = validator.lambda_handler({'order': order}, None)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            outcomes[f"validator_{response['statusCode']}"] += 1
+    validator_stats = summarize(latencies, len(orders), time.perf_counter() - started, calls)
+    total_calls = Counter(calls)
+
+    # Fulfillment stage, draining the queue the way the event source mapping does
+    latencies = []
+    calls.clear()
+    fulfilled = 0
+    started = time.perf_counter()
+    while True:
+        messages = []
+        while len(messages) < args.sqs_batch_size:
+            received = sqs.receive_message(
+                QueueUrl=queue_url, MaxNumberOfMessages=min(10, args.sqs_batch_size - len(messages)),
+                VisibilityTimeout=300, MessageAttributeNames=['All']
+            ).get('Messages', [])
+            if not received:
+                break
+            messages.extend(received)
+        if not messages:
+            break
+
+        records = [lambda_record(m) for m in messages]
+        t0 = time.perf_counter()
+        response = fulfillment.lambda_handler({'Records': records}, None)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        retry = {failure['itemIdentifier'] for failure in response['batchItemFailures']}
+        outcomes['fulfillment_retried'] += len(retry)
+        done = [m for m in messages if m['MessageId'] not in retry]
+        fulfilled += len(done)
+        for i in range(0, len(done), 10):
+            sqs.delete_message_batch(QueueUrl=queue_url, Entries=[
+                {'Id': str(n), 'ReceiptHandle': m['ReceiptHandle']} for n, m in enumerate(done[i:i + 10])
+            ])
+    fulfillment_stats = summarize(latencies, fulfilled, time.perf_counter() - started, calls)
+    total_calls.update(calls)
+
+    dlq_depth = sqs.get_queue_attributes(QueueUrl=dlq_url, AttributeNames=['ApproximateNumberOfMessages'])
+    outcomes['dead_lettered'] = int(dlq_depth['Attributes']['ApproximateNumberOfMessages'])
+
+    durations = {}
+    counters = Counter()
+    for document in step_metrics.documents:
+        if 'Step' in document:
+            durations.setdefault(document['Step'], []).extend(document['Duration'])
+        else:
+            counters.update({k: v for k, v in document.items() if k not in ('_aws', 'Service')})
+    fulfillment_stats['steps'] = {
+        step: {'count': len(values), 'p50_ms': percentile(values, 0.50),
+               'p95_ms': percentile(values, 0.95), 'p99_ms': percentile(values, 0.99)}
+        for step, values in sorted(durations.items())
+    }
+    fulfillment_stats['counters'] = dict(counters)
+
+    total_elapsed = validator_stats['elapsed_s'] + fulfillment_stats['elapsed_s']
+    return {
+        'config': {
+            'orders': args.orders,
+            'items': args.items,
+            'max_items': args.max_items,
+            'skus': args.skus,
+            'skew': args.skew,
+            'validator_batch': args.validator_batch,
+            'sqs_batch_size': args.sqs_batch_size,
+            'seed': args.seed,
+            'env': dict(args.env)
+        },
+        'stages': {'validator': validator_stats, 'fulfillment': fulfillment_stats},
+        'throughput_orders_per_s': args.orders / total_elapsed if total_elapsed else None,
+        'outcomes': dict(outcomes),
+        'calls': dict(sorted(total_calls.items()))
+    }
+
+def regressions(results, baseline, tolerance):
+    """Lists metrics that are worse than the baseline by more than tolerance"""
+    found = []
+    for stage, stats in results['stages'].items():
+        previous = baseline['stages'].get(stage)
+        if not previous:
+            continue
+        if stats['p95_ms'] and previous['p95_ms'] and stats['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            found.append(f"{stage} p95 {previous['p95_ms']:.2f} -> {stats['p95_ms']:.2f} ms")
+        if stats['throughput_per_s'] and previous['throughput_per_s'] \
+                and stats['throughput_per_s'] < previous['throughput_per_s'] * (1 - tolerance):
+            found.append(f"{stage} throughput {previous['throughput_per_s']:.1f} -> {stats['throughput_per_s']:.1f}/s")
+        for operation, count in stats['calls'].items():
+            if count > previous['calls'].get(operation, 0) * (1 + tolerance):
+                found.append(f"{stage} {operation} calls {previous['calls'].get(operation, 0)} -> {count}")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=500, help='number of orders to send')
+    parser.add_argument('--items', default='uniform:1:10', help='item count distribution per order')
+    parser.add_argument('--max-items', type=int, default=500, help='upper bound on items per order')
+    parser.add_argument('--skus', type=int, default=1000, help='catalog size')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent of product popularity, 0 for uniform')
+    parser.add_argument('--validator-batch', type=int, default=0,
+                        help="send orders to the validator in batches of this size, 0 for one per invocation")
+    parser.add_argument('--sqs-batch-size', type=int, default=10, help='records per fulfillment invocation')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--env', action='append', default=[], type=lambda v: tuple(v.split('=', 1)),
+                        metavar='KEY=VALUE', help='environment variable for the lambdas, repeatable')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    os.environ.update(AWS_DEFAULT_REGION='us-east-1', AWS_ACCESS_KEY_ID='load-test',
+                      AWS_SECRET_ACCESS_KEY='load-test', ORDERS_TABLE='load-test-orders',
+                      INVENTORY_TABLE='load-test-inventory', RESERVATIONS_TABLE='load-test-reservations',
+                      PAYLOAD_LOG_SAMPLE_RATE='0')
+    os.environ.update(dict(args.env))
+
+    import logging
+    logging.disable(logging.INFO)
+
+    from moto import mock_dynamodb, mock_sqs
+    with mock_dynamodb(), mock_sqs():
+        results = run(args)
+
+    for stage, stats in results['stages'].items():
+        print(f"{stage:<12} {stats['throughput_per_s']:8.1f}/s  p50 {stats['p50_ms']:8.2f} ms"
+              f"  p95 {stats['p95_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms")
+    for step, stats in results['stages']['fulfillment']['steps'].items():
+        print(f"  {step:<20} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms")
+    counters = results['stages']['fulfillment']['counters']
+    if counters:
+        print('  ' + '  '.join(f"{k} {v}" for k, v in counters.items()))
+    print(f"{'pipeline':<12} {results['throughput_orders_per_s']:8.1f} orders/s")
+    print('outcomes     ' + '  '.join(f"{k} {v}" for k, v in results['outcomes'].items()))
+    print('calls        ' + '  '.join(f"{k} {v}" for k, v in results['calls'].items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"REGRESSION   {regression}")
+        if found:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
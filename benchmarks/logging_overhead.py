@@ -0,0 +1,86 @@
+"""
+Micro-benchmark for request logging
+
+Compares the eager f-string plus json.dumps of the whole event the
+handlers used to log with the sampled, lazily formatted structured
+logging, for an SQS batch event. Both are measured with INFO enabled and
+with INFO filtered out.
+
+Usage:
+    python benchmarks/logging_overhead.py [--output results.json]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'lambda', 'shared'))
+
+from structured_logging import JsonFormatter, bind, log_payload, start_invocation
+
+class Context:
+    aws_request_id = 'bench-request'
+
+def make_event(count):
+    return {'Records': [
+        {
+            'messageId': f'msg-{i}',
+            'body': json.dumps({
+                'order_id': f'ORDER{i:05d}',
+                'customer_id': f'CUST{i:05d}',
+                'items': [{'product_id': f'PROD{j}', 'quantity': 1, 'price': '9.99'} for j in range(5)],
+                'total_amount': '49.95'
+            })
+        }
+        for i in range(count)
+    ]}
+
+def eager(logger, event):
+    logger.info(f"Processing order fulfillment: {json.dumps(event)}")
+    for record in event['Records']:
+        logger.info(f"Order fulfilled successfully: {record['messageId']}")
+
+def structured(logger, event):
+    start_invocation(Context)
+    log_payload(logger, "Processing order fulfillment", event)
+    for record in event['Records']:
+        bind(order_id=record['messageId'])
+        logger.info("Order fulfilled successfully: %s", record['messageId'])
+
+def best_us(func, number):
+    return min(timeit.repeat(func, number=number, repeat=7)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    logger = logging.getLogger('bench')
+    logger.propagate = False
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    logger.addHandler(handler)
+    event = make_event(10)
+
+    results = {}
+    for level in ('INFO', 'WARNING'):
+        logger.setLevel(level)
+        handler.setFormatter(logging.Formatter())
+        eager_us = best_us(lambda: eager(logger, event), 2000)
+        handler.setFormatter(JsonFormatter())
+        results[level.lower()] = {
+            'eager_us': eager_us,
+            'structured_us': best_us(lambda: structured(logger, event), 2000)
+        }
+
+    for name, timings in results.items():
+        print(f"{name:<8} " + '  '.join(f"{key} {value:10.3f}" for key, value in timings.items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
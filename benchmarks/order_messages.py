@@ -0,0 +1,94 @@
+"""
+Micro-benchmarks for order messages
+
+Compares the JSON message body the validator always sent with the compact
+binary order codec, plain and zlib-compressed: encode and decode time and
+body size, for orders of 1 to 1000 items. JSON bodies carry amounts as
+strings, so the JSON decode timing includes converting them back to
+Decimals, which the codec returns directly.
+
+The codec only wins on size: encoding is slower than JSON at every order
+size, and decoding is slower for small orders and about even from 100
+items up.
+
+Usage:
+    python benchmarks/order_messages.py [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'lambda', 'shared'))
+
+from order_codec import encode_message, decode_message
+
+def make_order(count):
+    items = []
+    for i in range(count):
+        quantity = random.randint(1, 9)
+        price = Decimal(random.randint(100, 10000)).scaleb(-2)
+        items.append({'product_id': f'PROD{i:05d}', 'quantity': quantity, 'price': price, 'total': price * quantity})
+    return {
+        'order_id': 'ORD-1a2b3c4d-5e6f-4a8b-9c0d-1e2f3a4b5c6d',
+        'customer_id': 'CUST123',
+        'items': items,
+        'total_amount': sum(item['total'] for item in items),
+        'status': 'PENDING',
+        'order_date': '2026-10-17T09:30:00.000000',
+        'created_at': '2026-10-17T09:30:00.000000',
+        'updated_at': '2026-10-17T09:30:00.000000'
+    }
+
+def json_encode(order):
+    return json.dumps(order, default=str), {}
+
+def json_decode(body, attributes):
+    # JSON carries amounts as strings; converting them back is part of the cost
+    order = decode_message(body, attributes)
+    order['total_amount'] = Decimal(order['total_amount'])
+    for item in order['items']:
+        item['price'] = Decimal(item['price'])
+        item['total'] = Decimal(item['total'])
+    return order
+
+def best_us(func, number):
+    return min(timeit.repeat(func, number=number, repeat=7)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    random.seed(7)
+    codecs = {
+        'json': (json_encode, json_decode),
+        'binary': (lambda order: encode_message(order), decode_message),
+        'binary_zlib': (lambda order: encode_message(order, compress=True), decode_message)
+    }
+    results = {}
+
+    for count in (1, 10, 100, 1000):
+        order = make_order(count)
+        number = max(1, 20000 // count)
+        for name, (encode, decode) in codecs.items():
+            body, attributes = encode(order)
+            results[f'items_{count}_{name}'] = {
+                'encode_us': best_us(lambda: encode(order), number),
+                'decode_us': best_us(lambda: decode(body, attributes), number),
+                'bytes': len(body)
+            }
+
+    for name, timings in results.items():
+        print(f"{name:<20} " + '  '.join(f"{key} {value:10.3f}" for key, value in timings.items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Micro-benchmarks for order validation
+
+Compares the compiled order schema with the same checks written by hand,
+and the columnar item validator with the row-by-row one.
+
+Usage:
+    python benchmarks/validation.py [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src', 'lambda', 'order-validator'), os.path.join(ROOT, 'src', 'lambda', 'shared')]
+os.environ.setdefault('ORDERS_TABLE', 'bench-orders')
+os.environ.setdefault('ORDER_QUEUE_URL', 'https://sqs.us-east-1.amazonaws.com/123456789012/bench-queue')
+
+import lambda_function
+from order_schema import NUMBER_TYPES, are_coupons, is_address, is_currency, validate_order_fields
+
+def hand_written_checks(order_data):
+    """
+    The same checks as ORDER_SCHEMA written by hand, in the style
+    validate_order and validate_items used before the schema was compiled
+    """
+    if not isinstance(order_data, dict):
+        raise ValueError("Order must be an object")
+    for field in ['customer_id', 'items', 'total_amount']:
+        if field not in order_data:
+            raise ValueError(f"Missing required field: {field}")
+    customer_id = order_data['customer_id']
+    if not isinstance(customer_id, str) or len(customer_id.strip()) == 0:
+        raise ValueError("Invalid customer_id")
+    items = order_data['items']
+    if not isinstance(items, list) or len(items) == 0:
+        raise ValueError("Order must contain at least one item")
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Each item must be an object")
+        if not all(k in item for k in ['product_id', 'quantity', 'price']):
+            raise ValueError("Each item must have product_id, quantity, and price")
+        if not isinstance(item['product_id'], (str, int)):
+            raise ValueError("Invalid product_id")
+        if not isinstance(item['quantity'], NUMBER_TYPES):
+            raise ValueError("Invalid quantity")
+        if not isinstance(item['price'], NUMBER_TYPES):
+            raise ValueError("Invalid price")
+    if not isinstance(order_data['total_amount'], NUMBER_TYPES):
+        raise ValueError("Invalid total_amount")
+    if 'shipping_address' in order_data:
+        address = order_data['shipping_address']
+        if not isinstance(address, dict) or not is_address(address):
+            raise ValueError("Invalid shipping_address")
+    if 'currency' in order_data:
+        currency = order_data['currency']
+        if not isinstance(currency, str) or not is_currency(currency):
+            raise ValueError("Invalid currency")
+    if 'coupons' in order_data:
+        coupons = order_data['coupons']
+        if not isinstance(coupons, list) or not are_coupons(coupons):
+            raise ValueError("Invalid coupons")
+
+def make_items(count):
+    return [
+        {'product_id': f'PROD{i:05d}', 'quantity': random.randint(1, 9), 'price': round(random.uniform(1, 100), 2)}
+        for i in range(count)
+    ]
+
+def best_us(func, number):
+    return min(timeit.repeat(func, number=number, repeat=7)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    random.seed(7)
+    order = {
+        'customer_id': 'CUST123',
+        'items': make_items(3),
+        'total_amount': '100.00',
+        'shipping_address': {'line1': '1 Main St', 'city': 'Springfield', 'country': 'US'},
+        'currency': 'USD',
+        'coupons': ['WELCOME10']
+    }
+    results = {
+        'fields': {
+            'hand_written_us': best_us(lambda: hand_written_checks(order), 100000),
+            'compiled_schema_us': best_us(lambda: validate_order_fields(order), 100000)
+        }
+    }
+
+    for count in (10, 100, 1000):
+        items = make_items(count)
+        results[f'items_{count}'] = {
+            'row_us': best_us(lambda: lambda_function.validate_items(items), max(1, 20000 // count)),
+            'columnar_us': best_us(lambda: lambda_function.validate_items_columnar(items), max(1, 20000 // count))
+        }
+
+    for name, timings in results.items():
+        print(f"{name:<12} " + '  '.join(f"{key} {value:10.3f}" for key, value in timings.items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
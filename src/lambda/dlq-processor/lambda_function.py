@@ -0,0 +1,481 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from botocore.exceptions import ClientError
+
+from aws_clients import DynamoDB, LazyClient
+from claim_check import ClaimCheckError, claim_check_from_environment
+from order_codec import MODE_ATTRIBUTE, attribute_value, decode_message, is_reference
+from structured_logging import setup_logging, start_invocation
+
+# Configure logging
+logger = setup_logging()
+
+# Initialize AWS clients, created on first use
+dynamodb = DynamoDB()
+sqs = LazyClient('sqs')
+
+# Environment variables
+FAILED_ORDERS_TABLE = os.environ['FAILED_ORDERS_TABLE']
+DLQ_URL = os.environ['DLQ_URL']
+ORDER_QUEUE_URL = os.environ['ORDER_QUEUE_URL']
+DRAIN_MAX_MESSAGES = int(os.environ.get('DRAIN_MAX_MESSAGES', '1000'))
+REDRIVE_RATE = float(os.environ.get('REDRIVE_RATE', '10'))
+REDRIVE_BURST = int(os.environ.get('REDRIVE_BURST', '10'))
+
+# Batch API limits and retry settings
+RECEIVE_BATCH_SIZE = 10
+BATCH_WRITE_SIZE = 25
+SEND_BATCH_SIZE = 10
+MAX_BATCH_RETRIES = 5
+RETRY_BASE_DELAY = 0.05
+
+# Long-poll wait, and the time left below which no further poll is started
+WAIT_TIME_SECONDS = 20
+DRAIN_TIME_MARGIN_MS = (WAIT_TIME_SECONDS + 10) * 1000
+
+# Error class of messages SQS moved to the DLQ after maxReceiveCount
+MAX_RECEIVES_ERROR = 'Max receives exceeded'
+
+STATUS_FAILED = 'FAILED'
+STATUS_REDRIVEN = 'REDRIVEN'
+
+# Initialize DynamoDB table
+failed_orders_table = dynamodb.Table(FAILED_ORDERS_TABLE)
+
+# Offloaded DLQ messages are read back, and large orders are stored as pointers
+# so records stay well below the DynamoDB item size limit
+claim_check = claim_check_from_environment()
+
+class TokenBucket:
+    """
+    Token bucket limiting how fast redriven orders are sent
+
+    Args:
+        rate: Tokens added per second
+        capacity: Most tokens held, i.e. the largest burst
+
+    Raises:
+        ValueError: If rate is not positive
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        if rate <= 0:
+            raise ValueError(f"Token rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1) -> None:
+        """
+        Blocks until tokens are available and takes them
+
+        Args:
+            tokens: Tokens to take, at most capacity
+        """
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Drains the DLQ into failed_orders, or redrives selected failures
+
+    Args:
+        event: Scheduled event to drain the DLQ, or
+            {'redrive': {'error_class': ..., 'error_contains': ..., 'limit': ...}}
+            to replay failed orders into the order queue
+        context: Lambda context
+
+    Returns:
+        Dict with counts of the drained or redriven messages
+    """
+    start_invocation(context)
+
+    if 'redrive' in event:
+        options = event['redrive']
+        return redrive(
+            error_class=options.get('error_class'),
+            error_contains=options.get('error_contains'),
+            limit=int(options.get('limit', DRAIN_MAX_MESSAGES)),
+            rate=float(options.get('rate', REDRIVE_RATE))
+        )
+
+    return drain_dlq(context)
+
+def drain_dlq(context: Any = None, max_messages: int = DRAIN_MAX_MESSAGES) -> Dict[str, Any]:
+    """
+    Long-polls the DLQ and persists its messages to failed_orders
+
+    Messages are only deleted from the DLQ once their records are
+    written, so a failed write leaves them for the next drain. Records
+    are keyed on the message ID, which makes a repeated write harmless.
+
+    Args:
+        context: Lambda context, used to stop before the timeout
+        max_messages: Most messages drained per invocation
+
+    Returns:
+        Dict with the number of messages 'drained' and 'failed'
+    """
+    drained = 0
+    failed = 0
+
+    while drained + failed < max_messages:
+        if context is not None and context.get_remaining_time_in_millis() < DRAIN_TIME_MARGIN_MS:
+            break
+
+        messages = sqs.receive_message(
+            QueueUrl=DLQ_URL,
+            MaxNumberOfMessages=min(RECEIVE_BATCH_SIZE, max_messages - drained - failed),
+            WaitTimeSeconds=WAIT_TIME_SECONDS,
+            AttributeNames=['SentTimestamp', 'ApproximateReceiveCount'],
+            MessageAttributeNames=['All']
+        ).get('Messages', [])
+        if not messages:
+            break
+
+        records = []
+        readable = []
+        for message in messages:
+            try:
+                records.append(failure_record(message))
+                readable.append(message)
+            except ClaimCheckError as e:
+                # Left on the DLQ for the next drain
+                logger.error("Could not read DLQ message %s: %s", message['MessageId'], e)
+        unstored = write_failures(records)
+        stored = [message for message, record in zip(readable, records) if record['failure_id'] not in unstored]
+        delete_messages(stored)
+
+        drained += len(stored)
+        failed += len(messages) - len(stored)
+
+    logger.info("Drained %s DLQ messages, %s left for retry", drained, failed)
+
+    return {'drained': drained, 'failed': failed}
+
+def failure_record(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds the failed_orders record of a DLQ message
+
+    Fulfillment sends {'order', 'error', 'failed_at'}. Messages SQS
+    moved after too many receives carry the original order instead, in
+    JSON or the binary order codec, or just the order ID for thin
+    messages. Either may arrive as a claim-check pointer. Orders are
+    stored, and redriven, as JSON; thin messages are redriven thin.
+
+    Args:
+        message: SQS message
+
+    Returns:
+        failed_orders item
+
+    Raises:
+        ClaimCheckError: If an offloaded body cannot be read
+    """
+    try:
+        body = decode_message(claim_check.rehydrate(message['Body']), message.get('MessageAttributes'))
+    except ValueError:
+        body = {}
+
+    if isinstance(body, dict) and 'order' in body and 'error' in body:
+        order = body['order']
+        error = str(body['error'])
+        failed_at = body.get('failed_at')
+    else:
+        order = body if isinstance(body, dict) else {}
+        error = MAX_RECEIVES_ERROR
+        failed_at = None
+
+    if failed_at is None:
+        sent = int(message.get('Attributes', {}).get('SentTimestamp', time.time() * 1000))
+        failed_at = datetime.utcfromtimestamp(sent / 1000).isoformat()
+
+    order_id = str(order.get('order_id', 'UNKNOWN'))
+
+    record = {
+        'failure_id': message['MessageId'],
+        'order_id': order_id,
+        'error': error,
+        'error_class': error_class(error),
+        'failed_at': failed_at,
+        'status': STATUS_FAILED,
+        # The queue message replayed on redrive, a pointer for large orders
+        'order': claim_check.offload(json.dumps(order, default=str), order_id=order_id) if order else message['Body']
+    }
+    if is_reference(message.get('MessageAttributes')):
+        record['message_mode'] = attribute_value(message['MessageAttributes'], MODE_ATTRIBUTE)
+
+    return record
+
+def error_class(error: str) -> str:
+    """
+    Reduces an error message to the class failures are grouped by
+
+    Fulfillment errors are '<step failure>: <detail>', e.g.
+    'Payment failed: Payment declined - amount exceeds limit'; the
+    class is the part before the first colon.
+
+    Args:
+        error: Error message
+
+    Returns:
+        Error class
+    """
+    return error.split(':', 1)[0].strip() or 'Unknown'
+
+def write_failures(records: List[Dict[str, Any]]) -> set:
+    """
+    Writes records to failed_orders with BatchWriteItem
+
+    Unprocessed items are retried with exponential backoff.
+
+    Args:
+        records: failed_orders items
+
+    Returns:
+        IDs of the records that could not be written
+    """
+    unstored = set()
+
+    for start in range(0, len(records), BATCH_WRITE_SIZE):
+        chunk = records[start:start + BATCH_WRITE_SIZE]
+        request_items = {FAILED_ORDERS_TABLE: [{'PutRequest': {'Item': record}} for record in chunk]}
+
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+            try:
+                response = dynamodb.batch_write_item(RequestItems=request_items)
+            except Exception as e:
+                logger.error("Batch write failed: %s", e)
+                continue
+            request_items = response.get('UnprocessedItems') or {}
+            if not request_items:
+                break
+
+        for request in request_items.get(FAILED_ORDERS_TABLE, []):
+            unstored.add(request['PutRequest']['Item']['failure_id'])
+
+    return unstored
+
+def delete_messages(messages: List[Dict[str, Any]]) -> None:
+    """
+    Deletes persisted messages from the DLQ with DeleteMessageBatch
+
+    Args:
+        messages: SQS messages to delete
+    """
+    for start in range(0, len(messages), RECEIVE_BATCH_SIZE):
+        chunk = messages[start:start + RECEIVE_BATCH_SIZE]
+        response = sqs.delete_message_batch(
+            QueueUrl=DLQ_URL,
+            Entries=[{'Id': str(i), 'ReceiptHandle': message['ReceiptHandle']} for i, message in enumerate(chunk)]
+        )
+        for failure in response.get('Failed', []):
+            # The message comes back after its visibility timeout and is written again under the same key
+            logger.warning("Failed to delete DLQ message %s: %s", failure['Id'], failure.get('Message'))
+
+def select_failures(error_class: Optional[str] = None, error_contains: Optional[str] = None,
+                    limit: int = DRAIN_MAX_MESSAGES) -> List[Dict[str, Any]]:
+    """
+    Finds failures that have not been redriven yet
+
+    With an error class the ErrorClassIndex is queried, otherwise the
+    table is scanned.
+
+    Args:
+        error_class: Only failures of this class, e.g. 'Payment failed'
+        error_contains: Only failures whose error contains this text,
+            case-insensitive, e.g. 'Payment declined'
+        limit: Most failures returned
+
+    Returns:
+        failed_orders items, oldest first when queried by class
+    """
+    params = {
+        'FilterExpression': '#status = :failed',
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': {':failed': STATUS_FAILED}
+    }
+    if error_class is not None:
+        params.update(IndexName='ErrorClassIndex', KeyConditionExpression='error_class = :error_class')
+        params['ExpressionAttributeValues'][':error_class'] = error_class
+        read = failed_orders_table.query
+    else:
+        read = failed_orders_table.scan
+
+    needle = error_contains.lower() if error_contains else None
+    selected = []
+    while len(selected) < limit:
+        response = read(**params)
+        selected += [
+            item for item in response['Items'] if needle is None or needle in item['error'].lower()
+        ]
+        if 'LastEvaluatedKey' not in response:
+            break
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return selected[:limit]
+
+def redrive(error_class: Optional[str] = None, error_contains: Optional[str] = None,
+            limit: int = DRAIN_MAX_MESSAGES, rate: float = REDRIVE_RATE,
+            burst: int = REDRIVE_BURST) -> Dict[str, Any]:
+    """
+    Replays selected failures into the order queue at a bounded rate
+
+    Orders are sent with SendMessageBatch, taking one token per order
+    from a token bucket. Each order is claimed first by marking it
+    REDRIVEN with a conditional write, so concurrent or repeated
+    redrives never send it twice. Orders whose claim fails are skipped,
+    and claims of orders that could not be queued are released.
+
+    Args:
+        error_class: Only failures of this class
+        error_contains: Only failures whose error contains this text
+        limit: Most orders redriven
+        rate: Orders per second
+        burst: Orders sent at once after an idle period
+
+    Returns:
+        Dict with the number of orders 'selected', 'redriven' and 'failed'
+    """
+    failures = select_failures(error_class, error_contains, limit)
+    bucket = TokenBucket(rate, max(burst, 1))
+    # Batches no larger than the burst, so each one fits in the bucket
+    batch_size = min(SEND_BATCH_SIZE, bucket.capacity)
+    redriven = 0
+
+    for start in range(0, len(failures), batch_size):
+        chunk = [item for item in failures[start:start + batch_size] if claim_redrive(item)]
+        if not chunk:
+            continue
+        bucket.acquire(len(chunk))
+        sent = send_orders(chunk)
+        for item in chunk:
+            if not any(item is queued for queued in sent):
+                release_redrive(item)
+        redriven += len(sent)
+
+    logger.info("Redrove %s of %s failed orders", redriven, len(failures))
+
+    return {'selected': len(failures), 'redriven': redriven, 'failed': len(failures) - redriven}
+
+def send_orders(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Sends failed orders back to the order queue
+
+    Failed entries that are not the sender's fault are retried with
+    exponential backoff.
+
+    Args:
+        items: failed_orders items, at most 10
+
+    Returns:
+        The items that were queued
+    """
+    entries = {
+        str(i): {
+            'Id': str(i),
+            'MessageBody': item['order'],
+            'MessageAttributes': {
+                'order_id': {'StringValue': item['order_id'], 'DataType': 'String'},
+                **({MODE_ATTRIBUTE: {'StringValue': item['message_mode'], 'DataType': 'String'}}
+                   if 'message_mode' in item else {})
+            }
+        }
+        for i, item in enumerate(items)
+    }
+    pending = list(entries)
+
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        if attempt:
+            time.sleep(RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+        try:
+            response = sqs.send_message_batch(
+                QueueUrl=ORDER_QUEUE_URL,
+                Entries=[entries[entry_id] for entry_id in pending]
+            )
+        except Exception as e:
+            logger.error("Batch send failed: %s", e)
+            continue
+        retryable = []
+        for failure in response.get('Failed', []):
+            logger.error("Failed to redrive entry %s: %s", failure['Id'], failure.get('Message'))
+            if not failure.get('SenderFault'):
+                retryable.append(failure['Id'])
+            else:
+                entries.pop(failure['Id'])
+        pending = retryable
+        if not pending:
+            break
+
+    return [items[int(entry_id)] for entry_id in entries if entry_id not in pending]
+
+def claim_redrive(item: Dict[str, Any]) -> bool:
+    """
+    Marks a failure REDRIVEN before it is replayed
+
+    The write only succeeds if no redrive has claimed the failure yet.
+
+    Args:
+        item: failed_orders item, redriven_at is set on it
+
+    Returns:
+        True if this redrive may send the order
+    """
+    redriven_at = datetime.utcnow().isoformat()
+    try:
+        failed_orders_table.update_item(
+            Key={'failure_id': item['failure_id']},
+            UpdateExpression='SET #status = :redriven, redriven_at = :now',
+            ConditionExpression='attribute_not_exists(redriven_at)',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':redriven': STATUS_REDRIVEN, ':now': redriven_at}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.info("Failure %s was already redriven", item['failure_id'])
+        else:
+            logger.error("Could not claim failure %s for redrive: %s", item['failure_id'], e)
+        return False
+    except Exception as e:
+        logger.error("Could not claim failure %s for redrive: %s", item['failure_id'], e)
+        return False
+    item['redriven_at'] = redriven_at
+    return True
+
+def release_redrive(item: Dict[str, Any]) -> None:
+    """
+    Returns a claimed failure that could not be queued to FAILED
+
+    Args:
+        item: failed_orders item claimed by claim_redrive
+    """
+    try:
+        failed_orders_table.update_item(
+            Key={'failure_id': item['failure_id']},
+            UpdateExpression='SET #status = :failed REMOVE redriven_at',
+            ConditionExpression='redriven_at = :claimed',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':failed': STATUS_FAILED, ':claimed': item['redriven_at']}
+        )
+    except Exception as e:
+        # Left REDRIVEN without having been queued; set status back to
+        # FAILED and remove redriven_at by hand to replay it
+        logger.error("Could not release failure %s after a failed redrive: %s", item['failure_id'], e)
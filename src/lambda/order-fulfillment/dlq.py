@@ -0,0 +1,208 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger()
+
+# SendMessageBatch takes at most 10 entries and 256 KiB in total
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+class DlqPublisher:
+    """
+    Buffers dead-letter messages and sends them with SendMessageBatch
+
+    Messages added during an invocation are sent together by flush(), in
+    batches of up to 10. Entries the batch call reports as failed, and
+    whole calls that raise, are retried with full-jitter backoff. Entries
+    that still fail are appended to a spill file under /tmp instead of
+    being dropped. The next flush in the same container sends them before
+    anything else. Sender faults, e.g. an oversized message, cannot
+    succeed on retry. Their bodies are stored through the claim check
+    under a rejected/ key, or appended to a separate rejected file when
+    there is no store, and are never resent automatically.
+
+    Args:
+        sqs: SQS client
+        queue_url: Dead-letter queue URL
+        spill_path: File that keeps unsent messages between invocations
+        claim_check: ClaimCheck whose store keeps rejected bodies
+        rejected_path: File that keeps rejected bodies without a store,
+            defaults to '<spill_path stem>-rejected.jsonl'
+        max_attempts: Send attempts per message within one flush
+        base_delay: First backoff ceiling in seconds
+        max_delay: Largest backoff ceiling in seconds
+    """
+
+    def __init__(self, sqs: Any, queue_url: str, spill_path: str = '/tmp/order-dlq-spill.jsonl',
+                 claim_check: Optional[Any] = None, rejected_path: Optional[str] = None,
+                 max_attempts: int = 3, base_delay: float = 0.05, max_delay: float = 1.0) -> None:
+        self.sqs = sqs
+        self.queue_url = queue_url
+        self.spill_path = spill_path
+        self.claim_check = claim_check
+        self.rejected_path = rejected_path or os.path.splitext(spill_path)[0] + '-rejected.jsonl'
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._messages = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def add(self, body: str) -> None:
+        """
+        Queues a message for the next flush
+
+        Args:
+            body: Message body
+        """
+        with self._lock:
+            self._messages.append(body)
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Sends spilled and buffered messages
+
+        Returns:
+            Counts of messages 'sent', 'spilled' for a later flush and
+            'rejected' as sender faults and kept aside
+        """
+        with self._flush_lock:
+            with self._lock:
+                messages, self._messages = self._messages, []
+            messages = self._take_spilled() + messages
+            stats = {'sent': 0, 'spilled': 0, 'rejected': 0}
+            if not messages:
+                return stats
+
+            pending = messages
+            for attempt in range(self.max_attempts):
+                if attempt:
+                    self._backoff(attempt - 1)
+                retry = []
+                for batch in batches(pending):
+                    sent, failed, rejected = self._send_batch(batch)
+                    stats['sent'] += sent
+                    stats['rejected'] += rejected
+                    retry += failed
+                pending = retry
+                if not pending:
+                    break
+
+            if pending:
+                self._spill(pending)
+                stats['spilled'] = len(pending)
+                logger.error("Spilled %s DLQ messages to %s", len(pending), self.spill_path)
+
+            logger.info("Flushed DLQ messages: %s sent, %s spilled, %s rejected",
+                        stats['sent'], stats['spilled'], stats['rejected'])
+            return stats
+
+    def _send_batch(self, batch: List[str]) -> Any:
+        """
+        Sends one batch
+
+        Returns:
+            (messages sent, messages to retry, messages rejected)
+        """
+        try:
+            response = self.sqs.send_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{'Id': str(index), 'MessageBody': body} for index, body in enumerate(batch)]
+            )
+        except Exception as e:
+            logger.warning("DLQ batch send failed: %s", e)
+            return 0, batch, 0
+
+        retry = []
+        rejected = 0
+        for failure in response.get('Failed', []):
+            body = batch[int(failure['Id'])]
+            if failure.get('SenderFault'):
+                rejected += 1
+                self._keep_rejected(body, failure.get('Code'))
+            else:
+                retry.append(body)
+        return len(batch) - len(retry) - rejected, retry, rejected
+
+    def _spill(self, messages: List[str]) -> None:
+        with open(self.spill_path, 'a') as f:
+            for body in messages:
+                f.write(json.dumps(body) + '\n')
+
+    def _keep_rejected(self, body: str, code: Optional[str]) -> None:
+        """
+        Keeps a body SQS refused, so it can be inspected and resent by hand
+
+        Args:
+            body: Message body
+            code: Error code SQS gave
+        """
+        store = getattr(self.claim_check, 'store', None)
+        if store is not None:
+            data = body.encode('utf-8')
+            key = f'{self.claim_check.prefix}rejected/{hashlib.sha256(data).hexdigest()}'
+            try:
+                store.put(key, data)
+                logger.error("DLQ rejected message (%s), body kept as %s", code, key)
+                return
+            except Exception as e:
+                logger.warning("Could not store rejected DLQ message %s: %s", key, e)
+
+        with open(self.rejected_path, 'a') as f:
+            f.write(json.dumps({'rejected': code, 'body': body}) + '\n')
+        logger.error("DLQ rejected message (%s), body kept in %s", code, self.rejected_path)
+
+    def _take_spilled(self) -> List[str]:
+        try:
+            with open(self.spill_path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        # A container that died mid-write leaves a truncated last line,
+        # which must not cost the messages spilled before it
+        messages = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                messages.append(json.loads(line))
+            except ValueError:
+                logger.error("Dropping corrupt spilled DLQ message: %s", line.rstrip('\n'))
+        os.remove(self.spill_path)
+        if messages:
+            logger.info("Resending %s spilled DLQ messages", len(messages))
+        return messages
+
+    def _backoff(self, attempt: int) -> None:
+        time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+def batches(messages: List[str]) -> List[List[str]]:
+    """
+    Splits messages into SendMessageBatch-sized batches
+
+    Args:
+        messages: Message bodies
+
+    Returns:
+        Batches within the entry and payload limits
+    """
+    result = []
+    batch = []
+    size = 0
+    for body in messages:
+        body_size = len(body.encode('utf-8'))
+        if batch and (len(batch) == MAX_BATCH_ENTRIES or size + body_size > MAX_BATCH_BYTES):
+            result.append(batch)
+            batch = []
+            size = 0
+        batch.append(body)
+        size += body_size
+    if batch:
+        result.append(batch)
+    return result
@@ -0,0 +1,179 @@
+import json
+import logging
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+
+from botocore.exceptions import ClientError
+
+from ttl_cache import TtlCache
+
+logger = logging.getLogger()
+
+STATUS_IN_PROGRESS = 'IN_PROGRESS'
+STATUS_COMPLETED = 'COMPLETED'
+
+class IdempotencyInProgressError(Exception):
+    """Raised when another invocation is running the same step"""
+    pass
+
+class InMemoryIdempotencyStore:
+    """
+    Idempotency records kept in the container's memory
+
+    Only protects against duplicates handled by the same warm container.
+    Used as a local stand-in for the DynamoDB store.
+    """
+
+    def __init__(self) -> None:
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(key)
+        if record and record['expires_at'] > time.time():
+            return record
+        return None
+
+    def claim(self, key: str, expires_at: int) -> bool:
+        with self._lock:
+            record = self._records.get(key)
+            if record and record['expires_at'] > time.time():
+                return False
+            self._records[key] = {'status': STATUS_IN_PROGRESS, 'expires_at': expires_at}
+            return True
+
+    def complete(self, key: str, result: Dict[str, Any], expires_at: int) -> None:
+        with self._lock:
+            self._records[key] = {'status': STATUS_COMPLETED, 'result': result, 'expires_at': expires_at}
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._records.pop(key, None)
+
+class DynamoDBIdempotencyStore:
+    """
+    Idempotency records in a DynamoDB table keyed on idempotency_key
+
+    Claims are conditional puts, so only one invocation can run a step at a
+    time. Records carry an expires_at attribute for DynamoDB TTL.
+    """
+
+    def __init__(self, table: Any) -> None:
+        self.table = table
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self.table.get_item(Key={'idempotency_key': key}, ConsistentRead=True).get('Item')
+        if not item or int(item['expires_at']) <= time.time():
+            return None
+        record = {'status': item['status'], 'expires_at': int(item['expires_at'])}
+        if 'result' in item:
+            record['result'] = json.loads(item['result'])
+        return record
+
+    def claim(self, key: str, expires_at: int) -> bool:
+        try:
+            self.table.put_item(
+                Item={'idempotency_key': key, 'status': STATUS_IN_PROGRESS, 'expires_at': expires_at},
+                ConditionExpression="attribute_not_exists(idempotency_key) OR expires_at < :now",
+                ExpressionAttributeValues={':now': int(time.time())}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def complete(self, key: str, result: Dict[str, Any], expires_at: int) -> None:
+        self.table.put_item(Item={
+            'idempotency_key': key,
+            'status': STATUS_COMPLETED,
+            'result': json.dumps(result, default=str),
+            'expires_at': expires_at
+        })
+
+    def delete(self, key: str) -> None:
+        self.table.delete_item(Key={'idempotency_key': key})
+
+class Idempotency:
+    """
+    Runs fulfillment steps at most once per order
+
+    Successful step results are stored under '<order_id>#<step>' and
+    returned on repeated calls instead of running the step again. Failed
+    results and exceptions are not stored, so the step can be retried.
+    Completed records are also kept in an LRU cache for the lifetime of
+    the warm container.
+
+    Args:
+        store: Record store, see InMemoryIdempotencyStore
+        ttl_seconds: How long completed records are honoured
+        in_progress_seconds: How long a claim blocks other invocations
+        cache_size: Maximum number of records in the LRU cache
+    """
+
+    def __init__(self, store: Any, ttl_seconds: int = 86400,
+                 in_progress_seconds: int = 300, cache_size: int = 1024) -> None:
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.in_progress_seconds = in_progress_seconds
+        self._cache = TtlCache(ttl_seconds, cache_size)
+
+    def run(self, order_id: str, step: str, func: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+        """
+        Runs func(*args) unless the step already completed for this order
+
+        Args:
+            order_id: Order the step belongs to
+            step: Fulfillment step name
+            func: Step function returning a result dict with 'success'
+
+        Returns:
+            The step result, either fresh or recorded
+
+        Raises:
+            IdempotencyInProgressError: If another invocation holds the step
+        """
+        key = f"{order_id}#{step}"
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            logger.info("Idempotency cache hit: %s", key)
+            return cached
+
+        record = self.store.get(key)
+        if record and record['status'] == STATUS_COMPLETED:
+            logger.info("Step already completed: %s", key)
+            self._cache.put(key, record['result'], ttl_seconds=record['expires_at'] - time.time())
+            return record['result']
+
+        if not self.store.claim(key, int(time.time()) + self.in_progress_seconds):
+            raise IdempotencyInProgressError(f"Step {step} already in progress for order {order_id}")
+
+        try:
+            result = func(*args)
+        except Exception:
+            self.store.delete(key)
+            raise
+
+        if result.get('success'):
+            expires_at = int(time.time()) + self.ttl_seconds
+            self.store.complete(key, result, expires_at)
+            self._cache.put(key, result)
+        else:
+            self.store.delete(key)
+
+        return result
+
+    def invalidate(self, order_id: str, step: str) -> None:
+        """
+        Forgets a completed step, e.g. after it has been compensated
+
+        Args:
+            order_id: Order the step belongs to
+            step: Fulfillment step name
+        """
+        key = f"{order_id}#{step}"
+        self._cache.invalidate([key])
+        self.store.delete(key)
@@ -0,0 +1,633 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional
+
+from botocore.exceptions import ClientError
+
+from ttl_cache import TtlCache
+
+logger = logging.getLogger()
+
+# One TransactWriteItems call holds at most 100 actions, one is the reservation record
+MAX_TRANSACTION_ACTIONS = 100
+MAX_RESERVATION_PRODUCTS = MAX_TRANSACTION_ACTIONS - 1
+
+# BatchGetItem reads at most 100 keys per call
+BATCH_GET_SIZE = 100
+
+# Errors worth retrying a reservation transaction on
+RETRYABLE_ERRORS = (
+    'TransactionConflictException',
+    'TransactionInProgressException',
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException'
+)
+
+# Cancellation reasons that mean an item is contended
+CONTENTION_REASONS = ('TransactionConflict', 'ThrottlingError')
+
+def aggregate_quantities(items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Sums item quantities per product, so duplicate lines reserve once
+
+    Args:
+        items: Order items with product_id and quantity
+
+    Returns:
+        Total quantity per product id
+    """
+    quantities = {}
+    for item in items:
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + int(item['quantity'])
+    return quantities
+
+class InventoryBackend:
+    """
+    Interface of the inventory service used by fulfillment
+
+    Backends return the available stock for many products in one call,
+    so a cache miss for a whole order costs a single round trip.
+    Reservations hold stock for an order until they are committed once the
+    order ships, released, or reclaimed after expiring.
+    """
+
+    def get_stock(self, product_ids: List[str]) -> Dict[str, int]:
+        """
+        Looks up available stock
+
+        Args:
+            product_ids: Distinct product ids
+
+        Returns:
+            Available quantity per product id, unknown products map to 0
+        """
+        raise NotImplementedError
+
+    def reserve(self, order_id: str, quantities: Dict[str, int], expires_at: int) -> Dict[str, Any]:
+        """
+        Takes stock for all products of an order, or none of it
+
+        Reserving an order that already holds a reservation succeeds
+        without taking stock again.
+
+        Args:
+            order_id: Order the reservation belongs to
+            quantities: Quantity per product id, see aggregate_quantities
+            expires_at: Epoch seconds after which the reservation can be reclaimed
+
+        Returns:
+            Dict with 'success' and, on failure, an 'error'
+        """
+        raise NotImplementedError
+
+    def release(self, order_id: str) -> bool:
+        """
+        Returns an order's reserved stock
+
+        Returns:
+            False if the order held no reservation
+        """
+        raise NotImplementedError
+
+    def commit(self, order_id: str) -> bool:
+        """
+        Keeps an order's reserved stock taken for good
+
+        Returns:
+            False if the order held no reservation
+        """
+        raise NotImplementedError
+
+    def reclaim_expired(self, now: int) -> int:
+        """
+        Releases reservations that expired before now
+
+        Returns:
+            Number of reservations released
+        """
+        raise NotImplementedError
+
+    def rebalance(self) -> int:
+        """
+        Evens out stock across the shards of sharded products
+
+        Backends without shards have nothing to rebalance.
+
+        Returns:
+            Number of products rebalanced
+        """
+        return 0
+
+class InMemoryInventoryBackend(InventoryBackend):
+    """
+    Local stand-in for the inventory service
+
+    Args:
+        stock: Available quantity per product id
+        default_stock: Quantity for products not in stock
+        deplete: Whether reservations take stock; when False every order
+            sees the full stock, as the simulated inventory service does
+    """
+
+    def __init__(self, stock: Optional[Dict[str, int]] = None, default_stock: int = 0,
+                 deplete: bool = True) -> None:
+        self.stock = dict(stock or {})
+        self.default_stock = default_stock
+        self.deplete = deplete
+        self.reservations = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_stock(self, product_ids: List[str]) -> Dict[str, int]:
+        self.calls += 1
+        with self._lock:
+            return {product_id: self.stock.get(product_id, self.default_stock) for product_id in product_ids}
+
+    def reserve(self, order_id: str, quantities: Dict[str, int], expires_at: int) -> Dict[str, Any]:
+        with self._lock:
+            if order_id in self.reservations:
+                return {'success': True}
+            for product_id, quantity in quantities.items():
+                if self.stock.get(product_id, self.default_stock) < quantity:
+                    return {'success': False, 'error': f"Insufficient stock for product {product_id}"}
+            if self.deplete:
+                for product_id, quantity in quantities.items():
+                    self.stock[product_id] = self.stock.get(product_id, self.default_stock) - quantity
+            self.reservations[order_id] = (dict(quantities), expires_at)
+        return {'success': True}
+
+    def release(self, order_id: str) -> bool:
+        with self._lock:
+            reservation = self.reservations.pop(order_id, None)
+            if reservation is None:
+                return False
+            if self.deplete:
+                for product_id, quantity in reservation[0].items():
+                    self.stock[product_id] = self.stock.get(product_id, self.default_stock) + quantity
+        return True
+
+    def commit(self, order_id: str) -> bool:
+        with self._lock:
+            return self.reservations.pop(order_id, None) is not None
+
+    def reclaim_expired(self, now: int) -> int:
+        with self._lock:
+            expired = [order_id for order_id, (_, expires_at) in self.reservations.items() if expires_at < now]
+        return sum(1 for order_id in expired if self.release(order_id))
+
+class DynamoDBInventoryBackend(InventoryBackend):
+    """
+    Inventory kept in DynamoDB with conditional counters
+
+    Products are items of the inventory table with an 'available'
+    counter. A reservation is one TransactWriteItems call that puts the
+    reservation record and decrements every product conditionally on
+    enough stock, so concurrent containers cannot oversell. Transaction
+    conflicts and throttling are retried with full-jitter exponential
+    backoff.
+
+    Reservation records carry expires_at, after which reclaim_expired
+    gives their stock back, and a later ttl attribute so DynamoDB TTL
+    removes records that were never reclaimed.
+
+    A hot product can be split into shard items '<product_id>#<n>' that
+    each hold part of its stock, so reservations spread over several
+    partitions. The product item then records the shard count in
+    'shards' and keeps whatever releases return to it until rebalance()
+    moves it back into the shards. Stock reads sum the product item and
+    its shards. Reservations decrement a random shard and, if that shard
+    is short, split the quantity over the shards by their current levels.
+    A product is sharded automatically once its items hit
+    promote_threshold transaction conflicts within contention_window
+    seconds in this container.
+
+    Args:
+        dynamodb: DynamoDB client, see aws_clients.DynamoDB
+        inventory_table: Table keyed on product_id
+        reservations_table: Table keyed on order_id with a StatusExpiryIndex
+        max_attempts: Attempts per transaction
+        base_delay: First backoff ceiling in seconds
+        max_delay: Largest backoff ceiling in seconds
+        retention_seconds: How long after expiry DynamoDB TTL deletes a record
+        shard_count: Shards a product is split into when promoted
+        promote_threshold: Conflicts on one product that trigger promotion
+        contention_window: Seconds over which conflicts are counted
+    """
+
+    def __init__(self, dynamodb: Any, inventory_table: str, reservations_table: str,
+                 max_attempts: int = 5, base_delay: float = 0.02, max_delay: float = 0.5,
+                 retention_seconds: int = 86400, shard_count: int = 10,
+                 promote_threshold: int = 20, contention_window: float = 60) -> None:
+        self.dynamodb = dynamodb
+        self.inventory_table = inventory_table
+        self.reservations_table = reservations_table
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retention_seconds = retention_seconds
+        self.shard_count = min(shard_count, MAX_TRANSACTION_ACTIONS - 1)
+        self.promote_threshold = promote_threshold
+        self.contention_window = contention_window
+        self.conflicts = 0
+        # Shard counts of sharded products, as last read
+        self.shards = {}
+        self._contention = {}
+        self._window_start = time.monotonic()
+        self._pending_promotions = set()
+        self._lock = threading.Lock()
+
+    def get_stock(self, product_ids: List[str]) -> Dict[str, int]:
+        return {product_id: sum(levels.values()) for product_id, levels in self._levels(product_ids).items()}
+
+    def reserve(self, order_id: str, quantities: Dict[str, int], expires_at: int) -> Dict[str, Any]:
+        if len(quantities) > MAX_RESERVATION_PRODUCTS:
+            return {'success': False, 'error': f"Orders are limited to {MAX_RESERVATION_PRODUCTS} distinct products"}
+
+        # Item key -> (product_id, quantity), a random shard for sharded products
+        allocation = {}
+        for product_id, quantity in quantities.items():
+            count = self.shards.get(product_id)
+            key = shard_key(product_id, random.randrange(count)) if count else product_id
+            allocation[key] = (product_id, quantity)
+
+        short = self._try_reserve(order_id, allocation, expires_at)
+        if short:
+            # The chosen shard, or a stale view of which products are sharded, may be
+            # short while the product as a whole is not
+            allocation = self._reallocate(allocation, short)
+            if allocation is not None:
+                short = self._try_reserve(order_id, allocation, expires_at)
+
+        self._promote_pending()
+
+        if short:
+            return {'success': False, 'error': f"Insufficient stock for product {', '.join(short)}"}
+        return {'success': True}
+
+    def release(self, order_id: str) -> bool:
+        reservation = self.dynamodb.Table(self.reservations_table).get_item(
+            Key={'order_id': order_id}, ConsistentRead=True
+        ).get('Item')
+        if reservation is None:
+            return False
+
+        actions = [{'Delete': {
+            'TableName': self.reservations_table,
+            'Key': {'order_id': order_id},
+            'ConditionExpression': 'attribute_exists(order_id)'
+        }}]
+        # Stock goes back to the items, shards included, it was taken from
+        actions += [
+            self._stock_update(key, int(quantity), conditional=False)
+            for key, quantity in sorted(reservation['items'].items())
+        ]
+        # A failed condition means another container released or committed it first
+        return self._transact(actions) is None
+
+    def commit(self, order_id: str) -> bool:
+        try:
+            self.dynamodb.Table(self.reservations_table).delete_item(
+                Key={'order_id': order_id},
+                ConditionExpression='attribute_exists(order_id)'
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def reclaim_expired(self, now: int) -> int:
+        table = self.dynamodb.Table(self.reservations_table)
+        params = {
+            'IndexName': 'StatusExpiryIndex',
+            'KeyConditionExpression': '#status = :reserved AND expires_at < :now',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {':reserved': 'RESERVED', ':now': now},
+            'ProjectionExpression': 'order_id'
+        }
+        released = 0
+        while True:
+            response = table.query(**params)
+            released += sum(1 for item in response['Items'] if self.release(item['order_id']))
+            if 'LastEvaluatedKey' not in response:
+                return released
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def shard_product(self, product_id: str, shards: int) -> bool:
+        """
+        Splits a product's stock evenly over shard items
+
+        Args:
+            product_id: Product to shard
+            shards: Number of shard items
+
+        Returns:
+            False if the product is missing, already sharded, or its stock
+            changed while sharding
+        """
+        shards = min(shards, MAX_TRANSACTION_ACTIONS - 1)
+        item = self.dynamodb.Table(self.inventory_table).get_item(
+            Key={'product_id': product_id}, ConsistentRead=True
+        ).get('Item')
+        if item is None or 'shards' in item:
+            return False
+
+        total = int(item['available'])
+        actions = [{'Update': {
+            'TableName': self.inventory_table,
+            'Key': {'product_id': product_id},
+            'UpdateExpression': 'SET available = :zero, shards = :shards',
+            'ConditionExpression': 'available = :total AND attribute_not_exists(shards)',
+            'ExpressionAttributeValues': {':zero': 0, ':shards': shards, ':total': total}
+        }}]
+        actions += [
+            {'Put': {
+                'TableName': self.inventory_table,
+                'Item': {'product_id': shard_key(product_id, n), 'available': share},
+                'ConditionExpression': 'attribute_not_exists(product_id)'
+            }}
+            for n, share in enumerate(even_shares(total, shards))
+        ]
+        if self._transact(actions) is not None:
+            return False
+
+        self.shards[product_id] = shards
+        logger.info("Sharded inventory for product %s into %s items", product_id, shards)
+        return True
+
+    def rebalance(self) -> int:
+        scanned = []
+        params = {
+            'ProjectionExpression': 'product_id',
+            'FilterExpression': 'attribute_exists(shards)'
+        }
+        table = self.dynamodb.Table(self.inventory_table)
+        while True:
+            response = table.scan(**params)
+            scanned += [item['product_id'] for item in response['Items']]
+            if 'LastEvaluatedKey' not in response:
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        rebalanced = 0
+        for product_id in scanned:
+            levels = self._levels([product_id], consistent=True)[product_id]
+            keys = [shard_key(product_id, n) for n in range(self.shards[product_id])]
+            targets = dict(zip(keys, even_shares(sum(levels.values()), len(keys))))
+            targets[product_id] = 0
+
+            actions = [
+                {'Update': {
+                    'TableName': self.inventory_table,
+                    'Key': {'product_id': key},
+                    'UpdateExpression': 'SET available = :target',
+                    'ConditionExpression': 'available = :current',
+                    'ExpressionAttributeValues': {':target': target, ':current': levels.get(key, 0)}
+                }}
+                for key, target in sorted(targets.items()) if levels.get(key, 0) != target
+            ]
+            # Skipped when a reservation changed a level in between, the next run catches up
+            if actions and self._transact(actions) is None:
+                rebalanced += 1
+        return rebalanced
+
+    def _try_reserve(self, order_id: str, allocation: Dict[str, Any], expires_at: int) -> List[str]:
+        """
+        Runs one reservation transaction
+
+        Returns:
+            Products whose items were short, empty on success
+        """
+        if len(allocation) > MAX_RESERVATION_PRODUCTS:
+            return sorted({product_id for product_id, _ in allocation.values()})
+
+        # Items in a fixed order so concurrent reservations touch them in the same sequence
+        keys = sorted(allocation)
+        actions = [{'Put': {
+            'TableName': self.reservations_table,
+            'Item': {
+                'order_id': order_id,
+                'items': {key: allocation[key][1] for key in keys},
+                'status': 'RESERVED',
+                'expires_at': expires_at,
+                'ttl': expires_at + self.retention_seconds
+            },
+            'ConditionExpression': 'attribute_not_exists(order_id)'
+        }}]
+        actions += [self._stock_update(key, -allocation[key][1]) for key in keys]
+
+        reasons = self._transact(actions, [None] + [allocation[key][0] for key in keys])
+        if reasons is None or reasons[0] == 'ConditionalCheckFailed':
+            return []
+        return sorted({
+            allocation[keys[i - 1]][0] for i, reason in enumerate(reasons) if i and reason == 'ConditionalCheckFailed'
+        })
+
+    def _reallocate(self, allocation: Dict[str, Any], short: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Spreads the short products over their items by current stock level
+
+        Returns:
+            New allocation, or None if a product does not have enough stock
+        """
+        quantities = {}
+        reallocated = {}
+        for key, (product_id, quantity) in allocation.items():
+            if product_id in short:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            else:
+                reallocated[key] = (product_id, quantity)
+
+        for product_id, levels in self._levels(short, consistent=True).items():
+            remaining = quantities[product_id]
+            for key, available in sorted(levels.items(), key=lambda level: -level[1]):
+                take = min(available, remaining)
+                if take > 0:
+                    reallocated[key] = (product_id, take)
+                    remaining -= take
+            if remaining > 0:
+                return None
+        return reallocated
+
+    def _levels(self, product_ids: List[str], consistent: bool = False) -> Dict[str, Dict[str, int]]:
+        """
+        Reads stock per item for each product, the product item and its shards
+
+        Also refreshes the known shard counts.
+        """
+        items = self._get_items(product_ids, consistent)
+        levels = {product_id: {} for product_id in product_ids}
+        owners = {}
+        for product_id in product_ids:
+            item = items.get(product_id)
+            if item is None:
+                continue
+            levels[product_id][product_id] = int(item['available'])
+            if 'shards' in item:
+                self.shards[product_id] = int(item['shards'])
+                for n in range(self.shards[product_id]):
+                    owners[shard_key(product_id, n)] = product_id
+
+        for key, item in self._get_items(list(owners), consistent).items():
+            levels[owners[key]][key] = int(item['available'])
+        return levels
+
+    def _get_items(self, keys: List[str], consistent: bool) -> Dict[str, Dict[str, Any]]:
+        items = {}
+        for start in range(0, len(keys), BATCH_GET_SIZE):
+            request = {self.inventory_table: {
+                'Keys': [{'product_id': key} for key in keys[start:start + BATCH_GET_SIZE]],
+                'ProjectionExpression': 'product_id, available, shards',
+                'ConsistentRead': consistent
+            }}
+            attempt = 0
+            while request:
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                for item in response['Responses'].get(self.inventory_table, []):
+                    items[item['product_id']] = item
+                request = response['UnprocessedKeys']
+                if request:
+                    self._backoff(attempt)
+                    attempt += 1
+        return items
+
+    def _stock_update(self, key: str, delta: int, conditional: bool = True) -> Dict[str, Any]:
+        update = {
+            'TableName': self.inventory_table,
+            'Key': {'product_id': key},
+            'UpdateExpression': 'SET available = available + :delta',
+            'ExpressionAttributeValues': {':delta': delta}
+        }
+        if conditional:
+            update['ConditionExpression'] = 'available >= :quantity'
+            update['ExpressionAttributeValues'][':quantity'] = -delta
+        return {'Update': update}
+
+    def _transact(self, actions: List[Dict[str, Any]], products: Optional[List[Optional[str]]] = None) -> Optional[List[str]]:
+        """
+        Runs a transaction, retrying conflicts and throttling
+
+        Args:
+            actions: TransactItems
+            products: Product each action touches, used to track contention
+
+        Returns:
+            None on success, or the cancellation reason codes, one per
+            action, when a condition failed
+        """
+        for attempt in range(self.max_attempts):
+            try:
+                self.dynamodb.transact_write_items(TransactItems=actions)
+                return None
+            except ClientError as e:
+                code = e.response['Error']['Code']
+                if code == 'TransactionCanceledException':
+                    reasons = [reason.get('Code', 'None') for reason in e.response.get('CancellationReasons', [])]
+                    if 'ConditionalCheckFailed' in reasons:
+                        return reasons
+                    if products:
+                        for product_id, reason in zip(products, reasons):
+                            if product_id and reason in CONTENTION_REASONS:
+                                self._note_contention(product_id)
+                elif code not in RETRYABLE_ERRORS:
+                    raise
+                self.conflicts += 1
+                if attempt == self.max_attempts - 1:
+                    raise
+                self._backoff(attempt)
+
+    def _note_contention(self, product_id: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start > self.contention_window:
+                self._contention.clear()
+                self._window_start = now
+            self._contention[product_id] = self._contention.get(product_id, 0) + 1
+            if self._contention[product_id] >= self.promote_threshold and product_id not in self.shards:
+                self._pending_promotions.add(product_id)
+
+    def _promote_pending(self) -> None:
+        with self._lock:
+            pending, self._pending_promotions = self._pending_promotions, set()
+        for product_id in pending:
+            try:
+                self.shard_product(product_id, self.shard_count)
+            except Exception as e:
+                logger.warning("Failed to shard inventory for product %s: %s", product_id, e)
+
+    def _backoff(self, attempt: int) -> None:
+        time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+def shard_key(product_id: str, shard: int) -> str:
+    return f"{product_id}#{shard}"
+
+def even_shares(total: int, parts: int) -> List[int]:
+    """Splits total into parts that differ by at most one"""
+    return [total // parts + (1 if n < total % parts else 0) for n in range(parts)]
+
+class InventoryCache:
+    """
+    Read-through cache of stock levels kept for the lifetime of a warm container
+
+    Lookups for an order are answered from the cache where possible and
+    all misses are fetched from the backend in one batched call. Entries
+    expire after ttl_seconds and the least recently used are evicted past
+    max_size. Cached stock can be up to ttl_seconds stale, so it is only
+    suitable for the availability check, not for reservations.
+
+    Args:
+        backend: InventoryBackend to read through to
+        ttl_seconds: How long a stock level is reused
+        max_size: Maximum number of cached products
+    """
+
+    def __init__(self, backend: InventoryBackend, ttl_seconds: float = 30, max_size: int = 1024) -> None:
+        self.backend = backend
+        self._cache = TtlCache(ttl_seconds, max_size)
+
+    def get_many(self, product_ids: Iterable[str]) -> Dict[str, int]:
+        """
+        Returns stock for each product, fetching misses in one backend call
+
+        Args:
+            product_ids: Product ids, duplicates are looked up once
+
+        Returns:
+            Available quantity per product id
+        """
+        found = {}
+        missing = []
+        for product_id in dict.fromkeys(product_ids):
+            quantity = self._cache.get(product_id)
+            if quantity is not None:
+                found[product_id] = quantity
+            else:
+                missing.append(product_id)
+
+        if missing:
+            fetched = self.backend.get_stock(missing)
+            for product_id in missing:
+                found[product_id] = fetched.get(product_id, 0)
+                self._cache.put(product_id, found[product_id])
+
+        return found
+
+    def invalidate(self, product_ids: Iterable[str]) -> None:
+        """
+        Drops cached stock, e.g. after this container changed it
+
+        Args:
+            product_ids: Product ids to forget
+        """
+        self._cache.invalidate(product_ids)
+
+    def take_stats(self) -> Dict[str, int]:
+        """
+        Returns hit and miss counts since the previous call and resets them
+
+        Returns:
+            Dict with 'hits' and 'misses'
+        """
+        return self._cache.take_stats()
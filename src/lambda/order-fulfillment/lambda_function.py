@@ -1,103 +1,836 @@
 import json
-import boto3
 import os
-import logging
+import threading
+import time
+import uuid
+from botocore.exceptions import ClientError
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from aws_clients import DynamoDB, LazyClient
+from claim_check import claim_check_from_environment
+from dlq import DlqPublisher
+from idempotency import (
+    Idempotency, IdempotencyInProgressError,
+    DynamoDBIdempotencyStore, InMemoryIdempotencyStore
+)
+from inventory import (
+    DynamoDBInventoryBackend, InMemoryInventoryBackend, InventoryCache, aggregate_quantities
+)
+from metrics import Metrics
+from order_codec import decode_message, is_reference
+from order_status import OrderStatusReader, batch_get_orders
+from saga import DynamoDBCheckpointStore, InMemoryCheckpointStore, Saga, SagaStep
+from structured_logging import setup_logging, start_invocation, bind, log_payload
+from ttl_cache import TtlCache
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = setup_logging()
+
+# Per-step latency metrics, flushed once per invocation
+metrics = Metrics('order-fulfillment')
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-sqs = boto3.client('sqs')
+# Initialize AWS clients, created on first use
+dynamodb = DynamoDB()
+sqs = LazyClient('sqs')
 
 # Environment variables
 ORDERS_TABLE = os.environ['ORDERS_TABLE']
 DLQ_URL = os.environ['DLQ_URL']
+DLQ_SPILL_PATH = os.environ.get('DLQ_SPILL_PATH', '/tmp/order-dlq-spill.jsonl')
+MAX_WORKERS = int(os.environ.get('FULFILLMENT_MAX_WORKERS', '1'))
+STATUS_WRITE_MODE = os.environ.get('STATUS_WRITE_MODE', 'direct')
+LEASE_SECONDS = int(os.environ.get('PROCESSING_LEASE_SECONDS', '300'))
+IDEMPOTENCY_STORE = os.environ.get('IDEMPOTENCY_STORE', '')
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))
+INVENTORY_BACKEND = os.environ.get('INVENTORY_BACKEND', 'simulated')
+RESERVATION_TTL_SECONDS = int(os.environ.get('RESERVATION_TTL_SECONDS', '900'))
+INVENTORY_CACHE_TTL_SECONDS = float(os.environ.get('INVENTORY_CACHE_TTL_SECONDS', '30'))
+INVENTORY_CACHE_SIZE = int(os.environ.get('INVENTORY_CACHE_SIZE', '1024'))
+INVENTORY_SHARDS = int(os.environ.get('INVENTORY_SHARDS', '10'))
+INVENTORY_PROMOTE_THRESHOLD = int(os.environ.get('INVENTORY_PROMOTE_THRESHOLD', '20'))
+SAGA_CHECKPOINT_STORE = os.environ.get('SAGA_CHECKPOINT_STORE', 'memory')
+STEP_WORKERS = int(os.environ.get('FULFILLMENT_STEP_WORKERS', '4'))
+ASYNC_MAX_CONCURRENCY = int(os.environ.get('ASYNC_MAX_CONCURRENCY', '16'))
+STATUS_CACHE_TTL_SECONDS = float(os.environ.get('STATUS_CACHE_TTL_SECONDS', '5'))
+STATUS_CACHE_SIZE = int(os.environ.get('STATUS_CACHE_SIZE', '1024'))
+
+# Stock the simulated inventory service reports for every product
+SIMULATED_STOCK = 10
+
+# TransactWriteItems accepts at most 100 actions per call
+TRANSACT_WRITE_SIZE = 100
+
+# Fulfillment response codes that ask SQS to redeliver the message
+RETRY_STATUS_CODES = (409, 500)
+
+# Attributes fulfillment keeps on the order record, not part of the order itself
+RECORD_ATTRIBUTES = ('status', 'lease_token', 'lease_expires_at', 'saga_checkpoints')
 
 # Initialize DynamoDB table
 orders_table = dynamodb.Table(ORDERS_TABLE)
 
+# Awaitable counterpart for the async handler, created by it on first use
+# so asyncio stays off the synchronous handler's import path
+async_orders_table = None
+
+# Status reads project only the status attributes; every status this
+# container writes is invalidated in the cache
+status_reader = OrderStatusReader(
+    dynamodb, ORDERS_TABLE,
+    TtlCache(STATUS_CACHE_TTL_SECONDS, STATUS_CACHE_SIZE) if STATUS_CACHE_TTL_SECONDS > 0 else None
+)
+
+# Large order bodies arrive as pointers to blob storage, and large DLQ
+# messages leave as pointers
+claim_check = claim_check_from_environment()
+
+# Failed orders are sent to the DLQ in batches at the end of each
+# invocation; messages the DLQ refuses are kept in the claim-check store
+dlq_publisher = DlqPublisher(sqs, DLQ_URL, spill_path=DLQ_SPILL_PATH, claim_check=claim_check)
+
+# Initialize idempotency layer, disabled unless a store is configured
+if IDEMPOTENCY_STORE == 'dynamodb':
+    idempotency = Idempotency(
+        DynamoDBIdempotencyStore(dynamodb.Table(os.environ['IDEMPOTENCY_TABLE'])),
+        ttl_seconds=IDEMPOTENCY_TTL_SECONDS
+    )
+elif IDEMPOTENCY_STORE == 'memory':
+    idempotency = Idempotency(InMemoryIdempotencyStore(), ttl_seconds=IDEMPOTENCY_TTL_SECONDS)
+else:
+    idempotency = None
+
+# Initialize inventory, simulated unless the DynamoDB tables are configured
+if INVENTORY_BACKEND == 'dynamodb':
+    inventory_backend = DynamoDBInventoryBackend(
+        dynamodb, os.environ['INVENTORY_TABLE'], os.environ['RESERVATIONS_TABLE'],
+        shard_count=INVENTORY_SHARDS,
+        promote_threshold=INVENTORY_PROMOTE_THRESHOLD
+    )
+else:
+    inventory_backend = InMemoryInventoryBackend(default_stock=SIMULATED_STOCK, deplete=False)
+
+# Stock lookups are cached for the lifetime of the container
+inventory_cache = InventoryCache(
+    inventory_backend,
+    ttl_seconds=INVENTORY_CACHE_TTL_SECONDS,
+    max_size=INVENTORY_CACHE_SIZE
+)
+
 class FulfillmentError(Exception):
     """Custom exception for fulfillment errors"""
     pass
 
+class StatusWriteBuffer:
+    """
+    Collects terminal status writes for a batch and flushes them together
+    
+    Writes are sent with TransactWriteItems in chunks of 100. If a chunk is
+    cancelled, its writes are retried one by one so a single lost lease
+    does not fail the rest of the batch.
+    """
+    
+    def __init__(self) -> None:
+        self._updates = []
+        self._lock = threading.Lock()
+    
+    def add(self, update: Dict[str, Any]) -> None:
+        with self._lock:
+            self._updates.append(update)
+    
+    def flush(self) -> List[str]:
+        """
+        Writes all buffered updates
+        
+        Returns:
+            IDs of orders whose status could not be written
+        """
+        with self._lock:
+            updates, self._updates = self._updates, []
+        
+        failed = []
+        for start in range(0, len(updates), TRANSACT_WRITE_SIZE):
+            chunk = updates[start:start + TRANSACT_WRITE_SIZE]
+            try:
+                dynamodb.transact_write_items(
+                    TransactItems=[{'Update': dict(update, TableName=ORDERS_TABLE)} for update in chunk]
+                )
+                continue
+            except Exception as e:
+                logger.warning("Transactional status write failed, writing individually: %s", e)
+            
+            for update in chunk:
+                order_id = update['Key']['order_id']
+                try:
+                    orders_table.update_item(**update)
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        logger.error("Failed to update order status: %s", e)
+                        failed.append(order_id)
+                    else:
+                        logger.warning("Lease lost before status write: %s", order_id)
+                except Exception as e:
+                    logger.error("Failed to update order status: %s", e)
+                    failed.append(order_id)
+        
+        status_reader.invalidate(update['Key']['order_id'] for update in updates)
+        logger.info("Flushed %s status writes, %s failed", len(updates), len(failed))
+        
+        return failed
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Processes order fulfillment
     
     Args:
-        event: Lambda event containing order data
+        event: Lambda event containing order data, either a single order
+            (Step Functions) or an SQS batch
         context: Lambda context
         
     Returns:
-        Dict containing fulfillment status
+        Dict containing fulfillment status, or the SQS partial batch
+        response when invoked with SQS records
     """
+    start_invocation(context)
+    log_payload(logger, "Processing order fulfillment", event)
+    
     try:
-        logger.info(f"Processing order fulfillment: {json.dumps(event)}")
+        if event.get('reclaim_reservations'):
+            # The same schedule evens out sharded hot products
+            return {
+                'reclaimed': inventory_backend.reclaim_expired(int(time.time())),
+                'rebalanced': inventory_backend.rebalance()
+            }
         
-        # Extract order data
-        if 'order' in event:
-            order_data = event['order']
-        else:
-            # Handle SQS event format
-            order_data = json.loads(event['Records'][0]['body'])
+        if 'Records' in event:
+            return process_sqs_batch(event['Records'])
+        
+        return fulfill_order(event.get('order', {}))
+    finally:
+        end_invocation()
+
+def async_lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Processes SQS batches of orders on an event loop
+    
+    Alternative entry point to lambda_handler. Orders of the batch are
+    fulfilled as tasks, at most ASYNC_MAX_CONCURRENCY at a time, with
+    status writes awaited on the async client. The
+    fulfillment steps themselves are shared with the sync path and run
+    off the loop.
+    
+    Anything other than an SQS batch in 'direct' status write mode is
+    handed to lambda_handler.
+    
+    Args:
+        event: Lambda event
+        context: Lambda context
+        
+    Returns:
+        SQS partial batch response, or whatever lambda_handler returns
+    """
+    if 'Records' not in event or STATUS_WRITE_MODE != 'direct':
+        return lambda_handler(event, context)
+    
+    import asyncio
+    from async_clients import AsyncDynamoDB
+    
+    global async_orders_table
+    if async_orders_table is None:
+        async_orders_table = AsyncDynamoDB().Table(ORDERS_TABLE)
+    
+    start_invocation(context)
+    log_payload(logger, "Processing order fulfillment", event)
+    
+    try:
+        return asyncio.run(process_sqs_batch_async(event['Records']))
+    finally:
+        end_invocation()
+
+def end_invocation() -> None:
+    """Sends the invocation's DLQ messages and writes its metrics"""
+    try:
+        dlq_stats = dlq_publisher.flush()
+        metrics.add_count('DlqMessagesSent', dlq_stats['sent'])
+        metrics.add_count('DlqMessagesSpilled', dlq_stats['spilled'])
+    except Exception as e:
+        logger.error("Failed to flush DLQ messages: %s", e)
+    
+    cache_stats = inventory_cache.take_stats()
+    metrics.add_count('InventoryCacheHits', cache_stats['hits'])
+    metrics.add_count('InventoryCacheMisses', cache_stats['misses'])
+    metrics.flush()
+
+def process_sqs_batch(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fulfills every order in an SQS batch
+    
+    Orders that fail fulfillment are marked FAILED and sent to the DLQ as
+    usual. Only records that hit an unexpected error are reported back so
+    SQS redelivers just those messages.
+    
+    With FULFILLMENT_MAX_WORKERS above 1, independent orders are fulfilled
+    concurrently on a bounded thread pool. Records for the same order_id
+    always run one after another on the same worker.
+    
+    With STATUS_WRITE_MODE set to 'lease', the terminal status writes of
+    the whole batch are buffered and flushed together at the end.
+    
+    Args:
+        records: SQS event records
+        
+    Returns:
+        Partial batch response with the message IDs to redeliver
+    """
+    groups = group_records(records)
+    status_buffer = StatusWriteBuffer() if STATUS_WRITE_MODE == 'lease' else None
+    
+    def process_group(group):
+        return process_records(group, status_buffer)
+    
+    max_workers = min(MAX_WORKERS, len(groups))
+    if max_workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            failed_groups = list(executor.map(process_group, groups.values()))
+    else:
+        failed_groups = [process_group(group) for group in groups.values()]
+    
+    failed_ids = {message_id for group in failed_groups for message_id in group}
+    
+    # Orders whose buffered status write was lost are redelivered
+    if status_buffer is not None:
+        for order_id in status_buffer.flush():
+            failed_ids.update(message_id for message_id, _ in groups[order_id])
+    
+    return batch_response(records, failed_ids)
+
+async def process_sqs_batch_async(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fulfills every order in an SQS batch as concurrent tasks
+    
+    Same grouping and retry semantics as process_sqs_batch, with a
+    semaphore bounding how many orders are in flight.
+    
+    Args:
+        records: SQS event records
         
+    Returns:
+        Partial batch response with the message IDs to redeliver
+    """
+    import asyncio
+    from async_clients import run_blocking
+    
+    semaphore = asyncio.Semaphore(ASYNC_MAX_CONCURRENCY)
+    
+    async def process_group(group):
+        failed_ids = []
+        for message_id, order_data in group:
+            if order_data is None:
+                failed_ids.append(message_id)
+                continue
+            async with semaphore:
+                response = await fulfill_order_async(order_data)
+            if response['statusCode'] in RETRY_STATUS_CODES:
+                failed_ids.append(message_id)
+        return failed_ids
+    
+    # Decoding may read offloaded bodies from blob storage
+    groups = await run_blocking(group_records, records)
+    failed_groups = await asyncio.gather(*(process_group(group) for group in groups.values()))
+    
+    return batch_response(records, {message_id for group in failed_groups for message_id in group})
+
+def group_records(records: List[Dict[str, Any]]) -> Dict[Any, List[Tuple[str, Optional[Dict[str, Any]]]]]:
+    """
+    Decodes SQS records and groups them by order
+    
+    Records for the same order are kept together, in delivery order, so
+    repeated deliveries never race each other. Offloaded bodies are read
+    back from blob storage and binary bodies decoded; a record that
+    cannot be read is redelivered. Thin messages that only carry an
+    order ID are resolved with one consistent batched read of the
+    orders table for the whole SQS batch; a bare order ID without the
+    thin message attribute is treated as unreadable.
+    
+    Args:
+        records: SQS event records
+        
+    Returns:
+        (message ID, order data) pairs per order ID, order data is None
+        for records that could not be decoded
+    """
+    groups = {}
+    references = set()
+    for index, record in enumerate(records):
+        try:
+            attributes = record.get('messageAttributes')
+            order_data = decode_message(claim_check.rehydrate(record['body']), attributes)
+            key = order_data['order_id']
+            if is_reference(attributes):
+                references.add(record['messageId'])
+            elif set(order_data) == {'order_id'}:
+                # A thin body that lost its message_mode attribute is not an order
+                raise ValueError("Order message carries only an order ID")
+        except Exception as e:
+            logger.error("Invalid SQS record %s: %s", record.get('messageId'), e)
+            order_data = None
+            key = index
+        groups.setdefault(key, []).append((record['messageId'], order_data))
+    
+    if references:
+        orders = fetch_orders(list(dict.fromkeys(
+            order_data['order_id'] for group in groups.values()
+            for message_id, order_data in group if message_id in references
+        )))
+        for key, group in groups.items():
+            groups[key] = [
+                (message_id, orders.get(key) if message_id in references else order_data)
+                for message_id, order_data in group
+            ]
+    
+    return groups
+
+def fetch_orders(order_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Reads the stored orders that thin messages refer to
+    
+    Reads are strongly consistent, since the validator queues an order
+    right after writing it.
+    
+    Args:
+        order_ids: Order IDs
+        
+    Returns:
+        Orders by ID, without the status, lease and saga attributes
+        fulfillment keeps on the record; orders that are missing or
+        could not be read are left out, so their messages are redelivered
+    """
+    try:
+        orders, unprocessed = batch_get_orders(dynamodb, ORDERS_TABLE, order_ids, consistent_read=True)
+    except Exception as e:
+        logger.error("Failed to read orders: %s", e)
+        return {}
+    
+    missing = len(order_ids) - len(orders) - len(unprocessed)
+    if missing:
+        logger.error("%s referenced orders not found", missing)
+    
+    # DynamoDB numbers come back as Decimal, validate_order produced int quantities
+    for order in orders.values():
+        for attribute in RECORD_ATTRIBUTES:
+            order.pop(attribute, None)
+        for item in order.get('items', []):
+            item['quantity'] = int(item['quantity'])
+    
+    return orders
+
+def batch_response(records: List[Dict[str, Any]], failed_ids: set) -> Dict[str, Any]:
+    """
+    Builds the SQS partial batch response
+    
+    Args:
+        records: SQS event records
+        failed_ids: Message IDs to redeliver
+        
+    Returns:
+        Partial batch response, failures in record order
+    """
+    batch_item_failures = [
+        {'itemIdentifier': record['messageId']}
+        for record in records if record['messageId'] in failed_ids
+    ]
+    
+    logger.info("Processed %s records, %s to retry", len(records), len(batch_item_failures))
+    
+    return {'batchItemFailures': batch_item_failures}
+
+def process_records(records: List[Tuple[str, Optional[Dict[str, Any]]]],
+                    status_buffer: Optional[StatusWriteBuffer] = None) -> List[str]:
+    """
+    Fulfills decoded SQS records in order
+    
+    Args:
+        records: (message ID, order data) pairs, order data is None for
+            records that could not be decoded
+        status_buffer: Optional buffer for terminal status writes
+        
+    Returns:
+        Message IDs of the records that should be redelivered
+    """
+    failed_ids = []
+    
+    for message_id, order_data in records:
+        if order_data is None or fulfill_order(order_data, status_buffer)['statusCode'] in RETRY_STATUS_CODES:
+            failed_ids.append(message_id)
+    
+    return failed_ids
+
+def fulfill_order(order_data: Dict[str, Any], status_buffer: Optional[StatusWriteBuffer] = None) -> Dict[str, Any]:
+    """
+    Runs a single order through fulfillment and records the outcome
+    
+    In 'lease' status write mode the PROCESSING claim is a conditional
+    write carrying a lease expiry, and the terminal status is written
+    conditionally on still holding that lease.
+    
+    Args:
+        order_data: Order data to fulfill
+        status_buffer: Optional buffer that defers the terminal status write
+        
+    Returns:
+        Dict containing fulfillment status
+    """
+    order_id = None
+    lease_token = None
+    
+    try:
         order_id = order_data['order_id']
+        bind(order_id=order_id)
         
         # Update order status to processing
-        update_order_status(order_id, 'PROCESSING')
+        if STATUS_WRITE_MODE == 'lease':
+            lease_token = claim_order(order_id)
+            if lease_token is None:
+                return lease_conflict_response(order_id)
+        else:
+            update_order_status(order_id, 'PROCESSING')
         
-        # Process fulfillment steps
-        fulfillment_result = process_fulfillment(order_data)
+        # Process fulfillment steps, skipped if a previous delivery completed them
+        fulfillment_result = run_step(order_id, 'fulfillment', process_fulfillment, order_data)
         
         if fulfillment_result['success']:
             # Update order status to fulfilled
-            update_order_status(order_id, 'FULFILLED', fulfillment_result['tracking_number'])
+            record_outcome(order_id, 'FULFILLED', lease_token, status_buffer,
+                           tracking_number=fulfillment_result['tracking_number'])
             
-            logger.info(f"Order fulfilled successfully: {order_id}")
+            logger.info("Order fulfilled successfully: %s", order_id)
             
-            return {
-                'statusCode': 200,
-                'status': 'FULFILLED',
-                'order_id': order_id,
-                'tracking_number': fulfillment_result['tracking_number'],
-                'message': 'Order fulfilled successfully'
-            }
+            return fulfilled_response(order_id, fulfillment_result['tracking_number'])
         else:
             # Update order status to failed
-            update_order_status(order_id, 'FAILED', error=fulfillment_result['error'])
+            record_outcome(order_id, 'FAILED', lease_token, status_buffer,
+                           error=fulfillment_result['error'])
             
             # Send to DLQ for manual review
             send_to_dlq(order_data, fulfillment_result['error'])
             
-            return {
-                'statusCode': 400,
-                'status': 'FAILED',
-                'order_id': order_id,
-                'error': fulfillment_result['error'],
-                'message': 'Order fulfillment failed'
-            }
+            return failed_response(order_id, fulfillment_result['error'])
             
+    except IdempotencyInProgressError as e:
+        logger.info(str(e))
+        return in_progress_response(order_id)
+        
     except Exception as e:
-        logger.error(f"Unexpected error in fulfillment: {str(e)}")
+        logger.error("Unexpected error in fulfillment: %s", e)
         
-        # Try to update order status
-        try:
-            if 'order_id' in locals():
-                update_order_status(order_id, 'FAILED', error=str(e))
-        except:
-            pass
+        if order_id is not None:
+            record_error(order_id, lease_token, str(e))
             
+        return error_response()
+
+async def fulfill_order_async(order_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async counterpart of fulfill_order for 'direct' status write mode
+    
+    Status writes are awaited on the async client. The
+    fulfillment steps are the same as the sync path's and run on the
+    AWS I/O pool, so they never block the event loop.
+    
+    Args:
+        order_data: Order data to fulfill
+        
+    Returns:
+        Dict containing fulfillment status
+    """
+    from async_clients import run_blocking
+    
+    order_id = None
+    
+    try:
+        order_id = order_data['order_id']
+        
+        await update_order_status_async(order_id, 'PROCESSING')
+        
+        fulfillment_result = await run_blocking(run_order_fulfillment, order_data)
+        
+        if fulfillment_result['success']:
+            await update_order_status_async(
+                order_id, 'FULFILLED', tracking_number=fulfillment_result['tracking_number']
+            )
+            logger.info("Order fulfilled successfully: %s", order_id)
+            return fulfilled_response(order_id, fulfillment_result['tracking_number'])
+        
+        await update_order_status_async(order_id, 'FAILED', error=fulfillment_result['error'])
+        send_to_dlq(order_data, fulfillment_result['error'])
+        
+        return failed_response(order_id, fulfillment_result['error'])
+        
+    except IdempotencyInProgressError as e:
+        logger.info(str(e))
+        return in_progress_response(order_id)
+        
+    except Exception as e:
+        logger.error("Unexpected error in fulfillment: %s", e)
+        
+        if order_id is not None:
+            try:
+                await update_order_status_async(order_id, 'FAILED', error=str(e))
+            except Exception as status_error:
+                logger.error("Failed to mark order %s FAILED: %s", order_id, status_error)
+        
+        return error_response()
+
+def run_order_fulfillment(order_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs the fulfillment steps of one order on the calling thread
+    
+    Args:
+        order_data: Order data to fulfill
+        
+    Returns:
+        Fulfillment result
+    """
+    bind(order_id=order_data['order_id'])
+    return run_step(order_data['order_id'], 'fulfillment', process_fulfillment, order_data)
+
+def fulfilled_response(order_id: str, tracking_number: str) -> Dict[str, Any]:
+    return {
+        'statusCode': 200,
+        'status': 'FULFILLED',
+        'order_id': order_id,
+        'tracking_number': tracking_number,
+        'message': 'Order fulfilled successfully'
+    }
+
+def failed_response(order_id: str, error: str) -> Dict[str, Any]:
+    return {
+        'statusCode': 400,
+        'status': 'FAILED',
+        'order_id': order_id,
+        'error': error,
+        'message': 'Order fulfillment failed'
+    }
+
+def in_progress_response(order_id: str) -> Dict[str, Any]:
+    return {
+        'statusCode': 409,
+        'status': 'IN_PROGRESS',
+        'order_id': order_id,
+        'message': 'Order is being fulfilled by another invocation'
+    }
+
+def error_response() -> Dict[str, Any]:
+    return {
+        'statusCode': 500,
+        'status': 'ERROR',
+        'error': 'Internal server error',
+        'message': 'An unexpected error occurred during fulfillment'
+    }
+
+def claim_order(order_id: str) -> Optional[str]:
+    """
+    Marks an order PROCESSING under a time-limited lease
+    
+    The claim succeeds unless the order is already fulfilled or another
+    invocation holds an unexpired lease on it.
+    
+    Args:
+        order_id: Order ID to claim
+        
+    Returns:
+        Lease token, or None if the order could not be claimed
+    """
+    lease_token = str(uuid.uuid4())
+    now = int(time.time())
+    
+    try:
+        orders_table.update_item(
+            Key={'order_id': order_id},
+            UpdateExpression="SET #status = :processing, updated_at = :updated_at, "
+                             "lease_token = :token, lease_expires_at = :expires",
+            ConditionExpression="attribute_not_exists(#status) OR "
+                                "(#status <> :processing AND #status <> :fulfilled) OR "
+                                "lease_expires_at < :now",
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':processing': 'PROCESSING',
+                ':fulfilled': 'FULFILLED',
+                ':updated_at': datetime.utcnow().isoformat(),
+                ':token': lease_token,
+                ':expires': now + LEASE_SECONDS,
+                ':now': now
+            }
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            logger.info("Order %s is already claimed or fulfilled", order_id)
+            return None
+        logger.error("Failed to claim order: %s", e)
+        raise
+    
+    status_reader.invalidate([order_id])
+    logger.info("Claimed order %s until %s", order_id, now + LEASE_SECONDS)
+    
+    return lease_token
+
+def lease_conflict_response(order_id: str) -> Dict[str, Any]:
+    """
+    Builds the response for an order that could not be claimed
+    
+    If the status cannot be read the order is reported in progress, so
+    the message is redelivered and nothing is written.
+    
+    Args:
+        order_id: Order ID that could not be claimed
+        
+    Returns:
+        Dict containing fulfillment status
+    """
+    # Another invocation holds the order, so a cached status may be stale
+    try:
+        order_status = status_reader.get(order_id, consistent_read=True)
+    except Exception as e:
+        logger.warning("Failed to read status of claimed order %s: %s", order_id, e)
+        return in_progress_response(order_id)
+    
+    if order_status is not None and order_status.status == 'FULFILLED':
         return {
-            'statusCode': 500,
-            'status': 'ERROR',
-            'error': 'Internal server error',
-            'message': 'An unexpected error occurred during fulfillment'
+            'statusCode': 200,
+            'status': 'FULFILLED',
+            'order_id': order_id,
+            'tracking_number': order_status.tracking_number,
+            'message': 'Order already fulfilled'
         }
+    
+    return in_progress_response(order_id)
+
+def record_outcome(order_id: str, status: str, lease_token: Optional[str],
+                   status_buffer: Optional[StatusWriteBuffer] = None,
+                   tracking_number: str = None, error: str = None) -> None:
+    """
+    Writes the terminal status of an order
+    
+    Without a lease this is a plain status update. With a lease the write
+    is conditional on still holding it, and is deferred to the buffer when
+    one is given.
+    
+    Args:
+        order_id: Order ID to update
+        status: Terminal status
+        lease_token: Lease token from claim_order, if any
+        status_buffer: Optional buffer that defers the write
+        tracking_number: Optional tracking number
+        error: Optional error message
+    """
+    if lease_token is None:
+        update_order_status(order_id, status, tracking_number, error=error)
+        return
+    
+    update = build_terminal_update(order_id, status, lease_token, tracking_number, error)
+    
+    if status_buffer is not None:
+        status_buffer.add(update)
+        return
+    
+    try:
+        orders_table.update_item(**update)
+        logger.info("Updated order %s status to %s", order_id, status)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            logger.error("Failed to update order status: %s", e)
+            raise
+        logger.warning("Lease lost before status write: %s", order_id)
+    finally:
+        status_reader.invalidate([order_id])
+
+def record_error(order_id: str, lease_token: Optional[str], error: str) -> None:
+    """
+    Marks an order FAILED after an unexpected error, best effort
+    
+    In 'lease' status write mode the write is conditional on the lease
+    this invocation holds, and skipped when no lease was acquired, so an
+    order that is fulfilled or leased elsewhere is never overwritten.
+    
+    Args:
+        order_id: Order ID to update
+        lease_token: Lease token from claim_order, if any
+        error: Error message
+    """
+    if STATUS_WRITE_MODE == 'lease' and lease_token is None:
+        logger.warning("No lease held on order %s, leaving its status", order_id)
+        return
+    
+    try:
+        record_outcome(order_id, 'FAILED', lease_token, error=error)
+    except Exception as e:
+        logger.error("Failed to mark order %s FAILED: %s", order_id, e)
+
+def build_terminal_update(order_id: str, status: str, lease_token: str,
+                          tracking_number: str = None, error: str = None) -> Dict[str, Any]:
+    """
+    Builds a conditional terminal status update that releases the lease
+    
+    Args:
+        order_id: Order ID to update
+        status: Terminal status
+        lease_token: Lease token the write is conditional on
+        tracking_number: Optional tracking number
+        error: Optional error message
+        
+    Returns:
+        UpdateItem parameters, without the table name
+    """
+    update_expression = "SET #status = :status, updated_at = :updated_at"
+    expression_values = {
+        ':status': status,
+        ':updated_at': datetime.utcnow().isoformat(),
+        ':token': lease_token
+    }
+    
+    if tracking_number:
+        update_expression += ", tracking_number = :tracking_number"
+        expression_values[':tracking_number'] = tracking_number
+    
+    if error:
+        update_expression += ", error_message = :error"
+        expression_values[':error'] = error
+    
+    return {
+        'Key': {'order_id': order_id},
+        'UpdateExpression': update_expression + " REMOVE lease_token, lease_expires_at",
+        'ConditionExpression': "lease_token = :token",
+        'ExpressionAttributeNames': {'#status': 'status'},
+        'ExpressionAttributeValues': expression_values
+    }
+
+def run_step(order_id: str, step: str, func: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    """
+    Runs a fulfillment step through the idempotency layer when enabled
+    
+    Args:
+        order_id: Order the step belongs to
+        step: Fulfillment step name
+        func: Step function
+        
+    Returns:
+        Step result
+    """
+    if idempotency is None:
+        return func(*args)
+    return idempotency.run(order_id, step, func, *args)
+
+def forget_step(order_id: str, step: str) -> None:
+    """
+    Clears the idempotency record of a step that has been compensated
+    
+    Args:
+        order_id: Order the step belongs to
+        step: Fulfillment step name
+    """
+    if idempotency is not None:
+        idempotency.invalidate(order_id, step)
 
 def update_order_status(order_id: str, status: str, tracking_number: str = None, error: str = None) -> None:
     """
@@ -110,38 +843,82 @@ def update_order_status(order_id: str, status: str, tracking_number: str = None,
         error: Optional error message
     """
     try:
-        update_expression = "SET #status = :status, updated_at = :updated_at"
-        expression_values = {
-            ':status': status,
-            ':updated_at': datetime.utcnow().isoformat()
-        }
-        expression_names = {'#status': 'status'}
-        
-        if tracking_number:
-            update_expression += ", tracking_number = :tracking_number"
-            expression_values[':tracking_number'] = tracking_number
-            
-        if error:
-            update_expression += ", error_message = :error"
-            expression_values[':error'] = error
+        orders_table.update_item(**build_status_update(order_id, status, tracking_number, error))
         
-        orders_table.update_item(
-            Key={'order_id': order_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_values,
-            ExpressionAttributeNames=expression_names
-        )
-        
-        logger.info(f"Updated order {order_id} status to {status}")
+        logger.info("Updated order %s status to %s", order_id, status)
         
     except Exception as e:
-        logger.error(f"Failed to update order status: {str(e)}")
+        logger.error("Failed to update order status: %s", e)
         raise
+        
+    finally:
+        # Also after a failed write, whose outcome is unknown
+        status_reader.invalidate([order_id])
+
+async def update_order_status_async(order_id: str, status: str, tracking_number: str = None,
+                                    error: str = None) -> None:
+    """
+    Async counterpart of update_order_status
+    
+    Args:
+        order_id: Order ID to update
+        status: New status
+        tracking_number: Optional tracking number
+        error: Optional error message
+    """
+    try:
+        await async_orders_table.update_item(**build_status_update(order_id, status, tracking_number, error))
+        
+        logger.info("Updated order %s status to %s", order_id, status)
+        
+    finally:
+        status_reader.invalidate([order_id])
+
+def build_status_update(order_id: str, status: str, tracking_number: str = None, error: str = None) -> Dict[str, Any]:
+    """
+    Builds an unconditional order status update
+    
+    Args:
+        order_id: Order ID to update
+        status: New status
+        tracking_number: Optional tracking number
+        error: Optional error message
+        
+    Returns:
+        UpdateItem parameters, without the table name
+    """
+    update_expression = "SET #status = :status, updated_at = :updated_at"
+    expression_values = {
+        ':status': status,
+        ':updated_at': datetime.utcnow().isoformat()
+    }
+    
+    if tracking_number:
+        update_expression += ", tracking_number = :tracking_number"
+        expression_values[':tracking_number'] = tracking_number
+        
+    if error:
+        update_expression += ", error_message = :error"
+        expression_values[':error'] = error
+    
+    return {
+        'Key': {'order_id': order_id},
+        'UpdateExpression': update_expression,
+        'ExpressionAttributeValues': expression_values,
+        'ExpressionAttributeNames': {'#status': 'status'}
+    }
 
+@metrics.timed('process_fulfillment')
 def process_fulfillment(order_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Processes the actual fulfillment steps
     
+    The steps run as a checkpointed saga: a retried order resumes after
+    its last completed step, and a failed step
+    compensates the completed ones. Inventory reservation and payment
+    only depend on the inventory check and run concurrently; shipment
+    waits for both.
+    
     Args:
         order_data: Order data to fulfill
         
@@ -150,119 +927,207 @@ def process_fulfillment(order_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     try:
         order_id = order_data['order_id']
-        items = order_data['items']
-        
-        # Step 1: Check inventory
-        inventory_check = check_inventory(items)
-        if not inventory_check['available']:
-            return {
-                'success': False,
-                'error': f"Insufficient inventory: {inventory_check['message']}"
-            }
-        
-        # Step 2: Reserve inventory
-        reservation_result = reserve_inventory(items)
-        if not reservation_result['success']:
-            return {
-                'success': False,
-                'error': f"Failed to reserve inventory: {reservation_result['error']}"
-            }
+        outcome = fulfillment_saga.run(order_id, order_data)
         
-        # Step 3: Process payment (simulation)
-        payment_result = process_payment(order_data)
-        if not payment_result['success']:
-            # Release reserved inventory
-            release_inventory(items)
+        if not outcome['success']:
             return {
                 'success': False,
-                'error': f"Payment failed: {payment_result['error']}"
-            }
-        
-        # Step 4: Create shipment
-        shipment_result = create_shipment(order_data)
-        if not shipment_result['success']:
-            # Release reserved inventory and refund payment
-            release_inventory(items)
-            refund_payment(order_data)
-            return {
-                'success': False,
-                'error': f"Shipment creation failed: {shipment_result['error']}"
+                'error': f"{STEP_FAILURES[outcome['step']]}: {outcome['result']['error']}"
             }
         
         return {
             'success': True,
-            'tracking_number': shipment_result['tracking_number']
+            'tracking_number': outcome['results']['shipment']['tracking_number']
         }
         
+    except IdempotencyInProgressError:
+        raise
+        
     except Exception as e:
-        logger.error(f"Error in fulfillment processing: {str(e)}")
+        logger.error("Error in fulfillment processing: %s", e)
+        # The order is failed for good, so give back whatever it holds
+        try:
+            fulfillment_saga.abort(order_data['order_id'], order_data)
+        except Exception as abort_error:
+            logger.error("Failed to compensate fulfillment: %s", abort_error)
         return {
             'success': False,
             'error': str(e)
         }
 
-def check_inventory(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+def order_step(func: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], Any]:
     """
-    Simulates inventory checking
+    Binds the order's log fields in whichever saga thread runs the step
+    
+    Args:
+        func: Saga action or compensation taking the order data
+        
+    Returns:
+        Wrapped function
     """
-    # Simulation: randomly fail some orders for testing
-    import random
+    def wrapper(order_data: Dict[str, Any]) -> Any:
+        bind(order_id=order_data['order_id'])
+        return func(order_data)
     
-    for item in items:
-        # Simulate out of stock for high quantities
-        if item['quantity'] > 10:
+    return wrapper
+
+@order_step
+def inventory_check_step(order_data: Dict[str, Any]) -> Dict[str, Any]:
+    check = check_inventory(order_data['items'])
+    return {'success': check['available'], 'error': check.get('message')}
+
+@order_step
+def reservation_step(order_data: Dict[str, Any]) -> Dict[str, Any]:
+    return run_step(order_data['order_id'], 'reservation', reserve_inventory,
+                    order_data['order_id'], order_data['items'])
+
+@order_step
+def release_step(order_data: Dict[str, Any]) -> None:
+    release_inventory(order_data['order_id'])
+    forget_step(order_data['order_id'], 'reservation')
+
+@order_step
+def payment_step(order_data: Dict[str, Any]) -> Dict[str, Any]:
+    return run_step(order_data['order_id'], 'payment', process_payment, order_data)
+
+@order_step
+def refund_step(order_data: Dict[str, Any]) -> None:
+    refund_payment(order_data)
+    forget_step(order_data['order_id'], 'payment')
+
+@order_step
+def shipment_step(order_data: Dict[str, Any]) -> Dict[str, Any]:
+    return run_step(order_data['order_id'], 'shipment', create_shipment, order_data)
+
+@order_step
+def commit_step(order_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Keeps the reserved stock for good
+    commit_inventory(order_data['order_id'])
+    return {'success': True}
+
+# Error prefix reported when a step fails
+STEP_FAILURES = {
+    'inventory_check': 'Insufficient inventory',
+    'reservation': 'Failed to reserve inventory',
+    'payment': 'Payment failed',
+    'shipment': 'Shipment creation failed',
+    'commit': 'Failed to commit inventory'
+}
+
+# Checkpoints stay in the container unless kept on the order record, which
+# costs a consistent read per order and a write per completed step
+if SAGA_CHECKPOINT_STORE == 'order':
+    saga_store = DynamoDBCheckpointStore(orders_table)
+else:
+    saga_store = InMemoryCheckpointStore()
+
+fulfillment_saga = Saga([
+    SagaStep('inventory_check', inventory_check_step),
+    SagaStep('reservation', reservation_step, release_step, depends_on=['inventory_check']),
+    SagaStep('payment', payment_step, refund_step, depends_on=['inventory_check']),
+    SagaStep('shipment', shipment_step, depends_on=['reservation', 'payment']),
+    SagaStep('commit', commit_step)
+], saga_store, max_workers=STEP_WORKERS)
+
+@metrics.timed('check_inventory', ok=lambda result: result['available'])
+def check_inventory(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Checks every product of the order has enough stock
+    
+    Stock levels come from the warm-container inventory cache, with all
+    uncached products fetched in one backend call.
+    
+    Args:
+        items: Order items
+        
+    Returns:
+        Dict with 'available' and, when unavailable, a 'message'
+    """
+    requested = aggregate_quantities(items)
+    stock = inventory_cache.get_many(requested)
+    for product_id, quantity in requested.items():
+        if quantity > stock[product_id]:
             return {
                 'available': False,
-                'message': f"Product {item['product_id']} - requested {item['quantity']}, available 10"
+                'message': f"Product {product_id} - requested {quantity}, available {stock[product_id]}"
             }
     
     return {'available': True}
 
-def reserve_inventory(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+@metrics.timed('reserve_inventory')
+def reserve_inventory(order_id: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
-    Simulates inventory reservation
+    Reserves stock for every product of the order atomically
+    
+    Duplicate product lines are reserved as one quantity. The reservation
+    expires after RESERVATION_TTL_SECONDS unless committed or released.
+    
+    Args:
+        order_id: Order to reserve for
+        items: Order items
+        
+    Returns:
+        Dict with success status and, on failure, the error
     """
-    # In a real system, this would update inventory management system
-    logger.info(f"Reserved inventory for {len(items)} items")
-    return {'success': True}
+    quantities = aggregate_quantities(items)
+    result = inventory_backend.reserve(order_id, quantities, int(time.time()) + RESERVATION_TTL_SECONDS)
+    inventory_cache.invalidate(quantities)
+    if result['success']:
+        logger.info("Reserved inventory for %s products", len(quantities))
+    return result
 
-def release_inventory(items: List[Dict[str, Any]]) -> None:
+@metrics.timed('release_inventory')
+def release_inventory(order_id: str) -> None:
     """
-    Simulates inventory release
+    Returns the order's reserved stock
+    
+    Args:
+        order_id: Order whose reservation is released
+    """
+    if inventory_backend.release(order_id):
+        logger.info("Released inventory for order %s", order_id)
+
+@metrics.timed('commit_inventory')
+def commit_inventory(order_id: str) -> None:
+    """
+    Consumes the order's reserved stock once the order has shipped
+    
+    Args:
+        order_id: Order whose reservation is committed
     """
-    logger.info(f"Released inventory for {len(items)} items")
+    if not inventory_backend.commit(order_id):
+        logger.warning("No inventory reservation to commit for order %s", order_id)
 
+@metrics.timed('process_payment')
 def process_payment(order_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Simulates payment processing
     """
-    import random
-    
     # Simulate payment failure for orders over $1000
-    if float(order_data['total_amount']) > 1000:
+    if Decimal(str(order_data['total_amount'])) > 1000:
         return {
             'success': False,
             'error': 'Payment declined - amount exceeds limit'
         }
     
-    logger.info(f"Payment processed for order {order_data['order_id']}")
+    logger.info("Payment processed for order %s", order_data['order_id'])
     return {'success': True}
 
+@metrics.timed('refund_payment')
 def refund_payment(order_data: Dict[str, Any]) -> None:
     """
     Simulates payment refund
     """
-    logger.info(f"Payment refunded for order {order_data['order_id']}")
+    logger.info("Payment refunded for order %s", order_data['order_id'])
 
+@metrics.timed('create_shipment')
 def create_shipment(order_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Simulates shipment creation
     """
-    import uuid
-    
     tracking_number = f"TRK{str(uuid.uuid4())[:8].upper()}"
     
-    logger.info(f"Shipment created for order {order_data['order_id']}: {tracking_number}")
+    logger.info("Shipment created for order %s: %s", order_data['order_id'], tracking_number)
     
     return {
         'success': True,
@@ -271,21 +1136,19 @@ def create_shipment(order_data: Dict[str, Any]) -> Dict[str, Any]:
 
 def send_to_dlq(order_data: Dict[str, Any], error: str) -> None:
     """
-    Sends failed order to Dead Letter Queue
+    Queues a failed order for the Dead Letter Queue
+    
+    Messages are sent in batches when the invocation ends, see DlqPublisher.
     """
-    try:
-        message_body = json.dumps({
-            'order': order_data,
-            'error': error,
-            'failed_at': datetime.utcnow().isoformat()
-        }, default=str)
-        
-        sqs.send_message(
-            QueueUrl=DLQ_URL,
-            MessageBody=message_body
-        )
-        
-        logger.info(f"Order sent to DLQ: {order_data['order_id']}")
-        
-    except Exception as e:
-        logger.error(f"Failed to send to DLQ: {str(e)}")
+    dlq_publisher.add(claim_check.offload(dlq_message(order_data, error), order_id=order_data['order_id']))
+    logger.info("Order queued for DLQ: %s", order_data['order_id'])
+
+def dlq_message(order_data: Dict[str, Any], error: str) -> str:
+    """
+    Builds the DLQ message body for a failed order
+    """
+    return json.dumps({
+        'order': order_data,
+        'error': error,
+        'failed_at': datetime.utcnow().isoformat()
+    }, default=str)
@@ -0,0 +1,230 @@
+import json
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+from ttl_cache import TtlCache
+
+logger = logging.getLogger()
+
+class SagaStep:
+    """
+    One step of a saga
+
+    Args:
+        name: Step name, also the checkpoint key
+        action: Called with the saga context, returns a result dict with 'success'
+        compensation: Called with the saga context to undo a completed action
+        depends_on: Names of the steps that must complete first, defaults
+            to the step declared before this one
+    """
+
+    __slots__ = ('name', 'action', 'compensation', 'depends_on')
+
+    def __init__(self, name: str, action: Callable[[Any], Dict[str, Any]],
+                 compensation: Optional[Callable[[Any], None]] = None,
+                 depends_on: Optional[Iterable[str]] = None) -> None:
+        self.name = name
+        self.action = action
+        self.compensation = compensation
+        self.depends_on = None if depends_on is None else tuple(depends_on)
+
+class InMemoryCheckpointStore:
+    """
+    Checkpoints kept in the container's memory
+
+    Only lets a saga resume in the same warm container. Checkpoints
+    expire after ttl_seconds and the least recently used are evicted past
+    max_size, so finished sagas do not pile up in a warm container.
+
+    Args:
+        ttl_seconds: How long a saga can resume from its checkpoints
+        max_size: Maximum number of sagas kept
+    """
+
+    def __init__(self, ttl_seconds: float = 900, max_size: int = 1024) -> None:
+        self._checkpoints = TtlCache(ttl_seconds, max_size)
+
+    def load(self, saga_id: str) -> Dict[str, Dict[str, Any]]:
+        return dict(self._checkpoints.get(saga_id) or {})
+
+    def save(self, saga_id: str, checkpoints: Dict[str, Dict[str, Any]]) -> None:
+        if checkpoints:
+            self._checkpoints.put(saga_id, dict(checkpoints))
+        else:
+            self._checkpoints.invalidate([saga_id])
+
+class DynamoDBCheckpointStore:
+    """
+    Checkpoints kept as one JSON attribute on an existing item, e.g. the order
+
+    Args:
+        table: Table holding the saga's item
+        key_name: Name of the table's hash key, the saga ID is its value
+        attribute: Attribute the checkpoints are stored in
+    """
+
+    def __init__(self, table: Any, key_name: str = 'order_id', attribute: str = 'saga_checkpoints') -> None:
+        self.table = table
+        self.key_name = key_name
+        self.attribute = attribute
+
+    def load(self, saga_id: str) -> Dict[str, Dict[str, Any]]:
+        item = self.table.get_item(
+            Key={self.key_name: saga_id},
+            ProjectionExpression='#checkpoints',
+            ExpressionAttributeNames={'#checkpoints': self.attribute},
+            ConsistentRead=True
+        ).get('Item', {})
+        return json.loads(item[self.attribute]) if self.attribute in item else {}
+
+    def save(self, saga_id: str, checkpoints: Dict[str, Dict[str, Any]]) -> None:
+        if checkpoints:
+            self.table.update_item(
+                Key={self.key_name: saga_id},
+                UpdateExpression='SET #checkpoints = :checkpoints',
+                ExpressionAttributeNames={'#checkpoints': self.attribute},
+                ExpressionAttributeValues={':checkpoints': json.dumps(checkpoints, default=str)}
+            )
+        else:
+            self.table.update_item(
+                Key={self.key_name: saga_id},
+                UpdateExpression='REMOVE #checkpoints',
+                ExpressionAttributeNames={'#checkpoints': self.attribute}
+            )
+
+class Saga:
+    """
+    Runs a graph of steps and compensates the completed ones when a step fails
+
+    A step starts as soon as every step it depends on has completed, so
+    independent steps run concurrently on a thread pool and the saga takes
+    about as long as its longest dependency chain. Once a step fails no
+    new steps start; the ones already running finish and are compensated
+    along with the rest.
+
+    The result of every completed step is checkpointed under the saga ID,
+    so running the same saga again, e.g. after a crashed invocation,
+    resumes after the completed steps instead of repeating them.
+    Exceptions leave the checkpoints in place for that reason; abort()
+    compensates explicitly. Compensations of completed steps are
+    independent of each other and run concurrently.
+
+    Args:
+        steps: Steps in declaration order
+        store: Checkpoint store, see InMemoryCheckpointStore
+        max_workers: Most steps, or compensations, run at once
+    """
+
+    def __init__(self, steps: List[SagaStep], store: Any, max_workers: int = 4) -> None:
+        self.steps = steps
+        self.store = store
+        self.max_workers = max_workers
+        self.dependencies = {}
+        previous = ()
+        for step in steps:
+            depends_on = previous if step.depends_on is None else step.depends_on
+            unknown = set(depends_on) - set(self.dependencies)
+            if unknown:
+                raise ValueError(f"Step {step.name} depends on {', '.join(sorted(unknown))}, "
+                                 f"which must be declared before it")
+            self.dependencies[step.name] = depends_on
+            previous = (step.name,)
+
+    def run(self, saga_id: str, context: Any) -> Dict[str, Any]:
+        """
+        Runs the steps that have not completed yet
+
+        Args:
+            saga_id: ID checkpoints are stored under, e.g. the order ID
+            context: Passed to every action and compensation
+
+        Returns:
+            {'success': True, 'results': step results by name}, or
+            {'success': False, 'step': failed step, 'result': its result}
+            once the completed steps have been compensated
+        """
+        checkpoints = self.store.load(saga_id)
+        if checkpoints:
+            logger.info("Resuming saga %s after %s", saga_id, ', '.join(checkpoints))
+
+        pending = [step for step in self.steps if step.name not in checkpoints]
+        failures = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while True:
+                if not failures and error is None:
+                    for step in [step for step in pending if self._ready(step, checkpoints)]:
+                        pending.remove(step)
+                        running[executor.submit(step.action, context)] = step
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                completed = False
+                for future in done:
+                    step = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        error = error or e
+                        continue
+                    if result.get('success'):
+                        checkpoints[step.name] = result
+                        completed = True
+                    else:
+                        failures[step.name] = result
+                if completed:
+                    self.store.save(saga_id, checkpoints)
+
+        if error is not None:
+            raise error
+
+        if failures:
+            # Report the first failed step in declaration order
+            failed = next(step.name for step in self.steps if step.name in failures)
+            logger.info("Saga %s failed at step %s", saga_id, failed)
+            self._compensate(saga_id, context, checkpoints)
+            return {'success': False, 'step': failed, 'result': failures[failed]}
+
+        return {'success': True, 'results': checkpoints}
+
+    def _ready(self, step: SagaStep, checkpoints: Dict[str, Dict[str, Any]]) -> bool:
+        return all(name in checkpoints for name in self.dependencies[step.name])
+
+    def abort(self, saga_id: str, context: Any) -> None:
+        """
+        Compensates every checkpointed step of a saga
+
+        Args:
+            saga_id: ID checkpoints are stored under
+            context: Passed to every compensation
+        """
+        self._compensate(saga_id, context, self.store.load(saga_id))
+
+    def _compensate(self, saga_id: str, context: Any, checkpoints: Dict[str, Dict[str, Any]]) -> None:
+        compensations = [
+            step for step in self.steps if step.name in checkpoints and step.compensation is not None
+        ]
+
+        def compensate(step):
+            try:
+                step.compensation(context)
+                return step.name
+            except Exception as e:
+                logger.error("Compensation %s failed for saga %s: %s", step.name, saga_id, e)
+                return None
+
+        if len(compensations) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(compensations))) as executor:
+                compensated = list(executor.map(compensate, compensations))
+        else:
+            compensated = [compensate(step) for step in compensations]
+
+        if not checkpoints:
+            return
+        # Steps whose compensation failed stay checkpointed so an abort can retry them
+        failed = {step.name for step, name in zip(compensations, compensated) if name is None}
+        self.store.save(saga_id, {name: result for name, result in checkpoints.items() if name in failed})
@@ -0,0 +1,370 @@
+import base64
+import binascii
+import copy
+import json
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from aws_clients import DynamoDB
+from order_status import OrderStatusReader
+from structured_logging import setup_logging, start_invocation
+from ttl_cache import TtlCache
+
+# Configure logging
+logger = setup_logging()
+
+# Initialize AWS clients, created on first use
+dynamodb = DynamoDB()
+
+# Environment variables
+ORDERS_TABLE = os.environ['ORDERS_TABLE']
+HISTORY_CACHE_TTL_SECONDS = float(os.environ.get('HISTORY_CACHE_TTL_SECONDS', '5'))
+HISTORY_CACHE_SIZE = int(os.environ.get('HISTORY_CACHE_SIZE', '1024'))
+STATUS_CACHE_TTL_SECONDS = float(os.environ.get('STATUS_CACHE_TTL_SECONDS', '5'))
+STATUS_CACHE_SIZE = int(os.environ.get('STATUS_CACHE_SIZE', '4096'))
+
+CUSTOMER_INDEX = 'CustomerIndex'
+
+# Page sizes
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Most orders in one status lookup
+MAX_STATUS_LOOKUP = 100
+
+# Attributes a caller may ask for; order_id and order_date are always returned
+HISTORY_FIELDS = frozenset([
+    'order_id', 'order_date', 'customer_id', 'status', 'total_amount', 'items',
+    'created_at', 'updated_at', 'tracking_number', 'shipping_address'
+])
+DEFAULT_FIELDS = ('order_id', 'order_date', 'status', 'total_amount')
+KEY_FIELDS = ('order_id', 'order_date')
+
+# Sorts after every character of an ISO timestamp, so 'to': '2026-01-31'
+# also matches '2026-01-31T23:59:59'
+RANGE_END_SUFFIX = '~'
+
+# Initialize DynamoDB table
+orders_table = dynamodb.Table(ORDERS_TABLE)
+
+# Pages of hot customers, reused for a few seconds by a warm container
+history_cache = TtlCache(HISTORY_CACHE_TTL_SECONDS, HISTORY_CACHE_SIZE)
+
+# Statuses polled by customer-service tooling, reused for a few seconds
+status_reader = OrderStatusReader(
+    dynamodb, ORDERS_TABLE,
+    TtlCache(STATUS_CACHE_TTL_SECONDS, STATUS_CACHE_SIZE) if STATUS_CACHE_TTL_SECONDS > 0 else None
+)
+
+class HistoryRequestError(Exception):
+    """Raised for an invalid order-history request"""
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Returns one page of a customer's orders, newest first, or the status
+    of a list of orders
+
+    Args:
+        event: {'customer_id': ..., 'from': ..., 'to': ..., 'fields': [...],
+            'limit': ..., 'cursor': ...}; every key but customer_id is
+            optional. {'order_ids': [...]} looks up statuses instead.
+            API Gateway events are read from queryStringParameters, with
+            fields and order_ids comma-separated.
+        context: Lambda context
+
+    Returns:
+        Dict with the page of 'orders' and the 'next_cursor' to pass back
+        for the following page, None on the last page; for a status
+        lookup, the 'orders' found and the IDs 'not_found' or 'unavailable'
+    """
+    try:
+        start_invocation(context)
+        params = event.get('queryStringParameters') or event
+
+        if 'order_ids' in params:
+            return {'statusCode': 200, **lookup_order_statuses(parse_order_ids(params['order_ids']))}
+
+        page = query_order_history(
+            customer_id=params.get('customer_id'),
+            start=params.get('from'),
+            end=params.get('to'),
+            fields=parse_fields(params.get('fields')),
+            limit=parse_limit(params.get('limit')),
+            cursor=params.get('cursor')
+        )
+
+        return {'statusCode': 200, **page}
+
+    except HistoryRequestError as e:
+        logger.warning("Invalid order history request: %s", e)
+        return {
+            'statusCode': 400,
+            'status': 'INVALID_REQUEST',
+            'error': str(e),
+            'message': 'Invalid order history request'
+        }
+
+    except Exception as e:
+        logger.error("Unexpected error: %s", e)
+        return {
+            'statusCode': 500,
+            'status': 'ERROR',
+            'error': 'Internal server error',
+            'message': 'An unexpected error occurred'
+        }
+
+def query_order_history(customer_id: Optional[str], start: Optional[str] = None, end: Optional[str] = None,
+                        fields: Tuple[str, ...] = DEFAULT_FIELDS, limit: int = DEFAULT_PAGE_SIZE,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Queries the CustomerIndex for one page of a customer's orders
+
+    Only the requested attributes are read. Pages are keyed on the
+    whole request, cursor included, and cached for a few seconds.
+
+    Args:
+        customer_id: Customer whose orders are listed
+        start: Earliest order date, ISO 8601, inclusive
+        end: Latest order date, ISO 8601, inclusive; a date covers the whole day
+        fields: Attributes returned per order
+        limit: Most orders in the page
+        cursor: next_cursor of the previous page
+
+    Returns:
+        Dict with 'customer_id', 'orders', 'count' and 'next_cursor'
+
+    Raises:
+        HistoryRequestError: If the request is invalid
+    """
+    if not isinstance(customer_id, str) or not customer_id.strip():
+        raise HistoryRequestError("customer_id is required")
+    customer_id = customer_id.strip()
+
+    cache_key = (customer_id, start, end, fields, limit, cursor)
+    page = history_cache.get(cache_key)
+    if page is not None:
+        # Callers own the page they get back, the cached one stays intact
+        return copy.deepcopy(page)
+
+    params = {
+        'IndexName': CUSTOMER_INDEX,
+        'ScanIndexForward': False,
+        'Limit': limit,
+        **key_condition(customer_id, start, end),
+        **projection(fields)
+    }
+    if cursor is not None:
+        params['ExclusiveStartKey'] = decode_cursor(cursor, customer_id)
+
+    response = orders_table.query(**params)
+    last_key = response.get('LastEvaluatedKey')
+
+    page = {
+        'customer_id': customer_id,
+        'orders': response['Items'],
+        'count': len(response['Items']),
+        'next_cursor': encode_cursor(last_key) if last_key else None
+    }
+    history_cache.put(cache_key, copy.deepcopy(page))
+
+    logger.info("Returned %s orders of customer history", page['count'])
+
+    return page
+
+def lookup_order_statuses(order_ids: List[str]) -> Dict[str, Any]:
+    """
+    Reads the status of several orders with batched, projected reads
+
+    Args:
+        order_ids: Order IDs
+
+    Returns:
+        Dict with the 'orders' found, in request order, the IDs
+        'not_found' and the IDs 'unavailable' after every retry
+    """
+    statuses = status_reader.get_many(order_ids)
+
+    return {
+        'orders': [statuses[order_id].to_dict() for order_id in order_ids if statuses.get(order_id) is not None],
+        'not_found': [order_id for order_id in order_ids if order_id in statuses and statuses[order_id] is None],
+        'unavailable': [order_id for order_id in order_ids if order_id not in statuses]
+    }
+
+def key_condition(customer_id: str, start: Optional[str], end: Optional[str]) -> Dict[str, Any]:
+    """
+    Builds the key condition for a customer and an optional date range
+
+    Args:
+        customer_id: Customer ID
+        start: Earliest order date, inclusive
+        end: Latest order date, inclusive
+
+    Returns:
+        KeyConditionExpression and its attribute values
+    """
+    values = {':customer_id': customer_id}
+    condition = 'customer_id = :customer_id'
+
+    if start is not None:
+        values[':start'] = parse_date(start, 'from')
+    if end is not None:
+        values[':end'] = parse_date(end, 'to') + RANGE_END_SUFFIX
+
+    if start is not None and end is not None:
+        if values[':start'] > values[':end']:
+            raise HistoryRequestError("from must not be after to")
+        condition += ' AND order_date BETWEEN :start AND :end'
+    elif start is not None:
+        condition += ' AND order_date >= :start'
+    elif end is not None:
+        condition += ' AND order_date <= :end'
+
+    return {'KeyConditionExpression': condition, 'ExpressionAttributeValues': values}
+
+def projection(fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Builds a ProjectionExpression for the requested attributes
+
+    Every name goes through ExpressionAttributeNames, since some,
+    e.g. status, are DynamoDB reserved words.
+
+    Args:
+        fields: Attribute names
+
+    Returns:
+        ProjectionExpression and its attribute names
+    """
+    names = {f'#f{i}': field for i, field in enumerate(fields)}
+    return {'ProjectionExpression': ', '.join(names), 'ExpressionAttributeNames': names}
+
+def parse_fields(fields: Any) -> Tuple[str, ...]:
+    """
+    Normalizes requested fields, always including the order's key
+
+    Args:
+        fields: List of names, comma-separated string or None for the defaults
+
+    Returns:
+        Field names without duplicates
+
+    Raises:
+        HistoryRequestError: If a field is not available
+    """
+    if fields is None:
+        return DEFAULT_FIELDS
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+        raise HistoryRequestError("fields must be a list of attribute names")
+
+    unknown = sorted(set(fields) - HISTORY_FIELDS)
+    if unknown:
+        raise HistoryRequestError(f"Unknown fields: {', '.join(unknown)}")
+
+    return tuple(dict.fromkeys(KEY_FIELDS + tuple(fields)))
+
+def parse_order_ids(order_ids: Any) -> List[str]:
+    """
+    Normalizes the order IDs of a status lookup
+
+    Args:
+        order_ids: List of IDs or comma-separated string
+
+    Returns:
+        Order IDs without duplicates
+
+    Raises:
+        HistoryRequestError: If there are no IDs or too many
+    """
+    if isinstance(order_ids, str):
+        order_ids = [order_id.strip() for order_id in order_ids.split(',') if order_id.strip()]
+    if not isinstance(order_ids, list) or not all(isinstance(order_id, str) and order_id for order_id in order_ids):
+        raise HistoryRequestError("order_ids must be a list of order IDs")
+    order_ids = list(dict.fromkeys(order_ids))
+    if not 1 <= len(order_ids) <= MAX_STATUS_LOOKUP:
+        raise HistoryRequestError(f"order_ids must hold between 1 and {MAX_STATUS_LOOKUP} IDs")
+    return order_ids
+
+def parse_limit(limit: Any) -> int:
+    """
+    Validates a page size
+
+    Args:
+        limit: Requested page size or None for the default
+
+    Returns:
+        Page size
+
+    Raises:
+        HistoryRequestError: If the limit is not between 1 and MAX_PAGE_SIZE
+    """
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise HistoryRequestError("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HistoryRequestError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+def parse_date(value: Any, name: str) -> str:
+    """
+    Validates an ISO 8601 date or timestamp
+
+    Args:
+        value: Date to check
+        name: Request parameter, for the error message
+
+    Returns:
+        The date as given
+
+    Raises:
+        HistoryRequestError: If the value is not an ISO 8601 date
+    """
+    try:
+        datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HistoryRequestError(f"{name} must be an ISO 8601 date")
+    return value
+
+def encode_cursor(last_key: Dict[str, Any]) -> str:
+    """
+    Encodes a LastEvaluatedKey as an opaque page cursor
+
+    Args:
+        last_key: LastEvaluatedKey of a CustomerIndex query
+
+    Returns:
+        URL-safe cursor
+    """
+    return base64.urlsafe_b64encode(json.dumps(last_key, sort_keys=True).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str, customer_id: str) -> Dict[str, Any]:
+    """
+    Decodes a page cursor back into an ExclusiveStartKey
+
+    Args:
+        cursor: Cursor from encode_cursor
+        customer_id: Customer of the current request
+
+    Returns:
+        ExclusiveStartKey
+
+    Raises:
+        HistoryRequestError: If the cursor is malformed or belongs to
+            another customer
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (AttributeError, UnicodeEncodeError, binascii.Error, ValueError):
+        raise HistoryRequestError("Invalid cursor")
+
+    if (not isinstance(key, dict) or set(key) != {'order_id', 'customer_id', 'order_date'}
+            or not all(isinstance(value, str) for value in key.values())):
+        raise HistoryRequestError("Invalid cursor")
+    if key['customer_id'] != customer_id:
+        raise HistoryRequestError("Cursor belongs to another customer")
+
+    return key
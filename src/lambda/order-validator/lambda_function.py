@@ -1,29 +1,55 @@
 import json
-import boto3
 import os
-import logging
+import time
 from datetime import datetime
-from decimal import Decimal
-from typing import Dict, Any, Optional
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+
+from aws_clients import DynamoDB, LazyClient
+from claim_check import claim_check_from_environment
+from order_codec import encode_message, reference_message
+from order_schema import OPTIONAL_FIELDS, validate_order_fields
+from structured_logging import setup_logging, start_invocation, bind, log_payload
 
 # Configure logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = setup_logging()
 
-# Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-sqs = boto3.client('sqs')
+# Initialize AWS clients, created on first use
+dynamodb = DynamoDB()
+sqs = LazyClient('sqs')
 
 # Environment variables
 ORDERS_TABLE = os.environ['ORDERS_TABLE']
 ORDER_QUEUE_URL = os.environ['ORDER_QUEUE_URL']
+ORDER_MESSAGE_CODEC = os.environ.get('ORDER_MESSAGE_CODEC', 'json')
+ORDER_MESSAGE_COMPRESS = os.environ.get('ORDER_MESSAGE_COMPRESS', 'false').lower() == 'true'
+ORDER_MESSAGE_MODE = os.environ.get('ORDER_MESSAGE_MODE', 'full')
+
+# Batch API limits and retry settings
+BATCH_WRITE_SIZE = 25
+SEND_BATCH_SIZE = 10
+SEND_BATCH_BYTES = 256 * 1024
+
+# Allowance for the message attributes of one entry, which count towards SEND_BATCH_BYTES
+ATTRIBUTE_BYTES = 1024
+MAX_BATCH_RETRIES = 5
+RETRY_BASE_DELAY = 0.05
+
+# Orders with at least this many lines use the columnar item validator
+COLUMNAR_VALIDATION_THRESHOLD = int(os.environ.get('COLUMNAR_VALIDATION_THRESHOLD', '100'))
 
 # Initialize DynamoDB table
 orders_table = dynamodb.Table(ORDERS_TABLE)
 
+# Large order bodies go to blob storage and are queued as a pointer
+claim_check = claim_check_from_environment()
+
 class OrderValidationError(Exception):
     """Custom exception for order validation errors"""
-    pass
+    
+    def __init__(self, message: str, errors: Optional[List[Dict[str, Any]]] = None) -> None:
+        super().__init__(message)
+        self.errors = errors or []
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -37,7 +63,11 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         Dict containing status and order details
     """
     try:
-        logger.info(f"Processing order validation: {json.dumps(event)}")
+        start_invocation(context)
+        log_payload(logger, "Processing order validation", event)
+        
+        if 'orders' in event:
+            return process_order_batch(event['orders'])
         
         # Extract order data from event
         order_data = event.get('order', {})
@@ -51,7 +81,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Send to processing queue
         queue_order(stored_order)
         
-        logger.info(f"Order validated successfully: {stored_order['order_id']}")
+        logger.info("Order validated successfully: %s", stored_order['order_id'])
         
         return {
             'statusCode': 200,
@@ -61,16 +91,19 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
         
     except OrderValidationError as e:
-        logger.error(f"Order validation failed: {str(e)}")
-        return {
+        logger.error("Order validation failed: %s", e)
+        response = {
             'statusCode': 400,
             'status': 'VALIDATION_FAILED',
             'error': str(e),
             'message': 'Order validation failed'
         }
+        if e.errors:
+            response['errors'] = e.errors
+        return response
         
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         return {
             'statusCode': 500,
             'status': 'ERROR',
@@ -91,57 +124,36 @@ def validate_order(order_data: Dict[str, Any]) -> Dict[str, Any]:
     Raises:
         OrderValidationError: If validation fails
     """
-    required_fields = ['customer_id', 'items', 'total_amount']
-    
-    # Check required fields
-    for field in required_fields:
-        if field not in order_data:
-            raise OrderValidationError(f"Missing required field: {field}")
+    # Check fields against the compiled order schema
+    field_errors = validate_order_fields(order_data)
+    if field_errors:
+        raise OrderValidationError(
+            '; '.join(message for _, message in field_errors),
+            [{'field': field, 'message': message} for field, message in field_errors]
+        )
     
-    # Validate customer_id
     customer_id = order_data['customer_id']
-    if not isinstance(customer_id, str) or len(customer_id.strip()) == 0:
-        raise OrderValidationError("Invalid customer_id")
-    
-    # Validate items
     items = order_data['items']
-    if not isinstance(items, list) or len(items) == 0:
-        raise OrderValidationError("Order must contain at least one item")
     
-    total_calculated = Decimal('0')
-    validated_items = []
-    
-    for item in items:
-        if not all(k in item for k in ['product_id', 'quantity', 'price']):
-            raise OrderValidationError("Each item must have product_id, quantity, and price")
-        
-        quantity = int(item['quantity'])
-        price = Decimal(str(item['price']))
-        
-        if quantity <= 0:
-            raise OrderValidationError("Item quantity must be positive")
-        
-        if price <= 0:
-            raise OrderValidationError("Item price must be positive")
-        
-        item_total = price * quantity
-        total_calculated += item_total
-        
-        validated_items.append({
-            'product_id': str(item['product_id']),
-            'quantity': quantity,
-            'price': price,
-            'total': item_total
-        })
+    if len(items) >= COLUMNAR_VALIDATION_THRESHOLD:
+        validated_items, total_calculated = validate_items_columnar(items)
+    else:
+        validated_items, total_calculated = validate_items(items)
     
     # Validate total amount
-    provided_total = Decimal(str(order_data['total_amount']))
+    try:
+        provided_total = Decimal(str(order_data['total_amount']))
+    except InvalidOperation:
+        raise OrderValidationError("Invalid total_amount")
+    if not provided_total.is_finite():
+        raise OrderValidationError("Invalid total_amount")
     if abs(total_calculated - provided_total) > Decimal('0.01'):
         raise OrderValidationError("Total amount does not match sum of items")
     
     # Generate order ID and timestamp
     import uuid
     order_id = str(uuid.uuid4())
+    bind(order_id=order_id)
     timestamp = datetime.utcnow().isoformat()
     
     validated_order = {
@@ -150,12 +162,154 @@ def validate_order(order_data: Dict[str, Any]) -> Dict[str, Any]:
         'items': validated_items,
         'total_amount': total_calculated,
         'status': 'VALIDATED',
+        # Sort key of the CustomerIndex, which order history is read from
+        'order_date': timestamp,
         'created_at': timestamp,
         'updated_at': timestamp
     }
     
+    for field in OPTIONAL_FIELDS:
+        if field in order_data:
+            validated_order[field] = order_data[field]
+    
     return validated_order
 
+def validate_items(items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Decimal]:
+    """
+    Validates order lines one by one, stopping at the first bad line
+    
+    Line shape is checked by the order schema, so every line is a dict
+    holding product_id, quantity and price.
+    
+    Args:
+        items: Order lines that passed validate_order_fields
+        
+    Returns:
+        Validated lines and the order total
+        
+    Raises:
+        OrderValidationError: If a line is invalid
+    """
+    total_calculated = Decimal('0')
+    validated_items = []
+    
+    for item in items:
+        try:
+            quantity = int(item['quantity'])
+        except (TypeError, ValueError, ArithmeticError):
+            quantity = None
+        if quantity is None or quantity <= 0:
+            raise OrderValidationError("Item quantity must be positive")
+        
+        try:
+            price = decimal_from_value(item['price'])
+        except (TypeError, ValueError, ArithmeticError):
+            price = None
+        if price is None or not price.is_finite() or price <= 0:
+            raise OrderValidationError("Item price must be positive")
+        
+        item_total = price * quantity
+        total_calculated += item_total
+        
+        validated_items.append({
+            'product_id': str(item['product_id']),
+            'quantity': quantity,
+            'price': price,
+            'total': item_total
+        })
+    
+    return validated_items, total_calculated
+
+def validate_items_columnar(items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Decimal]:
+    """
+    Validates order lines column by column and reports every bad line
+    
+    Quantities and prices are pulled into columns and checked in bulk.
+    Line totals and the order total use the same Decimal operations in the
+    same order as validate_items, so a valid order produces identical
+    results on either path.
+    
+    Args:
+        items: Order lines that passed validate_order_fields
+        
+    Returns:
+        Validated lines and the order total
+        
+    Raises:
+        OrderValidationError: With one entry in errors per bad line
+    """
+    product_ids = [str(item['product_id']) for item in items]
+    quantities, bad_quantities = convert_column(items, 'quantity', int)
+    prices, bad_prices = convert_column(items, 'price', decimal_from_value)
+    
+    bad_quantities += [line for line, quantity in enumerate(quantities, 1) if quantity is not None and quantity <= 0]
+    bad_prices += [line for line, price in enumerate(prices, 1)
+                   if price is not None and (not price.is_finite() or price <= 0)]
+    
+    if bad_quantities or bad_prices:
+        raise line_errors([
+            (sorted(bad_quantities), 'quantity', "Item quantity must be positive"),
+            (sorted(bad_prices), 'price', "Item price must be positive")
+        ])
+    
+    line_totals = list(map(Decimal.__mul__, prices, quantities))
+    total_calculated = sum(line_totals, Decimal('0'))
+    
+    validated_items = [
+        {'product_id': product_id, 'quantity': quantity, 'price': price, 'total': item_total}
+        for product_id, quantity, price, item_total in zip(product_ids, quantities, prices, line_totals)
+    ]
+    
+    return validated_items, total_calculated
+
+def convert_column(items: List[Dict[str, Any]], field: str, convert: Callable[[Any], Any]) -> Tuple[List[Any], List[int]]:
+    """
+    Converts one field of every line, recording lines that fail
+    
+    Args:
+        items: Raw order lines
+        field: Field to convert
+        convert: Conversion function
+        
+    Returns:
+        Converted column, with None for failed lines, and the failed line numbers
+    """
+    try:
+        return list(map(convert, [item[field] for item in items])), []
+    except (TypeError, ValueError, ArithmeticError):
+        pass
+    
+    column, bad_lines = [], []
+    for line, item in enumerate(items, 1):
+        try:
+            column.append(convert(item[field]))
+        except (TypeError, ValueError, ArithmeticError):
+            column.append(None)
+            bad_lines.append(line)
+    return column, bad_lines
+
+def decimal_from_value(value: Any) -> Decimal:
+    return Decimal(str(value))
+
+def line_errors(checks: List[Tuple[List[int], str, str]]) -> OrderValidationError:
+    """
+    Builds a validation error listing every failing line
+    
+    Args:
+        checks: (line numbers, field, message) for each failed check
+        
+    Returns:
+        OrderValidationError with per-line errors
+    """
+    messages = []
+    errors = []
+    for lines, field, message in checks:
+        if not lines:
+            continue
+        messages.append(f"{message} (lines {', '.join(map(str, lines))})")
+        errors.extend({'line': line, 'field': field, 'message': message} for line in lines)
+    return OrderValidationError('; '.join(messages), errors)
+
 def store_order(order: Dict[str, Any]) -> Dict[str, Any]:
     """
     Stores order in DynamoDB
@@ -167,16 +321,14 @@ def store_order(order: Dict[str, Any]) -> Dict[str, Any]:
         Stored order data
     """
     try:
-        # Convert Decimal values for DynamoDB
-        order_item = json.loads(json.dumps(order), parse_float=Decimal)
-        
-        orders_table.put_item(Item=order_item)
-        logger.info(f"Order stored in DynamoDB: {order['order_id']}")
+        # Decimal values are marshalled straight to DynamoDB attribute values
+        orders_table.put_item(Item=order)
+        logger.info("Order stored in DynamoDB: %s", order['order_id'])
         
         return order
         
     except Exception as e:
-        logger.error(f"Failed to store order: {str(e)}")
+        logger.error("Failed to store order: %s", e)
         raise
 
 def queue_order(order: Dict[str, Any]) -> None:
@@ -187,7 +339,7 @@ def queue_order(order: Dict[str, Any]) -> None:
         order: Order data to queue
     """
     try:
-        message_body = json.dumps(order, default=str)
+        message_body, codec_attributes = order_message(order)
         
         sqs.send_message(
             QueueUrl=ORDER_QUEUE_URL,
@@ -200,12 +352,238 @@ def queue_order(order: Dict[str, Any]) -> None:
                 'customer_id': {
                     'StringValue': order['customer_id'],
                     'DataType': 'String'
-                }
+                },
+                **codec_attributes
             }
         )
         
-        logger.info(f"Order queued for processing: {order['order_id']}")
+        logger.info("Order queued for processing: %s", order['order_id'])
         
     except Exception as e:
-        logger.error(f"Failed to queue order: {str(e)}")
+        logger.error("Failed to queue order: %s", e)
         raise
+
+def order_message(order: Dict[str, Any]) -> Tuple[str, Dict[str, Dict[str, str]]]:
+    """
+    Encodes an order for the order queue
+    
+    With ORDER_MESSAGE_MODE set to 'thin' only the order ID is sent and
+    fulfillment reads the stored order back, so the order is not
+    serialized a second time. Otherwise, with ORDER_MESSAGE_CODEC set to
+    'binary' the compact order codec is used and its schema version
+    travels in the message attributes; it shrinks the body but encodes
+    more slowly than JSON. Large bodies are offloaded to the claim-check
+    store either way.
+    
+    Args:
+        order: Validated order data
+        
+    Returns:
+        (message body, codec message attributes)
+    """
+    if ORDER_MESSAGE_MODE == 'thin':
+        return reference_message(order)
+    if ORDER_MESSAGE_CODEC == 'binary':
+        body, attributes = encode_message(order, compress=ORDER_MESSAGE_COMPRESS)
+    else:
+        body, attributes = json.dumps(order, default=str), {}
+    return claim_check.offload(body, order_id=order['order_id']), attributes
+
+def process_order_batch(orders: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Validates, stores and queues a bulk upload of orders
+    
+    Valid orders are written with BatchWriteItem and queued with
+    SendMessageBatch. Invalid orders do not stop the rest of the batch.
+    
+    Args:
+        orders: Raw order data list
+        
+    Returns:
+        Dict containing per-order results in request order
+    """
+    if not isinstance(orders, list) or len(orders) == 0:
+        raise OrderValidationError("orders must be a non-empty list")
+    
+    results = []
+    validated_orders = []
+    
+    for index, order_data in enumerate(orders):
+        try:
+            validated_order = validate_order(order_data)
+        except OrderValidationError as e:
+            result = {'index': index, 'status': 'VALIDATION_FAILED', 'error': str(e)}
+            if e.errors:
+                result['errors'] = e.errors
+            results.append(result)
+            continue
+        except Exception as e:
+            results.append({'index': index, 'status': 'VALIDATION_FAILED', 'error': f"Invalid order data: {str(e)}"})
+            continue
+        
+        validated_orders.append(validated_order)
+        results.append({'index': index, 'status': 'VALIDATED', 'order_id': validated_order['order_id']})
+    
+    store_failures = store_orders(validated_orders)
+    queue_failures = queue_orders([o for o in validated_orders if o['order_id'] not in store_failures])
+    
+    for result in results:
+        order_id = result.get('order_id')
+        if order_id in store_failures:
+            result.update({'status': 'ERROR', 'error': 'Failed to store order'})
+        elif order_id in queue_failures:
+            result.update({'status': 'ERROR', 'error': 'Failed to queue order'})
+    
+    validated_count = sum(1 for r in results if r['status'] == 'VALIDATED')
+    logger.info("Batch processed: %s of %s orders validated", validated_count, len(orders))
+    
+    return {
+        'statusCode': 200,
+        'status': 'BATCH_PROCESSED',
+        'total': len(orders),
+        'validated': validated_count,
+        'failed': len(orders) - validated_count,
+        'results': results,
+        'message': 'Order batch processed'
+    }
+
+def store_orders(orders: List[Dict[str, Any]]) -> Set[str]:
+    """
+    Stores orders in DynamoDB with BatchWriteItem
+    
+    Unprocessed items are retried with exponential backoff.
+    
+    Args:
+        orders: Validated order data list
+        
+    Returns:
+        IDs of orders that could not be stored
+    """
+    failed = set()
+    
+    for start in range(0, len(orders), BATCH_WRITE_SIZE):
+        chunk = orders[start:start + BATCH_WRITE_SIZE]
+        request_items = {ORDERS_TABLE: [{'PutRequest': {'Item': order}} for order in chunk]}
+        
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+            try:
+                response = dynamodb.batch_write_item(RequestItems=request_items)
+            except Exception as e:
+                logger.error("Batch write failed: %s", e)
+                continue
+            request_items = response.get('UnprocessedItems') or {}
+            if not request_items:
+                break
+        
+        for request in request_items.get(ORDERS_TABLE, []):
+            failed.add(request['PutRequest']['Item']['order_id'])
+    
+    logger.info("Stored %s orders in DynamoDB", len(orders) - len(failed))
+    
+    return failed
+
+def queue_orders(orders: List[Dict[str, Any]]) -> Set[str]:
+    """
+    Sends orders to SQS queue with SendMessageBatch
+    
+    Failed entries that are not the sender's fault are retried with
+    exponential backoff. Batches stay within both the entry and the
+    payload limit of SendMessageBatch. Orders whose message cannot be
+    built are reported as failed without being sent.
+    
+    Args:
+        orders: Order data list to queue
+        
+    Returns:
+        IDs of orders that could not be queued
+    """
+    failed = set()
+    
+    # The orders are already stored, so one message that cannot be built
+    # (e.g. a failed offload) only fails its own order
+    encoded = []
+    messages = []
+    for order in orders:
+        try:
+            messages.append(order_message(order))
+        except Exception as e:
+            logger.error("Failed to encode order %s: %s", order['order_id'], e)
+            failed.add(order['order_id'])
+            continue
+        encoded.append(order)
+    
+    for chunk, chunk_messages in send_batches(encoded, messages):
+        entries = {
+            str(i): {
+                'Id': str(i),
+                'MessageBody': body,
+                'MessageAttributes': {
+                    'order_id': {
+                        'StringValue': order['order_id'],
+                        'DataType': 'String'
+                    },
+                    'customer_id': {
+                        'StringValue': order['customer_id'],
+                        'DataType': 'String'
+                    },
+                    **codec_attributes
+                }
+            }
+            for i, (order, (body, codec_attributes)) in enumerate(zip(chunk, chunk_messages))
+        }
+        pending = list(entries)
+        
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+            try:
+                response = sqs.send_message_batch(
+                    QueueUrl=ORDER_QUEUE_URL,
+                    Entries=[entries[entry_id] for entry_id in pending]
+                )
+            except Exception as e:
+                logger.error("Batch send failed: %s", e)
+                continue
+            retryable = []
+            for failure in response.get('Failed', []):
+                logger.error("Failed to queue entry %s: %s", failure['Id'], failure.get('Message'))
+                if failure.get('SenderFault'):
+                    failed.add(chunk[int(failure['Id'])]['order_id'])
+                else:
+                    retryable.append(failure['Id'])
+            pending = retryable
+            if not pending:
+                break
+        
+        for entry_id in pending:
+            failed.add(chunk[int(entry_id)]['order_id'])
+    
+    logger.info("Queued %s orders for processing", len(orders) - len(failed))
+    
+    return failed
+
+def send_batches(orders: List[Dict[str, Any]],
+                 messages: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[List[Dict[str, Any]], List[Any]]]:
+    """
+    Splits orders into SendMessageBatch-sized batches
+    
+    Args:
+        orders: Orders to queue
+        messages: Their (body, codec attributes) from order_message
+        
+    Returns:
+        (orders, messages) per batch, within the entry and payload limits
+    """
+    batches = []
+    size = SEND_BATCH_BYTES
+    for order, message in zip(orders, messages):
+        body_size = len(message[0].encode('utf-8')) + ATTRIBUTE_BYTES
+        if not batches or len(batches[-1][0]) == SEND_BATCH_SIZE or size + body_size > SEND_BATCH_BYTES:
+            batches.append(([], []))
+            size = 0
+        batches[-1][0].append(order)
+        batches[-1][1].append(message)
+        size += body_size
+    return batches
@@ -0,0 +1,143 @@
+from decimal import Decimal
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+
+class Field:
+    """
+    Declarative description of one order field
+
+    Args:
+        types: Accepted Python type or tuple of types
+        required: Whether the field must be present
+        check: Optional predicate the value must also satisfy, either a
+            callable or a Python expression over `value` that is inlined
+            into the compiled validator
+        message: Error message when the value is invalid, defaults to
+            'Invalid <field>'
+        items: Optional schema every element of a list value must match;
+            element errors are reported as '<field>[<line>].<name>'
+    """
+
+    def __init__(self, types: Any, required: bool = True,
+                 check: Optional[Union[Callable[[Any], bool], str]] = None, message: Optional[str] = None,
+                 items: Optional[Dict[str, 'Field']] = None) -> None:
+        self.types = types
+        self.required = required
+        self.check = check
+        self.message = message
+        self.items = items
+
+def is_address(value: Dict[str, Any]) -> bool:
+    return all(isinstance(value.get(k), str) and value[k].strip() for k in ('line1', 'city', 'country')) \
+        and all(isinstance(v, str) for v in value.values())
+
+def is_currency(value: str) -> bool:
+    return len(value) == 3 and value.isalpha() and value.isupper()
+
+def are_coupons(value: List[Any]) -> bool:
+    return all(isinstance(code, str) and code.strip() for code in value)
+
+NUMBER_TYPES = (int, float, str, Decimal)
+
+# Order line schema; values are converted and range-checked by the item validators
+ITEM_SCHEMA = {
+    'product_id': Field((str, int)),
+    'quantity': Field(NUMBER_TYPES),
+    'price': Field(NUMBER_TYPES)
+}
+
+# Order payload schema, checked in this order
+ORDER_SCHEMA = {
+    'customer_id': Field(str, check="value.strip()"),
+    'items': Field(list, check="value", message="Order must contain at least one item", items=ITEM_SCHEMA),
+    'total_amount': Field(NUMBER_TYPES),
+    'shipping_address': Field(dict, required=False, check=is_address),
+    'currency': Field(str, required=False, check=is_currency),
+    'coupons': Field(list, required=False, check=are_coupons)
+}
+
+def compile_schema(schema: Dict[str, Field]) -> Callable[[Any], List[Tuple[str, str]]]:
+    """
+    Compiles a schema into a specialized validator function
+
+    The schema is turned into straight-line Python source, one block per
+    field with its types and predicate bound as constants, and compiled
+    once. Fields with an items schema get a loop over their elements with
+    the element checks inlined. Validating a well-formed payload then
+    costs one membership test, one lookup, one isinstance call and at
+    most one predicate per field.
+
+    Args:
+        schema: Field name to Field mapping
+
+    Returns:
+        Function taking a payload and returning (field, message) errors,
+        empty for a valid payload
+    """
+    constants = {}
+    lines = [
+        "    if not isinstance(data, dict):",
+        "        return [('order', 'Order must be an object')]",
+        "    errors = []"
+    ]
+    compile_fields(schema, 'data', None, '    ', lines, constants)
+    lines.append("    return errors")
+
+    # Constants are bound as defaults so the checks read locals, not globals
+    signature = ', '.join(['data', 'isinstance=isinstance'] + [f'{name}={name}' for name in constants])
+    namespace = dict(constants)
+    exec(compile('\n'.join([f"def validate({signature}):"] + lines), '<order_schema>', 'exec'), namespace)
+    return namespace['validate']
+
+def compile_fields(schema: Dict[str, Field], data: str, parent: Optional[str], indent: str,
+                   lines: List[str], constants: Dict[str, Any]) -> None:
+    """
+    Appends the checks of every field of a schema to the validator source
+
+    Args:
+        schema: Field name to Field mapping
+        data: Name of the variable holding the dict being checked
+        parent: Source of an f-string prefix for element fields, None at top level
+        indent: Indentation of the generated block
+        lines: Source lines, extended in place
+        constants: Names bound into the validator, extended in place
+    """
+    for name, field in schema.items():
+        index = len(constants)
+        label = repr(name) if parent is None else f"f'{parent}.{name}'"
+        message = field.message or f"Invalid {name}"
+        constants[f'types_{index}'] = field.types
+
+        lines.append(f"{indent}if {name!r} in {data}:")
+        lines.append(f"{indent}    value = {data}[{name!r}]")
+
+        condition = f"isinstance(value, types_{index})"
+        if isinstance(field.check, str):
+            condition += f" and ({field.check})"
+        elif field.check is not None:
+            constants[f'check_{index}'] = field.check
+            condition += f" and check_{index}(value)"
+        lines += [
+            f"{indent}    if not ({condition}):",
+            f"{indent}        errors.append(({label}, {message!r}))"
+        ]
+
+        if field.items is not None:
+            lines += [
+                f"{indent}    else:",
+                f"{indent}        for line, item in enumerate(value, 1):",
+                f"{indent}            if not isinstance(item, dict):",
+                f"{indent}                errors.append((f'{name}[{{line}}]', 'Each item must be an object'))",
+                f"{indent}                continue"
+            ]
+            compile_fields(field.items, 'item', f"{name}[{{line}}]", indent + '            ', lines, constants)
+
+        if field.required:
+            lines += [
+                f"{indent}else:",
+                f"{indent}    errors.append(({label}, {'Missing required field: ' + name!r}))"
+            ]
+
+# Compiled at module load so each request only pays for the checks
+validate_order_fields = compile_schema(ORDER_SCHEMA)
+
+OPTIONAL_FIELDS = [name for name, field in ORDER_SCHEMA.items() if not field.required]
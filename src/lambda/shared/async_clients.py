@@ -0,0 +1,100 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable
+
+from aws_clients import MAX_POOL_CONNECTIONS, Table, get_client
+
+# Threads blocking on AWS calls for the event loop, one per pooled connection by default
+ASYNC_IO_THREADS = int(os.environ.get('ASYNC_IO_THREADS', str(MAX_POOL_CONNECTIONS)))
+
+_executor = None
+_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the container-wide pool that runs blocking AWS calls
+
+    botocore clients are thread-safe and share one connection pool, so
+    a call per thread keeps as many requests in flight as there are
+    pooled connections. The pool outlives event loops, so it survives
+    from one invocation to the next.
+
+    Returns:
+        Thread pool executor
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=ASYNC_IO_THREADS, thread_name_prefix='aws-io')
+    return _executor
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Awaits a blocking call run on the AWS I/O pool
+
+    Args:
+        func: Blocking function
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        What func returns
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+class AsyncClient:
+    """
+    Awaitable stand-in for a low-level client
+
+    Every operation, e.g. await sqs.send_message(...), runs the
+    container-wide botocore client on the AWS I/O pool.
+
+    Args:
+        service: AWS service name
+    """
+
+    def __init__(self, service: str) -> None:
+        self._service = service
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        async def call(**kwargs: Any) -> Dict[str, Any]:
+            return await run_blocking(getattr(get_client(self._service), name), **kwargs)
+        return call
+
+class AsyncTable:
+    """
+    Awaitable counterpart of aws_clients.Table with the same call shapes
+
+    Args:
+        name: Table name
+    """
+
+    def __init__(self, name: str) -> None:
+        self._table = Table(name)
+        self.name = name
+
+    async def put_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return await run_blocking(self._table.put_item, **kwargs)
+
+    async def get_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return await run_blocking(self._table.get_item, **kwargs)
+
+    async def update_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return await run_blocking(self._table.update_item, **kwargs)
+
+    async def delete_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return await run_blocking(self._table.delete_item, **kwargs)
+
+    async def query(self, **kwargs: Any) -> Dict[str, Any]:
+        return await run_blocking(self._table.query, **kwargs)
+
+class AsyncDynamoDB:
+    """Awaitable counterpart of aws_clients.DynamoDB"""
+
+    def Table(self, name: str) -> AsyncTable:
+        return AsyncTable(name)
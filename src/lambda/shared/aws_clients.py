@@ -0,0 +1,278 @@
+import os
+import threading
+from decimal import Decimal
+from typing import Dict, Any
+
+# Connection settings shared by every client in the container
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '50'))
+CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', '2'))
+READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', '10'))
+
+_clients = {}
+_config = None
+_lock = threading.Lock()
+
+def get_client(service: str) -> Any:
+    """
+    Returns the container-wide low-level client for a service
+
+    boto3 is imported and the client built on first use, so cold starts
+    only pay for the services a request actually touches.
+
+    Args:
+        service: AWS service name, e.g. 'dynamodb'
+
+    Returns:
+        botocore client
+    """
+    client = _clients.get(service)
+    if client is None:
+        with _lock:
+            client = _clients.get(service)
+            if client is None:
+                import boto3
+                client = boto3.client(service, config=get_config())
+                _clients[service] = client
+    return client
+
+def get_config() -> Any:
+    """
+    Returns the cached botocore client configuration
+
+    Returns:
+        botocore Config with keep-alive, pool size and timeouts applied
+    """
+    global _config
+    if _config is None:
+        from botocore.config import Config
+        _config = Config(
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+            connect_timeout=CONNECT_TIMEOUT,
+            read_timeout=READ_TIMEOUT,
+            tcp_keepalive=True,
+            retries={'max_attempts': 3, 'mode': 'standard'}
+        )
+    return _config
+
+class LazyClient:
+    """
+    Stand-in for a boto3 client that is only built on first use
+
+    Args:
+        service: AWS service name
+    """
+
+    def __init__(self, service: str) -> None:
+        self._service = service
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_client(self._service), name)
+
+def serialize(value: Any) -> Dict[str, Any]:
+    """
+    Converts a Python value to a DynamoDB attribute value in a single pass
+
+    Follows boto3's TypeSerializer: numbers must be int or Decimal, floats
+    are rejected because they cannot be stored exactly.
+
+    Args:
+        value: Python value
+
+    Returns:
+        DynamoDB attribute value, e.g. {'S': 'abc'}
+
+    Raises:
+        TypeError: If the value has no DynamoDB representation
+    """
+    serializer = _SERIALIZERS.get(type(value))
+    if serializer is not None:
+        return serializer(value)
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, str):
+        return {'S': str(value)}
+    if isinstance(value, (int, Decimal)):
+        return {'N': _number(value)}
+    if isinstance(value, dict):
+        return {'M': {k: serialize(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize(v) for v in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, (set, frozenset)) and value:
+        if all(isinstance(v, str) for v in value):
+            return {'SS': list(value)}
+        if all(isinstance(v, (int, Decimal)) and not isinstance(v, bool) for v in value):
+            return {'NS': [_number(v) for v in value]}
+        if all(isinstance(v, (bytes, bytearray)) for v in value):
+            return {'BS': [bytes(v) for v in value]}
+    raise TypeError(f"Unsupported type for DynamoDB: {type(value).__name__}")
+
+def deserialize(attribute: Dict[str, Any]) -> Any:
+    """
+    Converts a DynamoDB attribute value to a Python value
+
+    Numbers come back as Decimal, as with boto3's TypeDeserializer.
+
+    Args:
+        attribute: DynamoDB attribute value
+
+    Returns:
+        Python value
+    """
+    (kind, value), = attribute.items()
+    if kind == 'S':
+        return value
+    if kind == 'N':
+        return Decimal(value)
+    if kind == 'M':
+        return {k: deserialize(v) for k, v in value.items()}
+    if kind == 'L':
+        return [deserialize(v) for v in value]
+    if kind == 'BOOL':
+        return value
+    if kind == 'NULL':
+        return None
+    if kind == 'B':
+        return bytes(value)
+    if kind == 'SS':
+        return set(value)
+    if kind == 'NS':
+        return {Decimal(v) for v in value}
+    if kind == 'BS':
+        return {bytes(v) for v in value}
+    raise TypeError(f"Unsupported DynamoDB type: {kind}")
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {k: serialize(v) for k, v in item.items()}
+
+def deserialize_item(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {k: deserialize(v) for k, v in item.items()}
+
+def _number(value: Any) -> str:
+    if isinstance(value, Decimal) and not value.is_finite():
+        raise TypeError(f"Non-finite numbers are not supported by DynamoDB: {value}")
+    return str(value)
+
+# Exact-type fast path for the values orders are made of
+_SERIALIZERS = {
+    str: lambda value: {'S': value},
+    int: lambda value: {'N': str(value)},
+    Decimal: lambda value: {'N': _number(value)},
+    bool: lambda value: {'BOOL': value},
+    dict: lambda value: {'M': {k: serialize(v) for k, v in value.items()}},
+    list: lambda value: {'L': [serialize(v) for v in value]},
+    type(None): lambda value: {'NULL': True}
+}
+
+def _serialize_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    params = dict(params)
+    for key in ('Item', 'Key', 'ExpressionAttributeValues', 'ExclusiveStartKey'):
+        if key in params:
+            params[key] = serialize_item(params[key])
+    return params
+
+class Table:
+    """
+    DynamoDB table over the low-level client
+
+    Accepts and returns plain Python values with the same call shapes as
+    boto3's Table resource, without loading the resource layer.
+
+    Args:
+        name: Table name
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def put_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call('put_item', kwargs)
+
+    def get_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call('get_item', kwargs)
+
+    def update_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call('update_item', kwargs)
+
+    def delete_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call('delete_item', kwargs)
+
+    def query(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call('query', kwargs)
+
+    def scan(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._call('scan', kwargs)
+
+    def _call(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        params = _serialize_params(params)
+        params['TableName'] = self.name
+        response = getattr(get_client('dynamodb'), operation)(**params)
+        for key in ('Item', 'Attributes', 'LastEvaluatedKey'):
+            if key in response:
+                response[key] = deserialize_item(response[key])
+        if 'Items' in response:
+            response['Items'] = [deserialize_item(item) for item in response['Items']]
+        return response
+
+class DynamoDB:
+    """
+    Replacement for boto3.resource('dynamodb') over the low-level client
+
+    Covers the table and batch operations the order lambdas use.
+    """
+
+    def Table(self, name: str) -> Table:
+        return Table(name)
+
+    def batch_write_item(self, RequestItems: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        response = get_client('dynamodb').batch_write_item(
+            RequestItems={
+                table: [_serialize_write_request(request) for request in requests]
+                for table, requests in RequestItems.items()
+            },
+            **kwargs
+        )
+        response['UnprocessedItems'] = {
+            table: [_deserialize_write_request(request) for request in requests]
+            for table, requests in response.get('UnprocessedItems', {}).items()
+        }
+        return response
+
+    def batch_get_item(self, RequestItems: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        request_items = {}
+        for table, request in RequestItems.items():
+            request = dict(request)
+            request['Keys'] = [serialize_item(key) for key in request['Keys']]
+            request_items[table] = request
+        response = get_client('dynamodb').batch_get_item(RequestItems=request_items, **kwargs)
+        response['Responses'] = {
+            table: [deserialize_item(item) for item in items]
+            for table, items in response.get('Responses', {}).items()
+        }
+        unprocessed = {}
+        for table, request in response.get('UnprocessedKeys', {}).items():
+            request = dict(request)
+            request['Keys'] = [deserialize_item(key) for key in request['Keys']]
+            unprocessed[table] = request
+        response['UnprocessedKeys'] = unprocessed
+        return response
+
+    def transact_write_items(self, TransactItems: list, **kwargs: Any) -> Dict[str, Any]:
+        return get_client('dynamodb').transact_write_items(
+            TransactItems=[
+                {action: _serialize_params(params) for action, params in item.items()}
+                for item in TransactItems
+            ],
+            **kwargs
+        )
+
+def _serialize_write_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    if 'PutRequest' in request:
+        return {'PutRequest': {'Item': serialize_item(request['PutRequest']['Item'])}}
+    return {'DeleteRequest': {'Key': serialize_item(request['DeleteRequest']['Key'])}}
+
+def _deserialize_write_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    if 'PutRequest' in request:
+        return {'PutRequest': {'Item': deserialize_item(request['PutRequest']['Item'])}}
+    return {'DeleteRequest': {'Key': deserialize_item(request['DeleteRequest']['Key'])}}
@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Optional
+
+from aws_clients import LazyClient
+
+logger = logging.getLogger()
+
+# First key of every pointer body, so pointers are recognised without parsing inline messages
+POINTER_KEY = 'claim_check'
+POINTER_PREFIX = '{"' + POINTER_KEY + '"'
+
+POINTER_VERSION = 1
+
+class ClaimCheckError(Exception):
+    """Raised when an offloaded payload cannot be read back intact"""
+
+class S3BlobStore:
+    """
+    Payloads kept as S3 objects
+
+    Args:
+        bucket: Bucket name
+    """
+
+    name = 's3'
+
+    def __init__(self, bucket: str) -> None:
+        self.bucket = bucket
+        self.s3 = LazyClient('s3')
+
+    def put(self, key: str, data: bytes) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        return self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+
+class LocalBlobStore:
+    """
+    Payloads kept as files in a directory
+
+    A local stand-in for S3BlobStore. Lambda containers do not share /tmp,
+    so it only works where producer and consumer share a filesystem,
+    e.g. tests and local runs.
+
+    Args:
+        directory: Directory the payloads are written to
+    """
+
+    name = 'local'
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def put(self, key: str, data: bytes) -> None:
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a reader never sees a partial payload
+        with open(path + '.part', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.part', path)
+
+    def get(self, key: str) -> bytes:
+        with open(os.path.join(self.directory, key), 'rb') as f:
+            return f.read()
+
+class ClaimCheck:
+    """
+    Moves large message bodies to blob storage and puts a pointer in their place
+
+    Bodies up to threshold_bytes are sent inline. Larger ones are stored,
+    gzip-compressed if enabled, under a key derived from their SHA-256,
+    and the message carries {'claim_check': {...}} with the key, digest
+    and encoding instead. Identical payloads share one blob, so a retried
+    send stores nothing new. rehydrate() returns inline bodies unchanged
+    and reads pointers back, checking the digest.
+
+    Args:
+        store: S3BlobStore or LocalBlobStore; None sends every body inline
+        threshold_bytes: Largest body sent inline
+        compress: gzip payloads before storing them
+        prefix: Key prefix of stored payloads
+    """
+
+    def __init__(self, store: Optional[Any] = None, threshold_bytes: int = 64 * 1024,
+                 compress: bool = True, prefix: str = 'payloads/') -> None:
+        self.store = store
+        self.threshold_bytes = threshold_bytes
+        self.compress = compress
+        self.prefix = prefix
+
+    def offload(self, body: str, **attributes: Any) -> str:
+        """
+        Returns the body to send, storing it first if it is too large
+
+        Args:
+            body: Message body
+            **attributes: Small fields copied into the pointer, e.g.
+                order_id, for consumers that only need to route the message
+
+        Returns:
+            The body itself, or a pointer body
+        """
+        data = body.encode('utf-8')
+        if self.store is None or len(data) <= self.threshold_bytes:
+            return body
+
+        digest = hashlib.sha256(data).hexdigest()
+        encoding = 'gzip' if self.compress else 'identity'
+        blob = gzip.compress(data, compresslevel=6, mtime=0) if self.compress else data
+        key = f'{self.prefix}{digest}'
+        self.store.put(key, blob)
+
+        logger.info("Offloaded %s byte message body as %s (%s bytes stored)", len(data), key, len(blob))
+
+        return json.dumps({
+            POINTER_KEY: {
+                'version': POINTER_VERSION,
+                'store': self.store.name,
+                'key': key,
+                'sha256': digest,
+                'size': len(data),
+                'encoding': encoding
+            },
+            **attributes
+        })
+
+    def rehydrate(self, body: str) -> str:
+        """
+        Returns the original body of a message
+
+        Args:
+            body: Message body as received
+
+        Returns:
+            The body itself, or the payload its pointer refers to
+
+        Raises:
+            ClaimCheckError: If the payload is missing, corrupt or there
+                is no store to read it from
+        """
+        if not is_pointer(body):
+            return body
+
+        pointer = json.loads(body)[POINTER_KEY]
+        if self.store is None:
+            raise ClaimCheckError(f"No claim-check store configured to read {pointer['key']}")
+        if pointer.get('version') != POINTER_VERSION:
+            raise ClaimCheckError(f"Unsupported claim-check version {pointer.get('version')}")
+
+        try:
+            blob = self.store.get(pointer['key'])
+            data = gzip.decompress(blob) if pointer['encoding'] == 'gzip' else blob
+        except Exception as e:
+            raise ClaimCheckError(f"Could not read offloaded payload {pointer['key']}: {e}") from e
+
+        if hashlib.sha256(data).hexdigest() != pointer['sha256']:
+            raise ClaimCheckError(f"Digest mismatch for offloaded payload {pointer['key']}")
+
+        return data.decode('utf-8')
+
+def is_pointer(body: str) -> bool:
+    """
+    Tells whether a message body is a claim-check pointer
+
+    Args:
+        body: Message body
+
+    Returns:
+        True for pointer bodies
+    """
+    return body.startswith(POINTER_PREFIX)
+
+def claim_check_from_environment() -> ClaimCheck:
+    """
+    Builds the claim check configured by CLAIM_CHECK_* environment variables
+
+    CLAIM_CHECK_STORE is 's3' (with CLAIM_CHECK_BUCKET), 'local' (with
+    CLAIM_CHECK_DIR) or unset to send every body inline.
+
+    Returns:
+        ClaimCheck
+    """
+    store_type = os.environ.get('CLAIM_CHECK_STORE', '')
+    if store_type == 's3':
+        store = S3BlobStore(os.environ['CLAIM_CHECK_BUCKET'])
+    elif store_type == 'local':
+        store = LocalBlobStore(os.environ.get('CLAIM_CHECK_DIR', '/tmp/claim-check'))
+    else:
+        store = None
+
+    return ClaimCheck(
+        store,
+        threshold_bytes=int(os.environ.get('CLAIM_CHECK_THRESHOLD_BYTES', str(64 * 1024))),
+        compress=os.environ.get('CLAIM_CHECK_COMPRESS', 'true').lower() == 'true'
+    )
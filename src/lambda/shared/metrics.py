@@ -0,0 +1,228 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'OrderProcessing')
+
+# CloudWatch accepts at most 100 values per metric in one EMF document
+MAX_VALUES_PER_DOCUMENT = 100
+
+OUTCOMES = ('Success', 'Failure', 'Error')
+
+class StdoutSink:
+    """Writes EMF documents to stdout, where the Lambda runtime ships them to CloudWatch"""
+
+    def write(self, lines: List[str]) -> None:
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+
+class InMemorySink:
+    """Keeps emitted EMF documents in memory, for tests and local runs"""
+
+    def __init__(self) -> None:
+        self.lines = []
+
+    def write(self, lines: List[str]) -> None:
+        self.lines.extend(lines)
+
+    @property
+    def documents(self) -> List[Dict[str, Any]]:
+        return [json.loads(line) for line in self.lines]
+
+class _Timer:
+    """Times one step; call fail() inside the block to record a failed outcome"""
+
+    __slots__ = ('metrics', 'step', 'outcome', 'start')
+
+    def __init__(self, metrics: 'Metrics', step: str) -> None:
+        self.metrics = metrics
+        self.step = step
+        self.outcome = 'Success'
+
+    def fail(self) -> None:
+        self.outcome = 'Failure'
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        self.metrics.record(self.step, duration_ms, 'Error' if exc_type else self.outcome)
+        return False
+
+class _NullTimer:
+    """Shared no-op timer handed out when metrics are disabled"""
+
+    __slots__ = ()
+
+    def fail(self) -> None:
+        pass
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class Metrics:
+    """
+    Per-step latency, count and outcome metrics in CloudWatch Embedded Metric Format
+
+    Measurements are aggregated in memory and written with one flush per
+    invocation, one EMF document per step with Service and Step dimensions
+    and one for service-level counters.
+    When disabled, timer() returns a shared no-op and timed() leaves the
+    function undecorated.
+
+    Args:
+        service: Value of the Service dimension
+        namespace: CloudWatch namespace
+        sink: Where flushed documents go, defaults to StdoutSink
+        enabled: Whether anything is recorded
+    """
+
+    def __init__(self, service: str, namespace: str = METRICS_NAMESPACE,
+                 sink: Optional[Any] = None, enabled: bool = METRICS_ENABLED) -> None:
+        self.service = service
+        self.namespace = namespace
+        self.sink = sink or StdoutSink()
+        self.enabled = enabled
+        self._steps = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def timer(self, step: str) -> Any:
+        """
+        Context manager timing a block as one call of step
+
+        Exceptions are recorded as an Error outcome and re-raised.
+
+        Args:
+            step: Step name
+
+        Returns:
+            Timer context manager
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, step)
+
+    def timed(self, step: str, ok: Optional[Callable[[Any], bool]] = None) -> Callable:
+        """
+        Decorator timing every call of a step function
+
+        Args:
+            step: Step name
+            ok: Predicate on the return value deciding Success or Failure,
+                defaults to the 'success' key of a result dict
+
+        Returns:
+            Decorator
+        """
+        if ok is None:
+            ok = lambda result: not isinstance(result, dict) or result.get('success', True)
+
+        def decorator(func: Callable) -> Callable:
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.timer(step) as timer:
+                    result = func(*args, **kwargs)
+                    if not ok(result):
+                        timer.fail()
+                    return result
+
+            return wrapper
+
+        return decorator
+
+    def record(self, step: str, duration_ms: float, outcome: str) -> None:
+        """
+        Adds one measurement
+
+        Args:
+            step: Step name
+            duration_ms: Step duration in milliseconds
+            outcome: One of Success, Failure or Error
+        """
+        with self._lock:
+            entry = self._steps.get(step)
+            if entry is None:
+                entry = self._steps[step] = {'durations': [], 'Success': 0, 'Failure': 0, 'Error': 0}
+            entry['durations'].append(duration_ms)
+            entry[outcome] += 1
+
+    def add_count(self, name: str, value: int = 1) -> None:
+        """
+        Adds to a service-level counter, e.g. cache hits
+
+        Args:
+            name: Metric name
+            value: Amount to add
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + value
+
+    def flush(self) -> None:
+        """Writes everything recorded since the last flush to the sink"""
+        with self._lock:
+            steps, self._steps = self._steps, {}
+            counts, self._counts = self._counts, {}
+        if not steps and not counts:
+            return
+
+        timestamp = int(time.time() * 1000)
+        lines = []
+        if counts:
+            document = {
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': self.namespace,
+                        'Dimensions': [['Service']],
+                        'Metrics': [{'Name': name, 'Unit': 'Count'} for name in counts]
+                    }]
+                },
+                'Service': self.service
+            }
+            document.update(counts)
+            lines.append(json.dumps(document))
+        for step, entry in steps.items():
+            durations = entry['durations']
+            for start in range(0, len(durations), MAX_VALUES_PER_DOCUMENT):
+                # Counts go in the first document only, later ones carry the remaining durations
+                names = ['Duration'] + (list(OUTCOMES) if start == 0 else [])
+                document = {
+                    '_aws': {
+                        'Timestamp': timestamp,
+                        'CloudWatchMetrics': [{
+                            'Namespace': self.namespace,
+                            'Dimensions': [['Service', 'Step']],
+                            'Metrics': [
+                                {'Name': name, 'Unit': 'Milliseconds' if name == 'Duration' else 'Count'}
+                                for name in names
+                            ]
+                        }]
+                    },
+                    'Service': self.service,
+                    'Step': step,
+                    'Duration': durations[start:start + MAX_VALUES_PER_DOCUMENT]
+                }
+                if start == 0:
+                    for outcome in OUTCOMES:
+                        document[outcome] = entry[outcome]
+                lines.append(json.dumps(document))
+
+        self.sink.write(lines)
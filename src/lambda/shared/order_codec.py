@@ -0,0 +1,324 @@
+import base64
+import json
+import struct
+import zlib
+from decimal import Decimal
+from itertools import repeat
+from operator import itemgetter
+from typing import Dict, Any, List, Tuple
+
+SCHEMA_VERSION = 1
+
+# Message attributes of binary order messages; messages without them are JSON
+VERSION_ATTRIBUTE = 'schema_version'
+ENCODING_ATTRIBUTE = 'content_encoding'
+
+# Message attribute of thin messages, which only carry the order ID
+MODE_ATTRIBUTE = 'message_mode'
+THIN_MODE = 'thin'
+
+# Top-level strings in the order they are written; a bitmap in the header records which are present
+STRING_FIELDS = ('order_id', 'customer_id', 'status', 'order_date', 'created_at', 'updated_at')
+TOTAL_BIT = 1 << len(STRING_FIELDS)
+CORE_FIELDS = frozenset(STRING_FIELDS + ('items', 'total_amount'))
+ITEM_FIELDS = frozenset(['product_id', 'quantity', 'price', 'total'])
+ITEM_COLUMNS = itemgetter('product_id', 'quantity', 'price', 'total')
+
+# Amounts are integers in units of 10**-scale; cents unless a price is finer
+MIN_SCALE = 2
+MAX_SCALE = 12
+
+# Item columns use the narrowest of these widths that fits every value; header flags record the choice
+WIDE_QUANTITIES = 1
+WIDE_AMOUNTS = 2
+
+HEADER = struct.Struct('<BBBB')
+LENGTH = struct.Struct('<H')
+TOTAL = struct.Struct('<q')
+COUNT = struct.Struct('<I')
+
+class OrderCodecError(ValueError):
+    """Raised for orders the binary schema cannot hold, or messages it cannot decode"""
+
+def encode_order(order: Dict[str, Any]) -> bytes:
+    """
+    Encodes a validated order in the compact binary layout
+
+    Layout, little-endian: version, amount scale, field bitmap and column
+    width bytes; the present STRING_FIELDS as uint16 length and UTF-8;
+    total_amount as int64 units; the item count; then the item columns,
+    quantities as uint16 or uint32, prices and line totals as int32 or
+    int64 units, product ID lengths as uint16 followed by the IDs; and
+    last any other fields as length-prefixed compact JSON. Columns are
+    packed with one struct call each, so encoding cost barely grows with
+    the number of lines.
+
+    Args:
+        order: Order as produced by validate_order
+
+    Returns:
+        Encoded order
+
+    Raises:
+        OrderCodecError: If the order does not fit the schema, e.g. an item
+            with extra fields or an amount out of range
+    """
+    items = order.get('items', [])
+    if not isinstance(items, list) or any(not isinstance(item, dict) or item.keys() != ITEM_FIELDS for item in items):
+        raise OrderCodecError("Items must hold exactly product_id, quantity, price and total")
+
+    count = len(items)
+    columns = list(zip(*map(ITEM_COLUMNS, items))) or [(), (), (), ()]
+    product_ids, quantities, prices, totals = columns
+    amounts = prices + totals + ((order['total_amount'],) if 'total_amount' in order else ())
+    if not set(map(type, amounts)) <= {Decimal} or not all(map(Decimal.is_finite, amounts)):
+        raise OrderCodecError("Amounts must be finite Decimals")
+    if any(field in order and not isinstance(order[field], str) for field in STRING_FIELDS) \
+            or not set(map(type, product_ids)) <= {str}:
+        raise OrderCodecError(f"{', '.join(STRING_FIELDS)} and product IDs must be strings")
+
+    scale, units = amount_units(amounts)
+    price_units = units[:count]
+    total_units = units[count:2 * count]
+    product_ids = [product_id.encode('utf-8') for product_id in product_ids]
+
+    widths = 0
+    if not set(map(type, quantities)) <= {int} or (count and max(quantities) > 0xFFFF):
+        widths |= WIDE_QUANTITIES
+    if units and (max(units) > 0x7FFFFFFF or min(units) < -0x80000000):
+        widths |= WIDE_AMOUNTS
+    quantity_format = 'I' if widths & WIDE_QUANTITIES else 'H'
+    amount_format = 'q' if widths & WIDE_AMOUNTS else 'i'
+    try:
+        bitmap = 0
+        parts = [b'']
+        for bit, field in enumerate(STRING_FIELDS):
+            if field in order:
+                bitmap |= 1 << bit
+                parts.append(pack_string(order[field]))
+        if 'total_amount' in order:
+            bitmap |= TOTAL_BIT
+            parts.append(TOTAL.pack(units[-1]))
+        parts[0] = HEADER.pack(SCHEMA_VERSION, scale, bitmap, widths)
+
+        parts += [
+            COUNT.pack(count),
+            struct.pack(f'<{count}{quantity_format}', *quantities),
+            struct.pack(f'<{count}{amount_format}', *price_units),
+            struct.pack(f'<{count}{amount_format}', *total_units),
+            struct.pack(f'<{count}H', *map(len, product_ids)),
+            b''.join(product_ids)
+        ]
+    except struct.error as e:
+        raise OrderCodecError(f"Value out of range: {e}") from e
+
+    extras = {key: value for key, value in order.items() if key not in CORE_FIELDS}
+    parts.append(pack_blob(json.dumps(extras, separators=(',', ':'), default=str).encode('utf-8') if extras else b''))
+
+    return b''.join(parts)
+
+def decode_order(data: bytes) -> Dict[str, Any]:
+    """
+    Decodes an order written by encode_order
+
+    Amounts come back as Decimals, quantities as ints, the same types
+    validate_order produces.
+
+    Args:
+        data: Encoded order
+
+    Returns:
+        Order
+
+    Raises:
+        OrderCodecError: If the data is not a supported encoded order
+    """
+    try:
+        version, scale, bitmap, widths = HEADER.unpack_from(data, 0)
+        if version != SCHEMA_VERSION:
+            raise OrderCodecError(f"Unsupported order schema version {version}")
+        offset = HEADER.size
+
+        order = {}
+        for bit, field in enumerate(STRING_FIELDS):
+            if bitmap & (1 << bit):
+                order[field], offset = unpack_string(data, offset)
+        if bitmap & TOTAL_BIT:
+            order['total_amount'] = Decimal(TOTAL.unpack_from(data, offset)[0]).scaleb(-scale)
+            offset += TOTAL.size
+
+        count = COUNT.unpack_from(data, offset)[0]
+        offset += COUNT.size
+        quantity_format = f"<{count}{'I' if widths & WIDE_QUANTITIES else 'H'}"
+        amount_format = f"<{count}{'q' if widths & WIDE_AMOUNTS else 'i'}"
+        quantities = struct.unpack_from(quantity_format, data, offset)
+        offset += struct.calcsize(quantity_format)
+        prices = struct.unpack_from(amount_format, data, offset)
+        offset += struct.calcsize(amount_format)
+        totals = struct.unpack_from(amount_format, data, offset)
+        offset += struct.calcsize(amount_format)
+        lengths = struct.unpack_from(f'<{count}H', data, offset)
+        offset += 2 * count
+
+        items = []
+        prices = from_units(prices, scale)
+        totals = from_units(totals, scale)
+        for quantity, price, total, length in zip(quantities, prices, totals, lengths):
+            items.append({
+                'product_id': data[offset:offset + length].decode('utf-8'),
+                'quantity': quantity,
+                'price': price,
+                'total': total
+            })
+            offset += length
+        order['items'] = items
+
+        extras, offset = unpack_blob(data, offset)
+        if extras:
+            order.update(json.loads(extras))
+    except (struct.error, UnicodeDecodeError, ValueError) as e:
+        if isinstance(e, OrderCodecError):
+            raise
+        raise OrderCodecError(f"Malformed order message: {e}") from e
+
+    return order
+
+def encode_message(order: Dict[str, Any], compress: bool = False) -> Tuple[str, Dict[str, Dict[str, str]]]:
+    """
+    Builds an SQS message body and attributes for an order
+
+    The binary encoding is base64'd, SQS bodies being text, and zlib
+    compressed first if asked. Orders the schema cannot hold are sent as
+    JSON, without the codec attributes.
+
+    Args:
+        order: Order as produced by validate_order
+        compress: zlib-compress the encoded order
+
+    Returns:
+        (message body, message attributes in SendMessage form)
+    """
+    try:
+        data = encode_order(order)
+    except OrderCodecError:
+        return json.dumps(order, default=str), {}
+
+    if compress:
+        data = zlib.compress(data, 6)
+    return base64.b64encode(data).decode('ascii'), {
+        VERSION_ATTRIBUTE: {'StringValue': str(SCHEMA_VERSION), 'DataType': 'Number'},
+        ENCODING_ATTRIBUTE: {'StringValue': 'zlib+base64' if compress else 'base64', 'DataType': 'String'}
+    }
+
+def decode_message(body: str, attributes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Decodes an order message of either encoding
+
+    Args:
+        body: Message body
+        attributes: Message attributes, as received by Lambda
+            ('stringValue') or from ReceiveMessage ('StringValue')
+
+    Returns:
+        Order
+
+    Raises:
+        OrderCodecError: If a binary message cannot be decoded
+        ValueError: If a JSON message is not valid JSON
+    """
+    version = attribute_value(attributes, VERSION_ATTRIBUTE)
+    if version is None:
+        return json.loads(body)
+    if version != str(SCHEMA_VERSION):
+        raise OrderCodecError(f"Unsupported order schema version {version}")
+
+    try:
+        data = base64.b64decode(body, validate=True)
+        if attribute_value(attributes, ENCODING_ATTRIBUTE) == 'zlib+base64':
+            data = zlib.decompress(data)
+    except (ValueError, zlib.error) as e:
+        raise OrderCodecError(f"Malformed order message: {e}") from e
+    return decode_order(data)
+
+def reference_message(order: Dict[str, Any]) -> Tuple[str, Dict[str, Dict[str, str]]]:
+    """
+    Builds a thin SQS message that only names an order
+
+    The consumer reads the order itself from the orders table, which the
+    producer must have written before sending.
+
+    Args:
+        order: Stored order
+
+    Returns:
+        (message body, message attributes in SendMessage form)
+    """
+    return json.dumps({'order_id': order['order_id']}), {
+        MODE_ATTRIBUTE: {'StringValue': THIN_MODE, 'DataType': 'String'}
+    }
+
+def is_reference(attributes: Dict[str, Dict[str, Any]]) -> bool:
+    """
+    Tells whether a message is a thin reference to a stored order
+
+    Args:
+        attributes: Message attributes, as received
+
+    Returns:
+        True for messages built by reference_message
+    """
+    return attribute_value(attributes, MODE_ATTRIBUTE) == THIN_MODE
+
+def attribute_value(attributes: Dict[str, Dict[str, Any]], name: str) -> Any:
+    attribute = (attributes or {}).get(name)
+    if attribute is None:
+        return None
+    return attribute.get('stringValue', attribute.get('StringValue'))
+
+def amount_units(amounts: Tuple[Decimal, ...]) -> Tuple[int, List[int]]:
+    """
+    Picks the message scale and converts amounts to integer units of it
+
+    Nearly every order is in whole cents, which is tried first without
+    inspecting each amount's exponent.
+
+    Args:
+        amounts: Finite Decimals
+
+    Returns:
+        (scale, units in the order of amounts)
+
+    Raises:
+        OrderCodecError: If an amount has more than MAX_SCALE decimal places
+    """
+    scaled = list(map(Decimal.scaleb, amounts, repeat(MIN_SCALE)))
+    units = list(map(int, scaled))
+    if all(map(Decimal.__eq__, scaled, units)):
+        return MIN_SCALE, units
+
+    scale = max(-amount.as_tuple().exponent for amount in amounts)
+    if scale > MAX_SCALE:
+        raise OrderCodecError(f"Amounts may have at most {MAX_SCALE} decimal places")
+    return scale, [int(amount.scaleb(scale)) for amount in amounts]
+
+def from_units(units: Tuple[int, ...], scale: int) -> List[Decimal]:
+    return list(map(Decimal.scaleb, map(Decimal, units), repeat(-scale)))
+
+def pack_string(value: str) -> bytes:
+    data = value.encode('utf-8')
+    return LENGTH.pack(len(data)) + data
+
+def unpack_string(data: bytes, offset: int) -> Tuple[str, int]:
+    length = LENGTH.unpack_from(data, offset)[0]
+    offset += LENGTH.size
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+def pack_blob(value: bytes) -> bytes:
+    return COUNT.pack(len(value)) + value
+
+def unpack_blob(data: bytes, offset: int) -> Tuple[bytes, int]:
+    length = COUNT.unpack_from(data, offset)[0]
+    offset += COUNT.size
+    if offset + length > len(data):
+        raise OrderCodecError("Truncated order message")
+    return data[offset:offset + length], offset + length
@@ -0,0 +1,182 @@
+import logging
+import time
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ttl_cache import TtlCache
+
+logger = logging.getLogger()
+
+# BatchGetItem reads at most 100 keys per call
+BATCH_GET_SIZE = 100
+MAX_BATCH_RETRIES = 5
+RETRY_BASE_DELAY = 0.05
+
+# Only these attributes are read, never the order's items
+STATUS_ATTRIBUTES = ('order_id', 'status', 'tracking_number', 'updated_at')
+
+class OrderStatus:
+    """
+    Status of one order, as read from the orders table
+
+    Args:
+        order_id: Order ID
+        status: Order status, e.g. 'FULFILLED'
+        tracking_number: Shipment tracking number, once shipped
+        updated_at: ISO timestamp of the last status change
+    """
+
+    __slots__ = STATUS_ATTRIBUTES
+
+    def __init__(self, order_id: str, status: Optional[str] = None, tracking_number: Optional[str] = None,
+                 updated_at: Optional[str] = None) -> None:
+        self.order_id = order_id
+        self.status = status
+        self.tracking_number = tracking_number
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_item(cls, item: Dict[str, Any]) -> 'OrderStatus':
+        return cls(**{name: item.get(name) for name in STATUS_ATTRIBUTES})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in STATUS_ATTRIBUTES}
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, OrderStatus) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"OrderStatus({self.order_id!r}, {self.status!r})"
+
+class OrderStatusReader:
+    """
+    Reads order status without fetching whole order documents
+
+    Lookups project only STATUS_ATTRIBUTES and go out as BatchGetItem
+    calls of up to 100 keys; unprocessed keys are retried with
+    exponential backoff. With a cache, statuses read in the last few
+    seconds are reused. A container that writes a status should
+    invalidate it here, statuses written elsewhere can be up to the
+    cache TTL stale.
+
+    Args:
+        dynamodb: aws_clients.DynamoDB
+        table_name: Orders table name
+        cache: Optional TtlCache of statuses by order ID
+    """
+
+    def __init__(self, dynamodb: Any, table_name: str, cache: Optional[TtlCache] = None) -> None:
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.cache = cache
+
+    def get(self, order_id: str, consistent_read: bool = False) -> Optional[OrderStatus]:
+        """
+        Reads the status of one order
+
+        Args:
+            order_id: Order ID
+            consistent_read: Read the latest write, bypassing the cache
+
+        Returns:
+            OrderStatus, or None if there is no such order
+        """
+        statuses = self.get_many([order_id], consistent_read)
+        if order_id not in statuses:
+            raise RuntimeError(f"Could not read status of order {order_id}")
+        return statuses[order_id]
+
+    def get_many(self, order_ids: Iterable[str], consistent_read: bool = False) -> Dict[str, Optional[OrderStatus]]:
+        """
+        Reads the status of several orders
+
+        Args:
+            order_ids: Order IDs, duplicates are looked up once
+            consistent_read: Read the latest writes, bypassing the cache
+
+        Returns:
+            OrderStatus by order ID, None for orders that do not exist.
+            Orders still unprocessed after every retry are left out.
+        """
+        found = {}
+        missing = []
+        for order_id in dict.fromkeys(order_ids):
+            status = None if self.cache is None or consistent_read else self.cache.get(order_id)
+            if status is not None:
+                found[order_id] = status
+            else:
+                missing.append(order_id)
+
+        items, unprocessed = batch_get_orders(self.dynamodb, self.table_name, missing,
+                                              STATUS_ATTRIBUTES, consistent_read)
+        for order_id in missing:
+            if order_id in unprocessed:
+                continue
+            item = items.get(order_id)
+            found[order_id] = OrderStatus.from_item(item) if item is not None else None
+            if item is not None and self.cache is not None:
+                self.cache.put(order_id, found[order_id])
+
+        return found
+
+    def invalidate(self, order_ids: Iterable[str]) -> None:
+        """
+        Drops cached statuses, e.g. after this container updated them
+
+        Args:
+            order_ids: Order IDs to forget
+        """
+        if self.cache is not None:
+            self.cache.invalidate(order_ids)
+
+def batch_get_orders(dynamodb: Any, table_name: str, order_ids: Iterable[str],
+                     attributes: Optional[Sequence[str]] = None,
+                     consistent_read: bool = False) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+    """
+    Reads orders with BatchGetItem calls of up to 100 keys
+
+    Unprocessed keys are retried with exponential backoff.
+
+    Args:
+        dynamodb: aws_clients.DynamoDB
+        table_name: Orders table name
+        order_ids: Order IDs, duplicates are read once
+        attributes: Attributes to read, None for whole items
+        consistent_read: Read the latest writes
+
+    Returns:
+        (items by order ID, IDs still unprocessed after every retry);
+        orders that do not exist are in neither
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    items = {}
+    unprocessed = set()
+
+    for start in range(0, len(order_ids), BATCH_GET_SIZE):
+        request = {
+            'Keys': [{'order_id': order_id} for order_id in order_ids[start:start + BATCH_GET_SIZE]],
+            'ConsistentRead': consistent_read
+        }
+        if attributes is not None:
+            request['ProjectionExpression'] = ', '.join(f'#a{i}' for i in range(len(attributes)))
+            request['ExpressionAttributeNames'] = {f'#a{i}': name for i, name in enumerate(attributes)}
+        request_items = {table_name: request}
+
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+            try:
+                response = dynamodb.batch_get_item(RequestItems=request_items)
+            except Exception as e:
+                logger.error("Batch order read failed: %s", e)
+                continue
+            for item in response['Responses'].get(table_name, []):
+                items[item['order_id']] = item
+            request_items = response.get('UnprocessedKeys') or {}
+            if not request_items:
+                break
+
+        unprocessed.update(key['order_id'] for key in request_items.get(table_name, {}).get('Keys', []))
+
+    if unprocessed:
+        logger.error("Could not read %s orders", len(unprocessed))
+    return items, unprocessed
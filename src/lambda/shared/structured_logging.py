@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+from order_codec import OrderCodecError, decode_message
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+PAYLOAD_LOG_SAMPLE_RATE = float(os.environ.get('PAYLOAD_LOG_SAMPLE_RATE', '0.01'))
+
+# Customer data that never reaches the logs
+REDACTED_FIELDS = frozenset(['customer_id', 'shipping_address', 'email', 'phone', 'name'])
+REDACTED = '[REDACTED]'
+
+# Message body keys, and their attributes, in Lambda records and ReceiveMessage results
+BODY_KEYS = {'body': 'messageAttributes', 'Body': 'MessageAttributes'}
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Request-wide fields, and the number of the current invocation
+_invocation = {}
+_generation = 0
+# Draw deciding whether the current invocation logs payloads
+_sample_draw = random.random()
+# Fields bound by the current thread or asyncio task, with the invocation
+# they were bound in. Pool threads outlive invocations, so fields from an
+# earlier one are ignored rather than relying on every worker to clear them
+_fields: ContextVar = ContextVar('log_fields', default=(0, {}))
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line
+
+    The message is only %-formatted here, so records dropped by level
+    filtering never pay for it. Correlation fields bound with
+    start_invocation and bind are added to every record.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': '%s.%03dZ' % (time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)), record.msecs),
+            'level': record.levelname,
+            'message': record.getMessage()
+        }
+        entry.update(_invocation)
+        entry.update(bound_fields())
+        for key in record.__dict__.keys() - _RECORD_ATTRIBUTES:
+            entry[key] = record.__dict__[key]
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def setup_logging(force: bool = False) -> logging.Logger:
+    """
+    Configures the root logger for JSON output
+
+    Inside Lambda the runtime's handler is given the JSON formatter.
+    Elsewhere handlers are left alone unless force is set, so local runs
+    and tests keep their usual output.
+
+    Args:
+        force: Install the formatter outside Lambda too
+
+    Returns:
+        Root logger
+    """
+    logger = logging.getLogger()
+    logger.setLevel(LOG_LEVEL)
+
+    if force or 'AWS_LAMBDA_FUNCTION_NAME' in os.environ:
+        if not logger.handlers:
+            logger.addHandler(logging.StreamHandler())
+        for handler in logger.handlers:
+            handler.setFormatter(JsonFormatter())
+
+    return logger
+
+def start_invocation(context: Any) -> None:
+    """
+    Resets correlation fields at the start of an invocation
+
+    Fields bound during earlier invocations are dropped on every thread,
+    and whether this invocation logs payloads is drawn once here.
+
+    Args:
+        context: Lambda context, its aws_request_id is added to every record
+    """
+    global _generation, _sample_draw
+    _invocation.clear()
+    request_id = getattr(context, 'aws_request_id', None)
+    if request_id is not None:
+        _invocation['request_id'] = request_id
+    _generation += 1
+    _sample_draw = random.random()
+
+def bind(**fields: Any) -> None:
+    """
+    Adds correlation fields, e.g. order_id, for the current thread or task
+
+    Fields stay bound until the next bind of the same name or the next
+    start_invocation. Asyncio tasks each see their own bindings.
+    """
+    _fields.set((_generation, {**bound_fields(), **fields}))
+
+def bound_fields() -> Dict[str, Any]:
+    """Returns the fields bound by the current thread or task in this invocation"""
+    generation, fields = _fields.get()
+    return fields if generation == _generation else {}
+
+def log_payload(logger: logging.Logger, message: str, payload: Any,
+                sample_rate: Optional[float] = None) -> None:
+    """
+    Logs a full payload for a sample of invocations
+
+    The payload is only redacted and serialized when the record will be
+    emitted and the invocation is sampled. Sampling is decided once per
+    invocation by start_invocation, so a sampled invocation logs every
+    payload it is given.
+
+    Args:
+        logger: Logger to write to
+        message: Log message
+        payload: Event or order data
+        sample_rate: Fraction of invocations to log, defaults to PAYLOAD_LOG_SAMPLE_RATE
+    """
+    rate = PAYLOAD_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    if not logger.isEnabledFor(logging.INFO) or _sample_draw >= rate:
+        return
+    logger.info("%s: %s", message, LazyJson(redact(payload)))
+
+def redact(value: Any) -> Any:
+    """
+    Returns a copy of value with customer fields masked
+
+    Message bodies are decoded first, whatever their encoding, so binary
+    order messages are masked like JSON ones. Bodies that cannot be
+    decoded are replaced whole.
+
+    Args:
+        value: Payload to redact
+
+    Returns:
+        Redacted copy
+    """
+    if isinstance(value, dict):
+        redacted = {k: REDACTED if k in REDACTED_FIELDS else redact(v) for k, v in value.items()}
+        for key, attributes_key in BODY_KEYS.items():
+            if isinstance(value.get(key), str):
+                redacted[key] = redact_body(value[key], value.get(attributes_key))
+        return redacted
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    if isinstance(value, str) and value.startswith('{'):
+        # SQS bodies carry the order as a JSON string
+        try:
+            return redact(json.loads(value))
+        except ValueError:
+            return value
+    return value
+
+def redact_body(body: str, attributes: Optional[Dict[str, Dict[str, Any]]]) -> Any:
+    """
+    Decodes and redacts an SQS message body
+
+    Claim-check pointers are JSON and are redacted as such; the payload
+    they refer to is never fetched for logging.
+
+    Args:
+        body: Message body
+        attributes: Message attributes sent with the body
+
+    Returns:
+        Redacted order, or a placeholder when the body cannot be decoded
+    """
+    try:
+        return redact(decode_message(body, attributes))
+    except (OrderCodecError, ValueError):
+        return REDACTED
+
+class LazyJson:
+    """Defers json.dumps until the log record is formatted"""
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, default=str)
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Iterable, Optional
+
+class TtlCache:
+    """
+    Small per-container cache whose entries expire after a fixed time
+
+    Meant for read paths where a few seconds of staleness is acceptable
+    in exchange for skipping a DynamoDB round trip on hot keys. The least
+    recently used entries are evicted past max_size.
+
+    Args:
+        ttl_seconds: How long an entry is reused
+        max_size: Maximum number of cached entries
+    """
+
+    def __init__(self, ttl_seconds: float = 5, max_size: int = 1024) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value, or None if it is missing or expired
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Caches a value for ttl_seconds
+
+        Args:
+            key: Cache key
+            value: Value to cache, must not be None
+            ttl_seconds: Lifetime of this entry, the cache's ttl_seconds if None
+        """
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        if ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        """
+        Drops cached entries, e.g. after this container changed them
+
+        Args:
+            keys: Cache keys to forget
+        """
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drops every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def take_stats(self) -> Dict[str, int]:
+        """
+        Returns hit and miss counts since the previous call and resets them
+
+        Returns:
+            Dict with 'hits' and 'misses'
+        """
+        with self._lock:
+            stats = {'hits': self.hits, 'misses': self.misses}
+            self.hits = self.misses = 0
+        return stats
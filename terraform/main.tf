@@ -38,17 +38,52 @@ module "dynamodb" {
 module "lambda" {
   source = "./modules/lambda"
 
-  environment      = var.environment
-  project_name     = var.project_name
-  orders_table     = module.dynamodb.table_name
-  orders_table_arn = module.dynamodb.table_arn
-  order_queue_url  = module.sqs.order_queue_url
-  order_queue_arn  = module.sqs.order_queue_arn
-  dlq_url          = module.sqs.dlq_url
-  dlq_arn          = module.sqs.dlq_arn
-  lambda_timeout   = var.lambda_timeout
-  memory_size      = var.lambda_memory_size
-  tags             = local.common_tags
+  environment              = var.environment
+  project_name             = var.project_name
+  orders_table             = module.dynamodb.table_name
+  orders_table_arn         = module.dynamodb.table_arn
+  idempotency_table        = module.dynamodb.idempotency_table_name
+  idempotency_table_arn    = module.dynamodb.idempotency_table_arn
+  inventory_table          = module.dynamodb.inventory_table_name
+  inventory_table_arn      = module.dynamodb.inventory_table_arn
+  reservations_table       = module.dynamodb.reservations_table_name
+  reservations_table_arn   = module.dynamodb.reservations_table_arn
+  failed_orders_table      = module.dynamodb.failed_orders_table_name
+  failed_orders_table_arn  = module.dynamodb.failed_orders_table_arn
+  order_queue_url          = module.sqs.order_queue_url
+  order_queue_arn          = module.sqs.order_queue_arn
+  dlq_url                  = module.sqs.dlq_url
+  dlq_arn                  = module.sqs.dlq_arn
+  payload_bucket_name      = module.sqs.payload_bucket_name
+  payload_bucket_arn       = module.sqs.payload_bucket_arn
+  lambda_timeout           = var.lambda_timeout
+  memory_size              = var.lambda_memory_size
+  sqs_batch_size           = var.sqs_batch_size
+  sqs_batching_window      = var.sqs_batching_window
+  fulfillment_max_workers  = var.fulfillment_max_workers
+  fulfillment_step_workers = var.fulfillment_step_workers
+  saga_checkpoint_store    = var.saga_checkpoint_store
+  fulfillment_async        = var.fulfillment_async
+  fulfillment_async_concurrency = var.fulfillment_async_concurrency
+  status_write_mode        = var.status_write_mode
+  processing_lease_seconds = var.processing_lease_seconds
+  idempotency_store        = var.idempotency_store
+  log_level                = var.log_level
+  payload_log_sample_rate  = var.payload_log_sample_rate
+  metrics_enabled          = var.metrics_enabled
+  inventory_backend        = var.inventory_backend
+  reservation_ttl_seconds  = var.reservation_ttl_seconds
+  inventory_shards         = var.inventory_shards
+  inventory_promote_threshold = var.inventory_promote_threshold
+  redrive_rate             = var.redrive_rate
+  history_cache_ttl_seconds = var.history_cache_ttl_seconds
+  status_cache_ttl_seconds = var.status_cache_ttl_seconds
+  claim_check_enabled      = var.claim_check_enabled
+  claim_check_threshold_bytes = var.claim_check_threshold_bytes
+  order_message_codec      = var.order_message_codec
+  order_message_compress   = var.order_message_compress
+  order_message_mode       = var.order_message_mode
+  tags                     = local.common_tags
 }
 
 module "step_functions" {
@@ -47,4 +47,134 @@ resource "aws_dynamodb_table" "orders" {
       write_capacity
     ]
   }
-}
\ No newline at end of file
+}
+
+resource "aws_dynamodb_table" "idempotency" {
+  name         = "${var.project_name}-${var.environment}-idempotency"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "idempotency_key"
+
+  attribute {
+    name = "idempotency_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = merge(var.tags, {
+    Name        = "${var.project_name}-${var.environment}-idempotency"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  })
+}
+
+resource "aws_dynamodb_table" "inventory" {
+  name         = "${var.project_name}-${var.environment}-inventory"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "product_id"
+
+  attribute {
+    name = "product_id"
+    type = "S"
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = merge(var.tags, {
+    Name        = "${var.project_name}-${var.environment}-inventory"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  })
+}
+
+resource "aws_dynamodb_table" "reservations" {
+  name         = "${var.project_name}-${var.environment}-reservations"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "order_id"
+
+  attribute {
+    name = "order_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "status"
+    type = "S"
+  }
+
+  attribute {
+    name = "expires_at"
+    type = "N"
+  }
+
+  # Open reservations by expiry, for reclaiming expired ones
+  global_secondary_index {
+    name            = "StatusExpiryIndex"
+    hash_key        = "status"
+    range_key       = "expires_at"
+    projection_type = "KEYS_ONLY"
+  }
+
+  ttl {
+    attribute_name = "ttl"
+    enabled        = true
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = merge(var.tags, {
+    Name        = "${var.project_name}-${var.environment}-reservations"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  })
+}
+
+resource "aws_dynamodb_table" "failed_orders" {
+  name         = "${var.project_name}-${var.environment}-failed-orders"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "failure_id"
+
+  attribute {
+    name = "failure_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "error_class"
+    type = "S"
+  }
+
+  attribute {
+    name = "failed_at"
+    type = "S"
+  }
+
+  # Failures by error class and time, for selective redrives
+  global_secondary_index {
+    name            = "ErrorClassIndex"
+    hash_key        = "error_class"
+    range_key       = "failed_at"
+    projection_type = "ALL"
+  }
+
+  server_side_encryption {
+    enabled = true
+  }
+
+  tags = merge(var.tags, {
+    Name        = "${var.project_name}-${var.environment}-failed-orders"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  })
+}
@@ -11,4 +11,44 @@ output "table_arn" {
 output "table_stream_arn" {
   description = "DynamoDB stream ARN"
   value       = aws_dynamodb_table.orders.stream_arn
-}
\ No newline at end of file
+}
+
+output "idempotency_table_name" {
+  description = "DynamoDB idempotency table name"
+  value       = aws_dynamodb_table.idempotency.name
+}
+
+output "idempotency_table_arn" {
+  description = "DynamoDB idempotency table ARN"
+  value       = aws_dynamodb_table.idempotency.arn
+}
+
+output "inventory_table_name" {
+  description = "DynamoDB inventory table name"
+  value       = aws_dynamodb_table.inventory.name
+}
+
+output "inventory_table_arn" {
+  description = "DynamoDB inventory table ARN"
+  value       = aws_dynamodb_table.inventory.arn
+}
+
+output "reservations_table_name" {
+  description = "DynamoDB inventory reservations table name"
+  value       = aws_dynamodb_table.reservations.name
+}
+
+output "reservations_table_arn" {
+  description = "DynamoDB inventory reservations table ARN"
+  value       = aws_dynamodb_table.reservations.arn
+}
+
+output "failed_orders_table_name" {
+  description = "DynamoDB failed orders table name"
+  value       = aws_dynamodb_table.failed_orders.name
+}
+
+output "failed_orders_table_arn" {
+  description = "DynamoDB failed orders table ARN"
+  value       = aws_dynamodb_table.failed_orders.arn
+}
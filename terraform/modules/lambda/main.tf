@@ -44,12 +44,20 @@ resource "aws_iam_role_policy" "lambda_policy" {
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:Query",
           "dynamodb:Scan"
         ]
         Resource = [
           var.orders_table_arn,
-          "${var.orders_table_arn}/index/*"
+          "${var.orders_table_arn}/index/*",
+          var.idempotency_table_arn,
+          var.inventory_table_arn,
+          var.reservations_table_arn,
+          "${var.reservations_table_arn}/index/*",
+          var.failed_orders_table_arn,
+          "${var.failed_orders_table_arn}/index/*"
         ]
       },
       {
@@ -57,12 +65,21 @@ resource "aws_iam_role_policy" "lambda_policy" {
         Action = [
           "sqs:SendMessage",
           "sqs:ReceiveMessage",
-          "sqs:DeleteMessage"
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
         ]
         Resource = [
           var.order_queue_arn,
           var.dlq_arn
         ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+          "s3:GetObject"
+        ]
+        Resource = "${var.payload_bucket_arn}/payloads/*"
       }
     ]
   })
@@ -80,9 +97,17 @@ resource "aws_lambda_function" "order_validator" {
   
   environment {
     variables = {
-      ENVIRONMENT     = var.environment
-      ORDERS_TABLE    = var.orders_table
-      ORDER_QUEUE_URL = var.order_queue_url
+      ENVIRONMENT                 = var.environment
+      ORDERS_TABLE                = var.orders_table
+      ORDER_QUEUE_URL             = var.order_queue_url
+      LOG_LEVEL                   = var.log_level
+      PAYLOAD_LOG_SAMPLE_RATE     = var.payload_log_sample_rate
+      CLAIM_CHECK_STORE           = var.claim_check_enabled ? "s3" : ""
+      CLAIM_CHECK_BUCKET          = var.payload_bucket_name
+      CLAIM_CHECK_THRESHOLD_BYTES = var.claim_check_threshold_bytes
+      ORDER_MESSAGE_CODEC         = var.order_message_codec
+      ORDER_MESSAGE_COMPRESS      = var.order_message_compress
+      ORDER_MESSAGE_MODE          = var.order_message_mode
     }
   }
   
@@ -98,16 +123,37 @@ resource "aws_lambda_function" "order_fulfillment" {
   filename         = "${path.module}/order_fulfillment.zip"
   function_name    = "${var.project_name}-${var.environment}-order-fulfillment"
   role            = aws_iam_role.lambda_role.arn
-  handler         = "lambda_function.lambda_handler"
+  handler         = var.fulfillment_async ? "lambda_function.async_lambda_handler" : "lambda_function.lambda_handler"
   runtime         = "python3.11"
   timeout         = var.lambda_timeout
   memory_size     = var.memory_size
   
   environment {
     variables = {
-      ENVIRONMENT  = var.environment
-      ORDERS_TABLE = var.orders_table
-      DLQ_URL     = var.dlq_url
+      ENVIRONMENT              = var.environment
+      ORDERS_TABLE             = var.orders_table
+      DLQ_URL                  = var.dlq_url
+      FULFILLMENT_MAX_WORKERS  = var.fulfillment_max_workers
+      FULFILLMENT_STEP_WORKERS = var.fulfillment_step_workers
+      SAGA_CHECKPOINT_STORE    = var.saga_checkpoint_store
+      ASYNC_MAX_CONCURRENCY    = var.fulfillment_async_concurrency
+      STATUS_WRITE_MODE        = var.status_write_mode
+      PROCESSING_LEASE_SECONDS = var.processing_lease_seconds
+      IDEMPOTENCY_STORE        = var.idempotency_store
+      IDEMPOTENCY_TABLE        = var.idempotency_table
+      LOG_LEVEL                = var.log_level
+      PAYLOAD_LOG_SAMPLE_RATE  = var.payload_log_sample_rate
+      METRICS_ENABLED          = var.metrics_enabled
+      INVENTORY_BACKEND        = var.inventory_backend
+      INVENTORY_TABLE          = var.inventory_table
+      RESERVATIONS_TABLE       = var.reservations_table
+      RESERVATION_TTL_SECONDS  = var.reservation_ttl_seconds
+      INVENTORY_SHARDS         = var.inventory_shards
+      INVENTORY_PROMOTE_THRESHOLD = var.inventory_promote_threshold
+      STATUS_CACHE_TTL_SECONDS = var.status_cache_ttl_seconds
+      CLAIM_CHECK_STORE        = var.claim_check_enabled ? "s3" : ""
+      CLAIM_CHECK_BUCKET       = var.payload_bucket_name
+      CLAIM_CHECK_THRESHOLD_BYTES = var.claim_check_threshold_bytes
     }
   }
   
@@ -116,4 +162,113 @@ resource "aws_lambda_function" "order_fulfillment" {
   })
   
   depends_on = [aws_iam_role_policy.lambda_policy]
-}
\ No newline at end of file
+}
+
+# SQS trigger for Order Fulfillment Lambda
+resource "aws_lambda_event_source_mapping" "order_queue" {
+  event_source_arn                   = var.order_queue_arn
+  function_name                      = aws_lambda_function.order_fulfillment.arn
+  batch_size                         = var.sqs_batch_size
+  maximum_batching_window_in_seconds = var.sqs_batching_window
+  function_response_types            = ["ReportBatchItemFailures"]
+}
+
+# Periodically give back stock held by expired inventory reservations and rebalance sharded products
+resource "aws_cloudwatch_event_rule" "reclaim_reservations" {
+  count               = var.inventory_backend == "dynamodb" ? 1 : 0
+  name                = "${var.project_name}-${var.environment}-reclaim-reservations"
+  schedule_expression = "rate(5 minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "reclaim_reservations" {
+  count = var.inventory_backend == "dynamodb" ? 1 : 0
+  rule  = aws_cloudwatch_event_rule.reclaim_reservations[0].name
+  arn   = aws_lambda_function.order_fulfillment.arn
+  input = jsonencode({ reclaim_reservations = true })
+}
+
+resource "aws_lambda_permission" "reclaim_reservations" {
+  count         = var.inventory_backend == "dynamodb" ? 1 : 0
+  statement_id  = "AllowReclaimReservationsSchedule"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.order_fulfillment.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.reclaim_reservations[0].arn
+}
+
+# DLQ Processor Lambda
+resource "aws_lambda_function" "dlq_processor" {
+  filename         = "${path.module}/dlq_processor.zip"
+  function_name    = "${var.project_name}-${var.environment}-dlq-processor"
+  role            = aws_iam_role.lambda_role.arn
+  handler         = "lambda_function.lambda_handler"
+  runtime         = "python3.11"
+  timeout         = var.dlq_processor_timeout
+  memory_size     = var.memory_size
+
+  environment {
+    variables = {
+      ENVIRONMENT         = var.environment
+      FAILED_ORDERS_TABLE = var.failed_orders_table
+      DLQ_URL             = var.dlq_url
+      ORDER_QUEUE_URL     = var.order_queue_url
+      REDRIVE_RATE        = var.redrive_rate
+      LOG_LEVEL           = var.log_level
+      CLAIM_CHECK_STORE   = var.claim_check_enabled ? "s3" : ""
+      CLAIM_CHECK_BUCKET  = var.payload_bucket_name
+      CLAIM_CHECK_THRESHOLD_BYTES = var.claim_check_threshold_bytes
+    }
+  }
+
+  tags = merge(var.tags, {
+    Name = "${var.project_name}-${var.environment}-dlq-processor"
+  })
+
+  depends_on = [aws_iam_role_policy.lambda_policy]
+}
+
+# Periodically drain the DLQ into the failed orders table
+resource "aws_cloudwatch_event_rule" "drain_dlq" {
+  name                = "${var.project_name}-${var.environment}-drain-dlq"
+  schedule_expression = "rate(5 minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "drain_dlq" {
+  rule = aws_cloudwatch_event_rule.drain_dlq.name
+  arn  = aws_lambda_function.dlq_processor.arn
+}
+
+resource "aws_lambda_permission" "drain_dlq" {
+  statement_id  = "AllowDrainDlqSchedule"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.dlq_processor.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.drain_dlq.arn
+}
+
+# Order History Lambda
+resource "aws_lambda_function" "order_history" {
+  filename         = "${path.module}/order_history.zip"
+  function_name    = "${var.project_name}-${var.environment}-order-history"
+  role            = aws_iam_role.lambda_role.arn
+  handler         = "lambda_function.lambda_handler"
+  runtime         = "python3.11"
+  timeout         = var.lambda_timeout
+  memory_size     = var.memory_size
+
+  environment {
+    variables = {
+      ENVIRONMENT               = var.environment
+      ORDERS_TABLE              = var.orders_table
+      HISTORY_CACHE_TTL_SECONDS = var.history_cache_ttl_seconds
+      STATUS_CACHE_TTL_SECONDS  = var.status_cache_ttl_seconds
+      LOG_LEVEL                 = var.log_level
+    }
+  }
+
+  tags = merge(var.tags, {
+    Name = "${var.project_name}-${var.environment}-order-history"
+  })
+
+  depends_on = [aws_iam_role_policy.lambda_policy]
+}
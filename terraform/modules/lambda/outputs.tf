@@ -31,4 +31,19 @@ output "validator_lambda_invoke_arn" {
 output "fulfillment_lambda_invoke_arn" {
   description = "Invoke ARN of the order fulfillment Lambda function"
   value       = aws_lambda_function.order_fulfillment.invoke_arn
-}
\ No newline at end of file
+}
+
+output "dlq_processor_lambda_name" {
+  description = "Name of the DLQ processor Lambda function"
+  value       = aws_lambda_function.dlq_processor.function_name
+}
+
+output "order_history_lambda_name" {
+  description = "Name of the order history Lambda function"
+  value       = aws_lambda_function.order_history.function_name
+}
+
+output "order_history_lambda_invoke_arn" {
+  description = "Invoke ARN of the order history Lambda function"
+  value       = aws_lambda_function.order_history.invoke_arn
+}
@@ -18,6 +18,36 @@ variable "orders_table_arn" {
   type        = string
 }
 
+variable "idempotency_table" {
+  description = "DynamoDB idempotency table name"
+  type        = string
+}
+
+variable "idempotency_table_arn" {
+  description = "DynamoDB idempotency table ARN"
+  type        = string
+}
+
+variable "inventory_table" {
+  description = "DynamoDB inventory table name"
+  type        = string
+}
+
+variable "inventory_table_arn" {
+  description = "DynamoDB inventory table ARN"
+  type        = string
+}
+
+variable "reservations_table" {
+  description = "DynamoDB inventory reservations table name"
+  type        = string
+}
+
+variable "reservations_table_arn" {
+  description = "DynamoDB inventory reservations table ARN"
+  type        = string
+}
+
 variable "order_queue_url" {
   description = "SQS order queue URL"
   type        = string
@@ -50,8 +80,194 @@ variable "memory_size" {
   default     = 512
 }
 
+variable "sqs_batch_size" {
+  description = "Maximum number of SQS messages per fulfillment invocation"
+  type        = number
+  default     = 10
+}
+
+variable "sqs_batching_window" {
+  description = "Maximum time in seconds to gather SQS messages into a batch"
+  type        = number
+  default     = 0
+}
+
+variable "fulfillment_max_workers" {
+  description = "Number of orders fulfilled concurrently within one invocation"
+  type        = number
+  default     = 1
+}
+
+variable "fulfillment_step_workers" {
+  description = "Number of independent fulfillment steps of one order run concurrently"
+  type        = number
+  default     = 4
+}
+
+variable "fulfillment_async" {
+  description = "Use the asyncio fulfillment handler for SQS batches"
+  type        = bool
+  default     = false
+}
+
+variable "fulfillment_async_concurrency" {
+  description = "Orders of one SQS batch in flight at once on the async fulfillment handler"
+  type        = number
+  default     = 16
+}
+
+variable "saga_checkpoint_store" {
+  description = "Where fulfillment saga checkpoints are kept: order, on the order record so retries resume across containers, or memory"
+  type        = string
+  default     = "order"
+}
+
+variable "status_write_mode" {
+  description = "Fulfillment status write mode: direct, or lease for conditional claims with batched terminal writes"
+  type        = string
+  default     = "direct"
+}
+
+variable "processing_lease_seconds" {
+  description = "How long a PROCESSING claim is held before another invocation may take over the order"
+  type        = number
+  default     = 300
+}
+
+variable "idempotency_store" {
+  description = "Fulfillment idempotency store: empty to disable, memory, or dynamodb"
+  type        = string
+  default     = ""
+}
+
 variable "tags" {
   description = "Tags to apply to resources"
   type        = map(string)
   default     = {}
-}
\ No newline at end of file
+}
+
+variable "log_level" {
+  description = "Log level for the Lambda functions"
+  type        = string
+  default     = "INFO"
+}
+
+variable "payload_log_sample_rate" {
+  description = "Fraction of invocations that log their full, redacted event payload"
+  type        = number
+  default     = 0.01
+}
+
+variable "metrics_enabled" {
+  description = "Emit per-step fulfillment latency metrics in CloudWatch Embedded Metric Format"
+  type        = bool
+  default     = true
+}
+
+variable "inventory_backend" {
+  description = "Fulfillment inventory backend: simulated or dynamodb"
+  type        = string
+  default     = "simulated"
+}
+
+variable "reservation_ttl_seconds" {
+  description = "Seconds an inventory reservation holds stock before it can be reclaimed"
+  type        = number
+  default     = 900
+}
+
+variable "inventory_shards" {
+  description = "Shard items a hot inventory product is split into"
+  type        = number
+  default     = 10
+}
+
+variable "inventory_promote_threshold" {
+  description = "Transaction conflicts per minute on one product before it is sharded"
+  type        = number
+  default     = 20
+}
+
+variable "failed_orders_table" {
+  description = "Name of the DynamoDB failed orders table"
+  type        = string
+}
+
+variable "failed_orders_table_arn" {
+  description = "ARN of the DynamoDB failed orders table"
+  type        = string
+}
+
+variable "dlq_processor_timeout" {
+  description = "DLQ processor Lambda timeout in seconds, long enough for several long polls"
+  type        = number
+  default     = 300
+}
+
+variable "redrive_rate" {
+  description = "Orders per second replayed into the order queue by a redrive"
+  type        = number
+  default     = 10
+}
+
+variable "history_cache_ttl_seconds" {
+  description = "Seconds a warm order history Lambda reuses a page of a customer's orders, 0 disables caching"
+  type        = number
+  default     = 5
+}
+
+variable "status_cache_ttl_seconds" {
+  description = "Seconds a warm Lambda reuses an order status it read, 0 disables caching"
+  type        = number
+  default     = 5
+}
+
+variable "payload_bucket_name" {
+  description = "Name of the bucket holding offloaded message bodies"
+  type        = string
+}
+
+variable "payload_bucket_arn" {
+  description = "ARN of the bucket holding offloaded message bodies"
+  type        = string
+}
+
+variable "claim_check_enabled" {
+  description = "Offload order and DLQ message bodies above claim_check_threshold_bytes to S3"
+  type        = bool
+  default     = true
+}
+
+variable "claim_check_threshold_bytes" {
+  description = "Largest message body sent inline, larger bodies are offloaded to S3"
+  type        = number
+  default     = 65536
+}
+
+variable "order_message_codec" {
+  description = "Encoding of order messages sent to the order queue: json, or binary for smaller bodies at a higher encode and decode CPU cost"
+  type        = string
+  default     = "json"
+
+  validation {
+    condition     = contains(["json", "binary"], var.order_message_codec)
+    error_message = "order_message_codec must be json or binary."
+  }
+}
+
+variable "order_message_compress" {
+  description = "zlib-compress binary order messages"
+  type        = bool
+  default     = false
+}
+
+variable "order_message_mode" {
+  description = "Order queue message contents: full orders, or thin messages with only the order ID that fulfillment reads back from DynamoDB"
+  type        = string
+  default     = "full"
+
+  validation {
+    condition     = contains(["full", "thin"], var.order_message_mode)
+    error_message = "order_message_mode must be full or thin."
+  }
+}
@@ -26,4 +26,50 @@ resource "aws_sqs_queue" "order_queue" {
     Name = "${var.project_name}-${var.environment}-order-queue"
     Type = "OrderQueue"
   })
-}
\ No newline at end of file
+}
+
+# Claim-check store for order and DLQ message bodies too large to send inline
+resource "aws_s3_bucket" "order_payloads" {
+  bucket_prefix = "${var.project_name}-${var.environment}-payloads-"
+
+  tags = merge(var.tags, {
+    Name = "${var.project_name}-${var.environment}-order-payloads"
+    Type = "ClaimCheckStore"
+  })
+}
+
+resource "aws_s3_bucket_public_access_block" "order_payloads" {
+  bucket                  = aws_s3_bucket.order_payloads.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "order_payloads" {
+  bucket = aws_s3_bucket.order_payloads.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+# Payloads outlive the 14-day message retention of both queues
+resource "aws_s3_bucket_lifecycle_configuration" "order_payloads" {
+  bucket = aws_s3_bucket.order_payloads.id
+
+  rule {
+    id     = "expire-payloads"
+    status = "Enabled"
+
+    filter {
+      prefix = "payloads/"
+    }
+
+    expiration {
+      days = var.payload_retention_days
+    }
+  }
+}
@@ -26,4 +26,14 @@ output "dlq_arn" {
 output "dlq_name" {
   description = "Name of the dead letter queue"
   value       = aws_sqs_queue.order_dlq.name
-}
\ No newline at end of file
+}
+
+output "payload_bucket_name" {
+  description = "Name of the bucket holding offloaded message bodies"
+  value       = aws_s3_bucket.order_payloads.bucket
+}
+
+output "payload_bucket_arn" {
+  description = "ARN of the bucket holding offloaded message bodies"
+  value       = aws_s3_bucket.order_payloads.arn
+}
@@ -20,6 +20,12 @@ variable "max_receive_count" {
   default     = 3
 }
 
+variable "payload_retention_days" {
+  description = "Days offloaded message bodies are kept, longer than the queues' message retention"
+  type        = number
+  default     = 30
+}
+
 variable "tags" {
   description = "Tags to apply to resources"
   type        = map(string)
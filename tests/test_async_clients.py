@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+import os
+import sys
+import threading
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from async_clients import AsyncClient, AsyncDynamoDB
+
+class TestAsyncClients(unittest.TestCase):
+
+    @patch('aws_clients.get_client')
+    def test_table_update_item(self, mock_get_client):
+        """Test awaited table calls serialize like the sync table and run off the loop"""
+        threads = []
+
+        def update_item(**kwargs):
+            threads.append(threading.current_thread().name)
+            return {'Attributes': {'status': {'S': 'FULFILLED'}}}
+
+        mock_client = MagicMock()
+        mock_client.update_item.side_effect = update_item
+        mock_get_client.return_value = mock_client
+
+        result = asyncio.run(AsyncDynamoDB().Table('test-orders').update_item(
+            Key={'order_id': 'ORDER123'},
+            UpdateExpression='SET #status = :status',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':status': 'FULFILLED'}
+        ))
+
+        call_args = mock_client.update_item.call_args[1]
+        self.assertEqual(call_args['TableName'], 'test-orders')
+        self.assertEqual(call_args['Key'], {'order_id': {'S': 'ORDER123'}})
+        self.assertEqual(result['Attributes'], {'status': 'FULFILLED'})
+        self.assertTrue(threads[0].startswith('aws-io'))
+
+    @patch('async_clients.get_client')
+    def test_client_calls_overlap(self, mock_get_client):
+        """Test concurrent awaits keep several blocking calls in flight"""
+        # Each call blocks until both are running at the same time
+        barrier = threading.Barrier(2, timeout=5)
+        mock_client = MagicMock()
+
+        def send_message(**kwargs):
+            barrier.wait()
+            return {'MessageId': kwargs['MessageBody']}
+
+        mock_client.send_message.side_effect = send_message
+        mock_get_client.return_value = mock_client
+        sqs = AsyncClient('sqs')
+
+        async def send_both():
+            return await asyncio.gather(
+                sqs.send_message(QueueUrl='queue', MessageBody='1'),
+                sqs.send_message(QueueUrl='queue', MessageBody='2')
+            )
+
+        responses = asyncio.run(send_both())
+
+        self.assertEqual([r['MessageId'] for r in responses], ['1', '2'])
+        mock_get_client.assert_called_with('sqs')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+from decimal import Decimal
+
+from hypothesis import given, strategies as st
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+import aws_clients
+from aws_clients import (
+    DynamoDB, LazyClient, serialize, deserialize, serialize_item, deserialize_item
+)
+
+# Values an order document can hold
+scalars = (
+    st.text(max_size=20)
+    | st.integers()
+    | st.decimals(allow_nan=False, allow_infinity=False, places=4)
+    | st.booleans()
+    | st.none()
+)
+documents = st.recursive(
+    scalars,
+    lambda children: st.lists(children, max_size=5) | st.dictionaries(st.text(max_size=10), children, max_size=5),
+    max_leaves=10
+)
+
+class TestAwsClients(unittest.TestCase):
+
+    def test_serialize_matches_dynamodb_types(self):
+        """Test values are converted to DynamoDB attribute values"""
+        self.assertEqual(serialize('ORDER123'), {'S': 'ORDER123'})
+        self.assertEqual(serialize(2), {'N': '2'})
+        self.assertEqual(serialize(Decimal('29.99')), {'N': '29.99'})
+        self.assertEqual(serialize(True), {'BOOL': True})
+        self.assertEqual(serialize(None), {'NULL': True})
+        self.assertEqual(
+            serialize({'items': [{'quantity': 1}]}),
+            {'M': {'items': {'L': [{'M': {'quantity': {'N': '1'}}}]}}}
+        )
+
+    def test_serialize_rejects_float(self):
+        """Test floats are rejected like boto3's TypeSerializer"""
+        with self.assertRaises(TypeError):
+            serialize(29.99)
+
+    def test_deserialize_returns_decimal_numbers(self):
+        """Test numbers come back as Decimal"""
+        self.assertEqual(deserialize({'N': '59.98'}), Decimal('59.98'))
+        self.assertEqual(deserialize({'M': {'status': {'S': 'FULFILLED'}}}), {'status': 'FULFILLED'})
+
+    @given(documents)
+    def test_round_trip(self, value):
+        """Test unmarshalling returns the marshalled value"""
+        self.assertEqual(deserialize(serialize(value)), value)
+
+    @given(documents)
+    def test_round_trip_keeps_attribute_types(self, value):
+        """Test a round trip does not change the stored representation"""
+        attribute = serialize(value)
+        self.assertEqual(serialize(deserialize(attribute)), attribute)
+
+    @given(st.dictionaries(st.text(max_size=10), documents, max_size=5))
+    def test_item_round_trip(self, item):
+        """Test whole items round trip"""
+        self.assertEqual(deserialize_item(serialize_item(item)), item)
+
+    @patch('aws_clients.get_client')
+    def test_table_update_item(self, mock_get_client):
+        """Test table calls use the low-level client with serialized values"""
+        mock_client = MagicMock()
+        mock_client.update_item.return_value = {'Attributes': {'status': {'S': 'FULFILLED'}}}
+        mock_get_client.return_value = mock_client
+
+        result = DynamoDB().Table('test-orders').update_item(
+            Key={'order_id': 'ORDER123'},
+            UpdateExpression='SET #status = :status',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':status': 'FULFILLED'}
+        )
+
+        mock_get_client.assert_called_once_with('dynamodb')
+        call_args = mock_client.update_item.call_args[1]
+        self.assertEqual(call_args['TableName'], 'test-orders')
+        self.assertEqual(call_args['Key'], {'order_id': {'S': 'ORDER123'}})
+        self.assertEqual(call_args['ExpressionAttributeValues'], {':status': {'S': 'FULFILLED'}})
+        self.assertEqual(result['Attributes'], {'status': 'FULFILLED'})
+
+    @patch.dict('aws_clients._clients', clear=True)
+    @patch('boto3.client')
+    def test_lazy_client_created_once(self, mock_boto3_client):
+        """Test clients are built on first use and then reused"""
+        sqs = LazyClient('sqs')
+        mock_boto3_client.assert_not_called()
+
+        sqs.send_message(QueueUrl='queue', MessageBody='{}')
+        sqs.send_message(QueueUrl='queue', MessageBody='{}')
+
+        mock_boto3_client.assert_called_once_with('sqs', config=aws_clients.get_config())
+
+if __name__ == '__main__':
+    unittest.main()
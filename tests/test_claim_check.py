@@ -0,0 +1,62 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from claim_check import ClaimCheck, ClaimCheckError, LocalBlobStore, is_pointer
+
+class TestClaimCheck(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a claim check over a temporary directory"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = LocalBlobStore(directory.name)
+        self.claim_check = ClaimCheck(self.store, threshold_bytes=100)
+        self.large_body = json.dumps({'order_id': 'ORDER1', 'items': [{'product_id': 'PROD001'}] * 50})
+
+    def test_small_bodies_inline(self):
+        """Test bodies up to the threshold pass through untouched"""
+        body = json.dumps({'order_id': 'ORDER1'})
+
+        self.assertEqual(self.claim_check.offload(body, order_id='ORDER1'), body)
+        self.assertEqual(self.claim_check.rehydrate(body), body)
+
+    def test_large_bodies_offloaded_and_rehydrated(self):
+        """Test large bodies become a compact pointer that reads back to the original"""
+        pointer = self.claim_check.offload(self.large_body, order_id='ORDER1')
+
+        self.assertTrue(is_pointer(pointer))
+        self.assertLess(len(pointer), 300)
+        self.assertEqual(json.loads(pointer)['order_id'], 'ORDER1')
+        self.assertEqual(json.loads(pointer)['claim_check']['encoding'], 'gzip')
+        self.assertEqual(self.claim_check.rehydrate(pointer), self.large_body)
+
+    def test_uncompressed_and_without_store(self):
+        """Test compression is optional and pointers need a store to be read"""
+        uncompressed = ClaimCheck(self.store, threshold_bytes=100, compress=False)
+        pointer = uncompressed.offload(self.large_body)
+        self.assertEqual(uncompressed.rehydrate(pointer), self.large_body)
+
+        self.assertEqual(ClaimCheck(None).offload(self.large_body), self.large_body)
+        with self.assertRaises(ClaimCheckError):
+            ClaimCheck(None).rehydrate(pointer)
+
+    def test_corrupt_or_missing_payload(self):
+        """Test a payload that changed or vanished is reported, never returned"""
+        pointer = self.claim_check.offload(self.large_body)
+        key = json.loads(pointer)['claim_check']['key']
+
+        self.store.put(key, b'tampered')
+        with self.assertRaises(ClaimCheckError):
+            self.claim_check.rehydrate(pointer)
+
+        os.remove(os.path.join(self.store.directory, key))
+        with self.assertRaises(ClaimCheckError):
+            self.claim_check.rehydrate(pointer)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import os
+import json
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'order-fulfillment'))
+
+from claim_check import ClaimCheck, LocalBlobStore
+from dlq import DlqPublisher, batches
+
+class TestDlqPublisher(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.sqs = MagicMock()
+        self.sqs.send_message_batch.return_value = {'Successful': [], 'Failed': []}
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.spill_path = os.path.join(directory.name, 'spill.jsonl')
+        self.publisher = DlqPublisher(self.sqs, 'dlq-url', spill_path=self.spill_path, base_delay=0)
+
+    def test_messages_sent_in_batches_of_ten(self):
+        """Test buffered messages go out with as few batch calls as the limits allow"""
+        for i in range(25):
+            self.publisher.add(f'message {i}')
+
+        stats = self.publisher.flush()
+
+        self.assertEqual(stats, {'sent': 25, 'spilled': 0, 'rejected': 0})
+        self.assertEqual([len(c[1]['Entries']) for c in self.sqs.send_message_batch.call_args_list], [10, 10, 5])
+        self.assertEqual(self.publisher.flush()['sent'], 0)
+
+    def test_batches_respect_payload_limit(self):
+        """Test large messages are split before the 256 KiB batch limit"""
+        self.assertEqual([len(b) for b in batches(['x' * 100 * 1024] * 5)], [2, 2, 1])
+
+    def test_failed_entries_retried(self):
+        """Test only the entries reported as failed are sent again"""
+        self.sqs.send_message_batch.side_effect = [
+            {'Failed': [{'Id': '1', 'SenderFault': False, 'Code': 'InternalError'},
+                        {'Id': '2', 'SenderFault': True, 'Code': 'InvalidMessageContents'}]},
+            {'Failed': []}
+        ]
+        for body in ('a', 'b', 'c'):
+            self.publisher.add(body)
+
+        stats = self.publisher.flush()
+
+        self.assertEqual(stats, {'sent': 2, 'spilled': 0, 'rejected': 1})
+        retried = self.sqs.send_message_batch.call_args_list[1][1]['Entries']
+        self.assertEqual([e['MessageBody'] for e in retried], ['b'])
+
+    def test_rejected_messages_kept_in_rejected_file(self):
+        """Test sender faults are kept apart from the spill file and not resent"""
+        self.sqs.send_message_batch.return_value = {
+            'Failed': [{'Id': '0', 'SenderFault': True, 'Code': 'InvalidMessageContents'}]
+        }
+        self.publisher.add('{"order": {"order_id": "ORDER1"}}')
+
+        stats = self.publisher.flush()
+
+        self.assertEqual(stats['rejected'], 1)
+        self.assertFalse(os.path.exists(self.spill_path))
+        with open(self.publisher.rejected_path) as f:
+            self.assertEqual([json.loads(line) for line in f], [
+                {'rejected': 'InvalidMessageContents', 'body': '{"order": {"order_id": "ORDER1"}}'}
+            ])
+
+        self.sqs.send_message_batch.reset_mock()
+        self.assertEqual(self.publisher.flush()['sent'], 0)
+        self.sqs.send_message_batch.assert_not_called()
+
+    def test_rejected_messages_kept_in_claim_check_store(self):
+        """Test sender faults are stored through the claim check when it has a store"""
+        store = LocalBlobStore(os.path.join(self.directory, 'payloads'))
+        publisher = DlqPublisher(self.sqs, 'dlq-url', spill_path=self.spill_path,
+                                 claim_check=ClaimCheck(store), base_delay=0)
+        self.sqs.send_message_batch.return_value = {
+            'Failed': [{'Id': '0', 'SenderFault': True, 'Code': 'InvalidMessageContents'}]
+        }
+        publisher.add('{"order": {"order_id": "ORDER1"}}')
+
+        publisher.flush()
+
+        rejected_dir = os.path.join(self.directory, 'payloads', 'payloads', 'rejected')
+        [key] = os.listdir(rejected_dir)
+        self.assertEqual(store.get(f'payloads/rejected/{key}'), b'{"order": {"order_id": "ORDER1"}}')
+        self.assertFalse(os.path.exists(publisher.rejected_path))
+
+    def test_unsent_messages_spilled_and_sent_next_flush(self):
+        """Test messages survive an SQS outage on disk until the next flush"""
+        self.sqs.send_message_batch.side_effect = ConnectionError('endpoint unreachable')
+        self.publisher.add('{"order": {"order_id": "ORDER1"}}')
+
+        stats = self.publisher.flush()
+
+        self.assertEqual(stats['spilled'], 1)
+        self.assertEqual(self.sqs.send_message_batch.call_count, 3)
+        self.assertTrue(os.path.exists(self.spill_path))
+
+        self.sqs.send_message_batch.side_effect = None
+        self.publisher.add('{"order": {"order_id": "ORDER2"}}')
+        stats = self.publisher.flush()
+
+        self.assertEqual(stats['sent'], 2)
+        bodies = [e['MessageBody'] for e in self.sqs.send_message_batch.call_args[1]['Entries']]
+        self.assertEqual(bodies, ['{"order": {"order_id": "ORDER1"}}', '{"order": {"order_id": "ORDER2"}}'])
+        self.assertFalse(os.path.exists(self.spill_path))
+
+    def test_truncated_spill_line_skipped(self):
+        """Test a corrupt spill line does not lose the messages around it"""
+        with open(self.spill_path, 'w') as f:
+            f.write('"first"\n{"order": \n"second"\n')
+
+        stats = self.publisher.flush()
+
+        self.assertEqual(stats['sent'], 2)
+        bodies = [e['MessageBody'] for e in self.sqs.send_message_batch.call_args[1]['Entries']]
+        self.assertEqual(bodies, ['first', 'second'])
+        self.assertFalse(os.path.exists(self.spill_path))
+
+if __name__ == '__main__':
+    unittest.main()
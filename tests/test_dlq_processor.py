@@ -0,0 +1,199 @@
+import unittest
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import boto3
+from moto import mock_dynamodb, mock_sqs
+
+# Set up environment variables for testing
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['FAILED_ORDERS_TABLE'] = 'test-failed-orders'
+os.environ['DLQ_URL'] = 'https://sqs.us-east-1.amazonaws.com/123456789/test-dlq'
+os.environ['ORDER_QUEUE_URL'] = 'https://sqs.us-east-1.amazonaws.com/123456789/test-queue'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'dlq-processor'))
+
+# Every lambda ships a lambda_function module, load this one afresh
+sys.modules.pop('lambda_function', None)
+import lambda_function
+from lambda_function import (
+    TokenBucket, drain_dlq, error_class, lambda_handler, redrive
+)
+
+class TestTokenBucket(unittest.TestCase):
+
+    @patch('time.sleep')
+    @patch('time.monotonic')
+    def test_acquire_waits_for_refill(self, mock_monotonic, mock_sleep):
+        """Test a drained bucket blocks until enough tokens have accrued"""
+        mock_monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=5, capacity=10)
+        bucket.acquire(10)
+        mock_sleep.assert_not_called()
+
+        mock_sleep.side_effect = lambda seconds: setattr(mock_monotonic, 'return_value', 100.0 + seconds)
+        bucket.acquire(5)
+
+        mock_sleep.assert_called_once_with(1.0)
+
+    def test_rate_must_be_positive(self):
+        """Test a zero or negative rate is rejected instead of dividing by zero later"""
+        for rate in (0, -1):
+            with self.assertRaises(ValueError):
+                TokenBucket(rate=rate, capacity=10)
+
+class TestErrorClass(unittest.TestCase):
+
+    def test_error_class(self):
+        """Test errors are grouped by the text before the first colon"""
+        self.assertEqual(error_class('Payment failed: Payment declined - amount exceeds limit'), 'Payment failed')
+        self.assertEqual(error_class('Max receives exceeded'), 'Max receives exceeded')
+
+@mock_sqs
+@mock_dynamodb
+class TestDlqProcessor(unittest.TestCase):
+
+    def setUp(self):
+        """Create the failed orders table and both queues"""
+        boto3.client('dynamodb').create_table(
+            TableName='test-failed-orders',
+            KeySchema=[{'AttributeName': 'failure_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[
+                {'AttributeName': 'failure_id', 'AttributeType': 'S'},
+                {'AttributeName': 'error_class', 'AttributeType': 'S'},
+                {'AttributeName': 'failed_at', 'AttributeType': 'S'}
+            ],
+            GlobalSecondaryIndexes=[{
+                'IndexName': 'ErrorClassIndex',
+                'KeySchema': [
+                    {'AttributeName': 'error_class', 'KeyType': 'HASH'},
+                    {'AttributeName': 'failed_at', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        self.sqs = boto3.client('sqs')
+        self.dlq_url = self.sqs.create_queue(QueueName='test-dlq')['QueueUrl']
+        self.queue_url = self.sqs.create_queue(QueueName='test-queue')['QueueUrl']
+
+        # Fresh low-level clients for every test, created inside the mock
+        clients = patch.dict('aws_clients._clients', clear=True)
+        clients.start()
+        self.addCleanup(clients.stop)
+        for name, value in (('DLQ_URL', self.dlq_url), ('ORDER_QUEUE_URL', self.queue_url), ('WAIT_TIME_SECONDS', 0)):
+            setting = patch.object(lambda_function, name, value)
+            setting.start()
+            self.addCleanup(setting.stop)
+
+    def send_failure(self, order_id, error):
+        self.sqs.send_message(QueueUrl=self.dlq_url, MessageBody=json.dumps({
+            'order': {'order_id': order_id, 'total_amount': '10.00'},
+            'error': error,
+            'failed_at': f'2026-01-01T00:00:0{order_id[-1]}'
+        }))
+
+    def failures(self):
+        items = boto3.resource('dynamodb').Table('test-failed-orders').scan()['Items']
+        return {item['order_id']: item for item in items}
+
+    def queued_orders(self):
+        messages = self.sqs.receive_message(QueueUrl=self.queue_url, MaxNumberOfMessages=10).get('Messages', [])
+        return sorted(json.loads(message['Body'])['order_id'] for message in messages)
+
+    def test_drain_persists_and_deletes(self):
+        """Test fulfillment failures and max-receive moves are both stored, then removed from the DLQ"""
+        self.send_failure('ORDER1', 'Payment failed: Payment declined - amount exceeds limit')
+        self.sqs.send_message(QueueUrl=self.dlq_url, MessageBody=json.dumps({'order_id': 'ORDER2'}))
+
+        result = drain_dlq()
+
+        self.assertEqual(result, {'drained': 2, 'failed': 0})
+        failures = self.failures()
+        self.assertEqual(failures['ORDER1']['error_class'], 'Payment failed')
+        self.assertEqual(failures['ORDER1']['status'], 'FAILED')
+        self.assertEqual(failures['ORDER2']['error_class'], 'Max receives exceeded')
+        self.assertEqual(json.loads(failures['ORDER2']['order']), {'order_id': 'ORDER2'})
+        attributes = self.sqs.get_queue_attributes(
+            QueueUrl=self.dlq_url, AttributeNames=['ApproximateNumberOfMessages']
+        )['Attributes']
+        self.assertEqual(attributes['ApproximateNumberOfMessages'], '0')
+
+    def test_thin_messages_redriven_thin(self):
+        """Test an order ID-only message keeps its thin mode through a redrive"""
+        self.sqs.send_message(QueueUrl=self.dlq_url, MessageBody=json.dumps({'order_id': 'ORDER1'}),
+                              MessageAttributes={'message_mode': {'StringValue': 'thin', 'DataType': 'String'}})
+        drain_dlq()
+
+        redrive()
+
+        message = self.sqs.receive_message(QueueUrl=self.queue_url, MessageAttributeNames=['All'])['Messages'][0]
+        self.assertEqual(json.loads(message['Body']), {'order_id': 'ORDER1'})
+        self.assertEqual(message['MessageAttributes']['message_mode']['StringValue'], 'thin')
+
+    def test_redrive_selected_failures(self):
+        """Test only matching failures are replayed, once"""
+        self.send_failure('ORDER1', 'Payment failed: Payment declined - amount exceeds limit')
+        self.send_failure('ORDER2', 'Payment failed: Gateway timeout')
+        self.send_failure('ORDER3', 'Inventory check failed: Insufficient stock for PROD001')
+        drain_dlq()
+
+        result = lambda_handler({'redrive': {'error_class': 'Payment failed', 'error_contains': 'DECLINED'}}, None)
+
+        self.assertEqual(result, {'selected': 1, 'redriven': 1, 'failed': 0})
+        self.assertEqual(self.queued_orders(), ['ORDER1'])
+        failures = self.failures()
+        self.assertEqual(failures['ORDER1']['status'], 'REDRIVEN')
+        self.assertEqual(failures['ORDER2']['status'], 'FAILED')
+        self.assertEqual(redrive(error_class='Payment failed', error_contains='declined')['selected'], 0)
+
+    def test_redrive_skips_failures_claimed_elsewhere(self):
+        """Test a failure another redrive has claimed since selection is not sent again"""
+        self.send_failure('ORDER1', 'Shipment failed: Carrier unavailable')
+        self.send_failure('ORDER2', 'Shipment failed: Carrier unavailable')
+        drain_dlq()
+        selected = lambda_function.select_failures()
+        failure_id = self.failures()['ORDER1']['failure_id']
+        boto3.resource('dynamodb').Table('test-failed-orders').update_item(
+            Key={'failure_id': failure_id},
+            UpdateExpression='SET redriven_at = :now',
+            ExpressionAttributeValues={':now': '2026-01-01T00:00:00'}
+        )
+
+        with patch.object(lambda_function, 'select_failures', return_value=selected):
+            result = redrive(rate=1000)
+
+        self.assertEqual(result, {'selected': 2, 'redriven': 1, 'failed': 1})
+        self.assertEqual(self.queued_orders(), ['ORDER2'])
+
+    def test_unsent_failures_released(self):
+        """Test failures that could not be queued go back to FAILED for a later redrive"""
+        self.send_failure('ORDER1', 'Shipment failed: Carrier unavailable')
+        drain_dlq()
+
+        with patch.object(lambda_function, 'send_orders', return_value=[]):
+            result = redrive(rate=1000)
+
+        self.assertEqual(result['redriven'], 0)
+        failure = self.failures()['ORDER1']
+        self.assertEqual(failure['status'], 'FAILED')
+        self.assertNotIn('redriven_at', failure)
+        self.assertEqual(redrive(rate=1000)['redriven'], 1)
+        self.assertEqual(self.queued_orders(), ['ORDER1'])
+
+    def test_redrive_everything(self):
+        """Test a redrive without filters replays every failure"""
+        for n in range(1, 4):
+            self.send_failure(f'ORDER{n}', 'Shipment failed: Carrier unavailable')
+        drain_dlq()
+
+        result = redrive(rate=1000)
+
+        self.assertEqual(result['redriven'], 3)
+        self.assertEqual(self.queued_orders(), ['ORDER1', 'ORDER2', 'ORDER3'])
+
+if __name__ == '__main__':
+    unittest.main()
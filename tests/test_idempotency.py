@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'order-fulfillment'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from idempotency import (
+    Idempotency, IdempotencyInProgressError, InMemoryIdempotencyStore
+)
+
+class TestIdempotency(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.store = InMemoryIdempotencyStore()
+        self.idempotency = Idempotency(self.store, cache_size=2)
+        self.step = MagicMock(return_value={'success': True, 'tracking_number': 'TRK12345678'})
+
+    def test_run_skips_completed_step(self):
+        """Test a completed step is not run again"""
+        first = self.idempotency.run('ORDER123', 'shipment', self.step, 'arg')
+        second = self.idempotency.run('ORDER123', 'shipment', self.step, 'arg')
+
+        self.step.assert_called_once_with('arg')
+        self.assertEqual(first, second)
+
+    def test_run_uses_store_after_cache_eviction(self):
+        """Test completed steps survive LRU eviction and new containers"""
+        self.idempotency.run('ORDER1', 'shipment', self.step)
+        self.idempotency.run('ORDER2', 'shipment', self.step)
+        self.idempotency.run('ORDER3', 'shipment', self.step)
+
+        Idempotency(self.store).run('ORDER1', 'shipment', self.step)
+
+        self.assertEqual(self.step.call_count, 3)
+
+    def test_run_does_not_record_failures(self):
+        """Test failed steps can be retried"""
+        self.step.return_value = {'success': False, 'error': 'Payment declined'}
+
+        self.idempotency.run('ORDER123', 'payment', self.step)
+        self.idempotency.run('ORDER123', 'payment', self.step)
+
+        self.assertEqual(self.step.call_count, 2)
+
+    def test_run_releases_claim_on_exception(self):
+        """Test an exception does not leave the step claimed"""
+        self.step.side_effect = [RuntimeError('timeout'), {'success': True}]
+
+        with self.assertRaises(RuntimeError):
+            self.idempotency.run('ORDER123', 'payment', self.step)
+
+        result = self.idempotency.run('ORDER123', 'payment', self.step)
+        self.assertTrue(result['success'])
+
+    def test_run_in_progress(self):
+        """Test a step claimed elsewhere is not run concurrently"""
+        self.store.claim('ORDER123#payment', 2 ** 31)
+
+        with self.assertRaises(IdempotencyInProgressError):
+            self.idempotency.run('ORDER123', 'payment', self.step)
+
+        self.step.assert_not_called()
+
+    def test_invalidate(self):
+        """Test an invalidated step runs again"""
+        self.idempotency.run('ORDER123', 'payment', self.step)
+        self.idempotency.invalidate('ORDER123', 'payment')
+        self.idempotency.run('ORDER123', 'payment', self.step)
+
+        self.assertEqual(self.step.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+import boto3
+from botocore.exceptions import ClientError
+from moto import mock_dynamodb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'order-fulfillment'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from aws_clients import DynamoDB
+from inventory import DynamoDBInventoryBackend, InMemoryInventoryBackend, InventoryCache, aggregate_quantities
+
+class TestInventoryCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.backend = InMemoryInventoryBackend({'PROD001': 5, 'PROD002': 0})
+        self.cache = InventoryCache(self.backend, ttl_seconds=30, max_size=2)
+
+    def test_misses_fetched_in_one_call(self):
+        """Test uncached products are looked up in a single backend call"""
+        stock = self.cache.get_many(['PROD001', 'PROD002', 'PROD001', 'PROD003'])
+
+        self.assertEqual(stock, {'PROD001': 5, 'PROD002': 0, 'PROD003': 0})
+        self.assertEqual(self.backend.calls, 1)
+        self.assertEqual(self.cache.take_stats(), {'hits': 0, 'misses': 3})
+
+    def test_hits_skip_backend(self):
+        """Test cached products are served without a backend call"""
+        self.cache.get_many(['PROD001'])
+        self.backend.stock['PROD001'] = 1
+
+        stock = self.cache.get_many(['PROD001'])
+
+        self.assertEqual(stock, {'PROD001': 5})
+        self.assertEqual(self.backend.calls, 1)
+        self.assertEqual(self.cache.take_stats(), {'hits': 1, 'misses': 1})
+        self.assertEqual(self.cache.take_stats(), {'hits': 0, 'misses': 0})
+
+    @patch('ttl_cache.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        """Test stock is fetched again once the TTL has passed"""
+        mock_monotonic.return_value = 100
+        self.cache.get_many(['PROD001'])
+        self.backend.stock['PROD001'] = 1
+        mock_monotonic.return_value = 131
+
+        self.assertEqual(self.cache.get_many(['PROD001']), {'PROD001': 1})
+        self.assertEqual(self.backend.calls, 2)
+
+    def test_least_recently_used_evicted(self):
+        """Test the cache keeps at most max_size products"""
+        self.cache.get_many(['PROD001'])
+        self.cache.get_many(['PROD002'])
+        self.cache.get_many(['PROD001'])
+        self.cache.get_many(['PROD003'])
+
+        self.cache.get_many(['PROD001'])
+        self.assertEqual(self.backend.calls, 3)
+        self.cache.get_many(['PROD002'])
+        self.assertEqual(self.backend.calls, 4)
+
+    def test_invalidate(self):
+        """Test invalidated products are fetched again"""
+        self.cache.get_many(['PROD001'])
+        self.cache.invalidate(['PROD001'])
+        self.cache.get_many(['PROD001'])
+
+        self.assertEqual(self.backend.calls, 2)
+
+class TestInMemoryInventoryBackend(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.backend = InMemoryInventoryBackend({'PROD001': 5, 'PROD002': 1})
+
+    def test_aggregate_quantities(self):
+        """Test duplicate product lines are summed"""
+        items = [
+            {'product_id': 'PROD001', 'quantity': 2},
+            {'product_id': 'PROD002', 'quantity': 1},
+            {'product_id': 'PROD001', 'quantity': 3}
+        ]
+        self.assertEqual(aggregate_quantities(items), {'PROD001': 5, 'PROD002': 1})
+
+    def test_reserve_is_all_or_nothing(self):
+        """Test a short product leaves every other product untouched"""
+        result = self.backend.reserve('ORDER1', {'PROD001': 2, 'PROD002': 2}, 2000000000)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(self.backend.stock, {'PROD001': 5, 'PROD002': 1})
+
+    def test_release_and_reclaim(self):
+        """Test released and expired reservations give their stock back"""
+        self.backend.reserve('ORDER1', {'PROD001': 2}, 100)
+        self.backend.reserve('ORDER2', {'PROD001': 2}, 300)
+        self.assertEqual(self.backend.stock['PROD001'], 1)
+
+        self.assertEqual(self.backend.reclaim_expired(200), 1)
+        self.assertEqual(self.backend.stock['PROD001'], 3)
+        self.assertTrue(self.backend.commit('ORDER2'))
+        self.assertFalse(self.backend.release('ORDER2'))
+        self.assertEqual(self.backend.stock['PROD001'], 3)
+
+@mock_dynamodb
+class TestDynamoDBInventoryBackend(unittest.TestCase):
+
+    def setUp(self):
+        """Create inventory and reservation tables"""
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+        client = boto3.client('dynamodb')
+        client.create_table(
+            TableName='test-inventory',
+            KeySchema=[{'AttributeName': 'product_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'product_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        client.create_table(
+            TableName='test-reservations',
+            KeySchema=[{'AttributeName': 'order_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[
+                {'AttributeName': 'order_id', 'AttributeType': 'S'},
+                {'AttributeName': 'status', 'AttributeType': 'S'},
+                {'AttributeName': 'expires_at', 'AttributeType': 'N'}
+            ],
+            GlobalSecondaryIndexes=[{
+                'IndexName': 'StatusExpiryIndex',
+                'KeySchema': [
+                    {'AttributeName': 'status', 'KeyType': 'HASH'},
+                    {'AttributeName': 'expires_at', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'KEYS_ONLY'}
+            }],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        for product_id, available in (('PROD001', 5), ('PROD002', 1)):
+            client.put_item(TableName='test-inventory',
+                            Item={'product_id': {'S': product_id}, 'available': {'N': str(available)}})
+
+        # Fresh low-level clients for every test, created inside the mock
+        clients = patch.dict('aws_clients._clients', clear=True)
+        clients.start()
+        self.addCleanup(clients.stop)
+        self.backend = DynamoDBInventoryBackend(DynamoDB(), 'test-inventory', 'test-reservations')
+
+    def test_reserve_decrements_atomically(self):
+        """Test stock is only taken when every product has enough"""
+        failed = self.backend.reserve('ORDER1', {'PROD001': 2, 'PROD002': 2}, 2000000000)
+        reserved = self.backend.reserve('ORDER2', {'PROD001': 2, 'PROD002': 1}, 2000000000)
+
+        self.assertEqual(failed, {'success': False, 'error': 'Insufficient stock for product PROD002'})
+        self.assertTrue(reserved['success'])
+        self.assertEqual(self.backend.get_stock(['PROD001', 'PROD002', 'PROD003']),
+                         {'PROD001': 3, 'PROD002': 0, 'PROD003': 0})
+
+    def test_reserve_is_idempotent(self):
+        """Test reserving the same order twice takes stock once"""
+        self.backend.reserve('ORDER1', {'PROD001': 2}, 2000000000)
+        result = self.backend.reserve('ORDER1', {'PROD001': 2}, 2000000000)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(self.backend.get_stock(['PROD001']), {'PROD001': 3})
+
+    def test_release_commit_and_reclaim(self):
+        """Test reservations end exactly once"""
+        self.backend.reserve('ORDER1', {'PROD001': 1}, 100)
+        self.backend.reserve('ORDER2', {'PROD001': 1}, 2000000000)
+        self.backend.reserve('ORDER3', {'PROD001': 1}, 2000000000)
+
+        self.assertEqual(self.backend.reclaim_expired(200), 1)
+        self.assertTrue(self.backend.release('ORDER2'))
+        self.assertFalse(self.backend.release('ORDER2'))
+        self.assertTrue(self.backend.commit('ORDER3'))
+        self.assertFalse(self.backend.release('ORDER3'))
+        self.assertEqual(self.backend.get_stock(['PROD001']), {'PROD001': 4})
+
+    def test_sharded_reserve_and_release(self):
+        """Test sharded stock is summed, split across shards when needed and returned"""
+        self.assertTrue(self.backend.shard_product('PROD001', 3))
+        self.assertFalse(self.backend.shard_product('PROD001', 3))
+        self.assertEqual(self.backend.get_stock(['PROD001']), {'PROD001': 5})
+
+        # No single shard holds more than 2, so this has to span shards
+        result = self.backend.reserve('ORDER1', {'PROD001': 4}, 2000000000)
+        refused = self.backend.reserve('ORDER2', {'PROD001': 2}, 2000000000)
+
+        self.assertTrue(result['success'])
+        self.assertFalse(refused['success'])
+        self.assertEqual(self.backend.get_stock(['PROD001']), {'PROD001': 1})
+        self.assertTrue(self.backend.release('ORDER1'))
+        self.assertEqual(self.backend.get_stock(['PROD001']), {'PROD001': 5})
+
+    def test_rebalance_moves_stock_into_shards(self):
+        """Test rebalancing evens out shards and empties the product item"""
+        self.backend.shard_product('PROD001', 2)
+        self.backend.dynamodb.Table('test-inventory').update_item(
+            Key={'product_id': 'PROD001'}, UpdateExpression='SET available = :three',
+            ExpressionAttributeValues={':three': 3}
+        )
+
+        self.assertEqual(self.backend.rebalance(), 1)
+        self.assertEqual(self.backend.rebalance(), 0)
+        levels = self.backend._levels(['PROD001'], consistent=True)['PROD001']
+        self.assertEqual(levels, {'PROD001': 0, 'PROD001#0': 4, 'PROD001#1': 4})
+
+    def test_contended_product_is_sharded(self):
+        """Test repeated transaction conflicts on a product promote it to shards"""
+        backend = DynamoDBInventoryBackend(DynamoDB(), 'test-inventory', 'test-reservations',
+                                           base_delay=0, shard_count=4, promote_threshold=2)
+        conflict = ClientError({
+            'Error': {'Code': 'TransactionCanceledException'},
+            'CancellationReasons': [{'Code': 'None'}, {'Code': 'TransactionConflict'}]
+        }, 'TransactWriteItems')
+        transact = backend.dynamodb.transact_write_items
+        calls = iter([conflict, conflict])
+
+        def conflicting(**kwargs):
+            error = next(calls, None)
+            if error:
+                raise error
+            return transact(**kwargs)
+
+        with patch.object(backend.dynamodb, 'transact_write_items', side_effect=conflicting):
+            result = backend.reserve('ORDER1', {'PROD001': 1}, 2000000000)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(backend.shards, {'PROD001': 4})
+        self.assertEqual(backend.get_stock(['PROD001']), {'PROD001': 4})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from metrics import InMemorySink, Metrics
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = InMemorySink()
+        self.metrics = Metrics('order-fulfillment', namespace='Test', sink=self.sink, enabled=True)
+
+    def test_flush_writes_one_document_per_step(self):
+        """Test durations and outcomes are aggregated per step into EMF"""
+        @self.metrics.timed('process_payment')
+        def process_payment(total):
+            return {'success': total <= 1000}
+
+        process_payment(10)
+        process_payment(5000)
+        with self.assertRaises(ValueError):
+            with self.metrics.timer('create_shipment'):
+                raise ValueError('carrier down')
+
+        self.metrics.flush()
+
+        documents = {d['Step']: d for d in self.sink.documents}
+        payment = documents['process_payment']
+        self.assertEqual(payment['Service'], 'order-fulfillment')
+        self.assertEqual(len(payment['Duration']), 2)
+        self.assertEqual((payment['Success'], payment['Failure'], payment['Error']), (1, 1, 0))
+        self.assertEqual(documents['create_shipment']['Error'], 1)
+
+        directive = payment['_aws']['CloudWatchMetrics'][0]
+        self.assertEqual(directive['Namespace'], 'Test')
+        self.assertEqual(directive['Dimensions'], [['Service', 'Step']])
+        self.assertIn({'Name': 'Duration', 'Unit': 'Milliseconds'}, directive['Metrics'])
+
+    def test_flush_resets_and_skips_empty(self):
+        """Test each flush only carries measurements since the previous one"""
+        with self.metrics.timer('check_inventory'):
+            pass
+        self.metrics.flush()
+        self.metrics.flush()
+
+        self.assertEqual(len(self.sink.lines), 1)
+
+    def test_durations_split_across_documents(self):
+        """Test no document carries more than 100 values"""
+        for _ in range(250):
+            self.metrics.record('reserve_inventory', 1.0, 'Success')
+        self.metrics.flush()
+
+        documents = self.sink.documents
+        self.assertEqual([len(d['Duration']) for d in documents], [100, 100, 50])
+        self.assertEqual(documents[0]['Success'], 250)
+        self.assertNotIn('Success', documents[1])
+
+    def test_disabled_metrics_do_not_wrap(self):
+        """Test disabled metrics leave functions untouched and record nothing"""
+        metrics = Metrics('order-fulfillment', sink=self.sink, enabled=False)
+
+        def step():
+            return {'success': True}
+
+        self.assertIs(metrics.timed('step')(step), step)
+        with metrics.timer('step') as timer:
+            timer.fail()
+        metrics.flush()
+
+        self.assertEqual(self.sink.lines, [])
+
+if __name__ == '__main__':
+    unittest.main()
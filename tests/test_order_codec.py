@@ -0,0 +1,86 @@
+import unittest
+import json
+import os
+import sys
+from decimal import Decimal
+
+from hypothesis import given, strategies as st
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from order_codec import OrderCodecError, decode_message, decode_order, encode_message, encode_order
+
+amounts = st.decimals(min_value=Decimal('0.01'), max_value=Decimal('99999999'), places=2)
+items = st.builds(
+    lambda product_id, quantity, price: {
+        'product_id': product_id, 'quantity': quantity, 'price': price, 'total': price * quantity
+    },
+    st.text(min_size=1, max_size=20), st.integers(min_value=1, max_value=100000), amounts
+)
+orders = st.builds(
+    lambda order_id, customer_id, lines, extras: {
+        'order_id': order_id, 'customer_id': customer_id, 'items': lines,
+        'total_amount': sum((line['total'] for line in lines), Decimal('0')),
+        'status': 'VALIDATED', 'order_date': '2026-01-01T00:00:00',
+        'created_at': '2026-01-01T00:00:00', 'updated_at': '2026-01-01T00:00:00', **extras
+    },
+    st.uuids().map(str), st.text(min_size=1, max_size=20), st.lists(items, min_size=1, max_size=20),
+    st.fixed_dictionaries({}, optional={'currency': st.just('EUR'), 'coupons': st.lists(st.text(max_size=8), max_size=3)})
+)
+
+def received(attributes):
+    """Message attributes as Lambda delivers them"""
+    return {name: {'stringValue': value['StringValue'], 'dataType': value['DataType']} for name, value in attributes.items()}
+
+class TestOrderCodec(unittest.TestCase):
+
+    @given(orders, st.booleans())
+    def test_round_trip(self, order, compress):
+        """Test decoded orders equal the validated ones, with Decimal amounts and int quantities"""
+        body, attributes = encode_message(order, compress=compress)
+
+        decoded = decode_message(body, received(attributes))
+
+        self.assertEqual(decoded, order)
+        self.assertIsInstance(decoded['total_amount'], Decimal)
+        self.assertIsInstance(decoded['items'][0]['quantity'], int)
+
+    def test_smaller_than_json(self):
+        """Test the binary body beats JSON for a multi-line order"""
+        order = {
+            'order_id': 'ORDER1', 'customer_id': 'CUST1', 'total_amount': Decimal('299.90'),
+            'items': [{'product_id': f'PROD{i:03d}', 'quantity': 1, 'price': Decimal('29.99'), 'total': Decimal('29.99')}
+                      for i in range(10)]
+        }
+
+        body, attributes = encode_message(order)
+
+        self.assertEqual(attributes['schema_version']['StringValue'], '1')
+        self.assertLess(len(body), len(json.dumps(order, default=str)) / 2)
+
+    def test_sub_cent_prices_keep_precision(self):
+        """Test amounts finer than cents are scaled rather than rounded"""
+        order = {'items': [{'product_id': 'P', 'quantity': 3, 'price': Decimal('0.125'), 'total': Decimal('0.375')}]}
+
+        self.assertEqual(decode_order(encode_order(order)), order)
+
+    def test_unsupported_orders_sent_as_json(self):
+        """Test orders outside the schema fall back to plain JSON"""
+        order = {'order_id': 'ORDER1', 'items': [{'product_id': 'P', 'quantity': 1, 'price': '1.00'}]}
+
+        body, attributes = encode_message(order)
+
+        self.assertEqual(attributes, {})
+        self.assertEqual(decode_message(body, {}), order)
+
+    def test_bad_messages_rejected(self):
+        """Test unknown versions and corrupt bodies raise instead of yielding a partial order"""
+        body, attributes = encode_message({'order_id': 'ORDER1', 'items': []})
+
+        with self.assertRaises(OrderCodecError):
+            decode_message(body, {'schema_version': {'stringValue': '2'}})
+        with self.assertRaises(OrderCodecError):
+            decode_message(body[:8], received(attributes))
+
+if __name__ == '__main__':
+    unittest.main()
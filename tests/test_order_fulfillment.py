@@ -1,17 +1,31 @@
 import unittest
 import json
 import os
-from unittest.mock import patch, MagicMock
+import sys
+import tempfile
+from unittest.mock import patch, MagicMock, AsyncMock
 from decimal import Decimal
 
+from botocore.exceptions import ClientError
+
 # Set up environment variables for testing
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
 os.environ['ORDERS_TABLE'] = 'test-orders'
 os.environ['DLQ_URL'] = 'https://sqs.us-east-1.amazonaws.com/123456789/test-dlq'
 
-from src.lambda.order_fulfillment.lambda_function import (
-    lambda_handler, process_fulfillment, update_order_status,
-    check_inventory, reserve_inventory, process_payment, create_shipment
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'order-fulfillment'))
+
+# Every lambda ships a lambda_function module, load this one afresh
+sys.modules.pop('lambda_function', None)
+import lambda_function
+from lambda_function import (
+    lambda_handler, async_lambda_handler, process_fulfillment, update_order_status,
+    check_inventory, reserve_inventory, process_payment, create_shipment, metrics, status_reader
 )
+from saga import InMemoryCheckpointStore
+from claim_check import ClaimCheck, LocalBlobStore
+from order_codec import encode_message, reference_message
 
 class TestOrderFulfillment(unittest.TestCase):
     
@@ -48,7 +62,7 @@ class TestOrderFulfillment(unittest.TestCase):
     def test_reserve_inventory_success(self):
         """Test successful inventory reservation"""
         items = [{'product_id': 'PROD001', 'quantity': 2}]
-        result = reserve_inventory(items)
+        result = reserve_inventory('ORDER123', items)
         self.assertTrue(result['success'])
     
     def test_process_payment_success(self):
@@ -71,7 +85,7 @@ class TestOrderFulfillment(unittest.TestCase):
         self.assertIn('tracking_number', result)
         self.assertTrue(result['tracking_number'].startswith('TRK'))
     
-    @patch('src.lambda.order_fulfillment.lambda_function.orders_table')
+    @patch.object(lambda_function, 'orders_table')
     def test_update_order_status(self, mock_table):
         """Test order status update"""
         mock_table.update_item.return_value = {}
@@ -82,8 +96,17 @@ class TestOrderFulfillment(unittest.TestCase):
         call_args = mock_table.update_item.call_args
         self.assertEqual(call_args[1]['Key']['order_id'], 'ORDER123')
     
-    @patch('src.lambda.order_fulfillment.lambda_function.update_order_status')
-    @patch('src.lambda.order_fulfillment.lambda_function.process_fulfillment')
+    @patch.object(lambda_function, 'orders_table')
+    def test_update_order_status_invalidates_cached_status(self, mock_table):
+        """Test a status written by this container is not served stale from the cache"""
+        status_reader.cache.put('ORDER123', 'stale')
+        
+        update_order_status('ORDER123', 'FULFILLED')
+        
+        self.assertIsNone(status_reader.cache.get('ORDER123'))
+    
+    @patch.object(lambda_function, 'update_order_status')
+    @patch.object(lambda_function, 'process_fulfillment')
     def test_lambda_handler_success(self, mock_process, mock_update):
         """Test successful lambda handler execution"""
         event = {'order': self.valid_order}
@@ -100,9 +123,9 @@ class TestOrderFulfillment(unittest.TestCase):
         self.assertEqual(result['status'], 'FULFILLED')
         self.assertEqual(result['tracking_number'], 'TRK12345678')
     
-    @patch('src.lambda.order_fulfillment.lambda_function.update_order_status')
-    @patch('src.lambda.order_fulfillment.lambda_function.process_fulfillment')
-    @patch('src.lambda.order_fulfillment.lambda_function.send_to_dlq')
+    @patch.object(lambda_function, 'update_order_status')
+    @patch.object(lambda_function, 'process_fulfillment')
+    @patch.object(lambda_function, 'send_to_dlq')
     def test_lambda_handler_fulfillment_failure(self, mock_dlq, mock_process, mock_update):
         """Test lambda handler with fulfillment failure"""
         event = {'order': self.valid_order}
@@ -120,5 +143,329 @@ class TestOrderFulfillment(unittest.TestCase):
         self.assertIn('Payment failed', result['error'])
         mock_dlq.assert_called_once()
 
+    @patch.object(lambda_function.fulfillment_saga, 'store', InMemoryCheckpointStore())
+    @patch.object(lambda_function.metrics, 'sink')
+    @patch.object(lambda_function, 'update_order_status')
+    @patch.object(lambda_function, 'send_to_dlq')
+    def test_lambda_handler_flushes_step_metrics(self, mock_dlq, mock_update, mock_sink):
+        """Test step timings are written once per invocation"""
+        order = dict(self.valid_order, total_amount=Decimal('1500.00'))
+        metrics.flush()
+        mock_sink.reset_mock()
+
+        lambda_handler({'order': order}, MagicMock())
+
+        mock_sink.write.assert_called_once()
+        documents = {d.get('Step'): d for d in map(json.loads, mock_sink.write.call_args[0][0])}
+        self.assertEqual(documents['check_inventory']['Success'], 1)
+        self.assertEqual(documents['process_payment']['Failure'], 1)
+        self.assertEqual(documents['release_inventory']['Success'], 1)
+        self.assertNotIn('create_shipment', documents)
+
+    @patch.object(lambda_function.fulfillment_saga, 'store', InMemoryCheckpointStore())
+    @patch.object(lambda_function, 'create_shipment')
+    def test_process_fulfillment_resumes_after_crash(self, mock_shipment):
+        """Test a retried order skips the steps that already completed"""
+        mock_shipment.side_effect = [ConnectionError('carrier timed out'),
+                                     {'success': True, 'tracking_number': 'TRK12345678'}]
+        order = dict(self.valid_order, order_id='ORDER-RESUME')
+
+        with patch.object(lambda_function, 'process_payment') as mock_payment, \
+                patch.object(lambda_function.fulfillment_saga, 'abort'):
+            mock_payment.return_value = {'success': True}
+            failed = process_fulfillment(order)
+            result = process_fulfillment(order)
+
+        self.assertFalse(failed['success'])
+        self.assertEqual(result, {'success': True, 'tracking_number': 'TRK12345678'})
+        mock_payment.assert_called_once()
+
+    @patch.object(lambda_function, 'update_order_status')
+    @patch.object(lambda_function, 'process_fulfillment')
+    @patch.object(lambda_function.dlq_publisher, 'sqs')
+    def test_lambda_handler_batches_dlq_messages(self, mock_sqs, mock_process, mock_update):
+        """Test failed orders of an SQS batch reach the DLQ in one batch call"""
+        event = {
+            'Records': [
+                {'messageId': f'msg-{i}', 'body': json.dumps({'order_id': f'ORDER{i}', 'items': []})}
+                for i in range(3)
+            ]
+        }
+        mock_process.return_value = {'success': False, 'error': 'Payment failed'}
+        mock_sqs.send_message_batch.return_value = {'Successful': [], 'Failed': []}
+        
+        lambda_handler(event, MagicMock())
+        
+        mock_sqs.send_message_batch.assert_called_once()
+        entries = mock_sqs.send_message_batch.call_args[1]['Entries']
+        self.assertEqual([json.loads(e['MessageBody'])['order']['order_id'] for e in entries],
+                         ['ORDER0', 'ORDER1', 'ORDER2'])
+
+    @patch.object(lambda_function, 'fulfill_order')
+    def test_lambda_handler_decodes_binary_orders(self, mock_fulfill):
+        """Test binary order messages reach fulfillment with their validated types"""
+        body, attributes = encode_message(self.valid_order)
+        event = {'Records': [{
+            'messageId': 'msg-1', 'body': body,
+            'messageAttributes': {name: {'stringValue': value['StringValue'], 'dataType': value['DataType']}
+                                  for name, value in attributes.items()}
+        }]}
+        mock_fulfill.return_value = {'statusCode': 200, 'status': 'FULFILLED'}
+        
+        result = lambda_handler(event, MagicMock())
+        
+        self.assertEqual(result['batchItemFailures'], [])
+        self.assertEqual(mock_fulfill.call_args[0][0], self.valid_order)
+        self.assertIsInstance(mock_fulfill.call_args[0][0]['total_amount'], Decimal)
+    
+    @patch.object(lambda_function, 'fulfill_order')
+    @patch.object(lambda_function, 'dynamodb')
+    def test_lambda_handler_fetches_thin_orders(self, mock_dynamodb, mock_fulfill):
+        """Test thin messages are fulfilled from one batched read and missing orders are retried"""
+        body, attributes = reference_message(self.valid_order)
+        received = {name: {'stringValue': value['StringValue'], 'dataType': value['DataType']}
+                    for name, value in attributes.items()}
+        event = {'Records': [
+            {'messageId': 'msg-1', 'body': body, 'messageAttributes': received},
+            {'messageId': 'msg-2', 'body': json.dumps({'order_id': 'MISSING'}), 'messageAttributes': received}
+        ]}
+        stored = dict(self.valid_order, items=[dict(self.valid_order['items'][0], quantity=Decimal('2'))],
+                      status='PROCESSING', lease_token='token', lease_expires_at=Decimal('1'),
+                      saga_checkpoints='{}')
+        mock_dynamodb.batch_get_item.return_value = {'Responses': {'test-orders': [stored]}}
+        mock_fulfill.return_value = {'statusCode': 200, 'status': 'FULFILLED'}
+        
+        result = lambda_handler(event, MagicMock())
+        
+        self.assertEqual(result['batchItemFailures'], [{'itemIdentifier': 'msg-2'}])
+        mock_dynamodb.batch_get_item.assert_called_once()
+        request = mock_dynamodb.batch_get_item.call_args[1]['RequestItems']['test-orders']
+        self.assertEqual(request['Keys'], [{'order_id': 'ORDER123'}, {'order_id': 'MISSING'}])
+        self.assertTrue(request['ConsistentRead'])
+        expected = dict(self.valid_order)
+        del expected['status']
+        self.assertEqual(mock_fulfill.call_args[0][0], expected)
+        self.assertIsInstance(mock_fulfill.call_args[0][0]['items'][0]['quantity'], int)
+    
+    @patch.object(lambda_function, 'fulfill_order')
+    @patch.object(lambda_function, 'dynamodb')
+    def test_lambda_handler_retries_bare_order_id(self, mock_dynamodb, mock_fulfill):
+        """Test a thin body without its message_mode attribute is redelivered, not failed"""
+        body, _ = reference_message(self.valid_order)
+        event = {'Records': [{'messageId': 'msg-1', 'body': body}]}
+        
+        result = lambda_handler(event, MagicMock())
+        
+        self.assertEqual(result['batchItemFailures'], [{'itemIdentifier': 'msg-1'}])
+        mock_fulfill.assert_not_called()
+        mock_dynamodb.batch_get_item.assert_not_called()
+    
+    @patch.object(lambda_function, 'fulfill_order')
+    def test_lambda_handler_rehydrates_offloaded_orders(self, mock_fulfill):
+        """Test orders sent as claim-check pointers are fulfilled from the stored payload"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        claim_check = ClaimCheck(LocalBlobStore(directory.name), threshold_bytes=100)
+        order = {'order_id': 'ORDER1', 'items': [{'product_id': 'PROD001', 'quantity': 1}] * 20}
+        event = {'Records': [{'messageId': 'msg-1', 'body': claim_check.offload(json.dumps(order), order_id='ORDER1')}]}
+        mock_fulfill.return_value = {'statusCode': 200, 'status': 'FULFILLED'}
+        
+        with patch.object(lambda_function, 'claim_check', claim_check):
+            result = lambda_handler(event, MagicMock())
+        
+        self.assertEqual(result['batchItemFailures'], [])
+        self.assertEqual(mock_fulfill.call_args[0][0], order)
+    
+    @patch.object(lambda_function, 'fulfill_order')
+    def test_lambda_handler_sqs_batch(self, mock_fulfill):
+        """Test every SQS record is processed and only errors are retried"""
+        event = {
+            'Records': [
+                {'messageId': 'msg-1', 'body': json.dumps({'order_id': 'ORDER1', 'items': []})},
+                {'messageId': 'msg-2', 'body': json.dumps({'order_id': 'ORDER2', 'items': []})},
+                {'messageId': 'msg-3', 'body': json.dumps({'order_id': 'ORDER3', 'items': []})},
+                {'messageId': 'msg-4', 'body': 'not json'}
+            ]
+        }
+        context = MagicMock()
+        
+        mock_fulfill.side_effect = [
+            {'statusCode': 200, 'status': 'FULFILLED'},
+            {'statusCode': 400, 'status': 'FAILED'},
+            {'statusCode': 500, 'status': 'ERROR'}
+        ]
+        
+        result = lambda_handler(event, context)
+        
+        self.assertEqual(mock_fulfill.call_count, 3)
+        self.assertEqual(result['batchItemFailures'], [
+            {'itemIdentifier': 'msg-3'},
+            {'itemIdentifier': 'msg-4'}
+        ])
+
+    @patch.object(lambda_function, 'MAX_WORKERS', 4)
+    @patch.object(lambda_function, 'fulfill_order')
+    def test_lambda_handler_sqs_batch_concurrent(self, mock_fulfill):
+        """Test concurrent batch keeps redeliveries of one order in sequence"""
+        event = {
+            'Records': [
+                {'messageId': f'msg-{i}', 'body': json.dumps({'order_id': order_id, 'items': []})}
+                for i, order_id in enumerate(['ORDER1', 'ORDER2', 'ORDER1', 'ORDER3'])
+            ]
+        }
+        context = MagicMock()
+        
+        seen = []
+        def fulfill(order_data, status_buffer=None):
+            seen.append(order_data['order_id'])
+            status = 500 if order_data['order_id'] == 'ORDER2' else 200
+            return {'statusCode': status}
+        mock_fulfill.side_effect = fulfill
+        
+        result = lambda_handler(event, context)
+        
+        self.assertEqual(sorted(seen), ['ORDER1', 'ORDER1', 'ORDER2', 'ORDER3'])
+        self.assertEqual(result['batchItemFailures'], [{'itemIdentifier': 'msg-1'}])
+
+    @patch.object(lambda_function, 'dlq_publisher')
+    @patch.object(lambda_function, 'async_orders_table')
+    @patch.object(lambda_function, 'process_fulfillment')
+    def test_async_lambda_handler_sqs_batch(self, mock_process, mock_table, mock_dlq):
+        """Test the async handler shares fulfillment and retry semantics with the sync path"""
+        event = {
+            'Records': [
+                {'messageId': 'msg-1', 'body': json.dumps({'order_id': 'ORDER1', 'items': []})},
+                {'messageId': 'msg-2', 'body': json.dumps({'order_id': 'ORDER2', 'items': []})},
+                {'messageId': 'msg-3', 'body': json.dumps({'order_id': 'ORDER3', 'items': []})},
+                {'messageId': 'msg-4', 'body': 'not json'}
+            ]
+        }
+        mock_table.update_item = AsyncMock(return_value={})
+        mock_dlq.flush.return_value = {'sent': 1, 'spilled': 0, 'rejected': 0}
+        
+        def fulfill(order_data):
+            if order_data['order_id'] == 'ORDER3':
+                raise RuntimeError('inventory service down')
+            if order_data['order_id'] == 'ORDER2':
+                return {'success': False, 'error': 'Payment failed'}
+            return {'success': True, 'tracking_number': 'TRK12345678'}
+        mock_process.side_effect = fulfill
+        
+        result = async_lambda_handler(event, MagicMock())
+        
+        self.assertEqual(result['batchItemFailures'], [
+            {'itemIdentifier': 'msg-3'},
+            {'itemIdentifier': 'msg-4'}
+        ])
+        statuses = {call[1]['Key']['order_id']: call[1]['ExpressionAttributeValues'][':status']
+                    for call in mock_table.update_item.call_args_list}
+        self.assertEqual(statuses, {'ORDER1': 'FULFILLED', 'ORDER2': 'FAILED', 'ORDER3': 'FAILED'})
+        mock_dlq.add.assert_called_once()
+        mock_dlq.flush.assert_called_once()
+
+    @patch.object(lambda_function, 'STATUS_WRITE_MODE', 'lease')
+    @patch.object(lambda_function, 'lambda_handler')
+    def test_async_lambda_handler_falls_back(self, mock_handler):
+        """Test events the async path does not cover go to the sync handler"""
+        event = {'Records': []}
+        context = MagicMock()
+        mock_handler.return_value = {'batchItemFailures': []}
+        
+        result = async_lambda_handler(event, context)
+        
+        mock_handler.assert_called_once_with(event, context)
+        self.assertEqual(result, {'batchItemFailures': []})
+
+    @patch.object(lambda_function, 'STATUS_WRITE_MODE', 'lease')
+    @patch.object(lambda_function, 'dynamodb')
+    @patch.object(lambda_function, 'orders_table')
+    @patch.object(lambda_function, 'process_fulfillment')
+    def test_lambda_handler_sqs_batch_lease_mode(self, mock_process, mock_table, mock_dynamodb):
+        """Test lease mode claims each order and coalesces terminal writes"""
+        event = {
+            'Records': [
+                {'messageId': 'msg-1', 'body': json.dumps({'order_id': 'ORDER1', 'items': []})},
+                {'messageId': 'msg-2', 'body': json.dumps({'order_id': 'ORDER2', 'items': []})}
+            ]
+        }
+        context = MagicMock()
+        
+        mock_process.return_value = {
+            'success': True,
+            'tracking_number': 'TRK12345678'
+        }
+        
+        result = lambda_handler(event, context)
+        
+        self.assertEqual(result['batchItemFailures'], [])
+        self.assertEqual(mock_table.update_item.call_count, 2)
+        claim_args = mock_table.update_item.call_args[1]
+        self.assertIn('lease_expires_at', claim_args['UpdateExpression'])
+        self.assertIn('ConditionExpression', claim_args)
+        
+        mock_dynamodb.transact_write_items.assert_called_once()
+        transact_items = mock_dynamodb.transact_write_items.call_args[1]['TransactItems']
+        self.assertEqual(len(transact_items), 2)
+        self.assertEqual(transact_items[0]['Update']['ExpressionAttributeValues'][':status'], 'FULFILLED')
+
+    @patch.object(lambda_function, 'STATUS_WRITE_MODE', 'lease')
+    @patch.object(lambda_function, 'orders_table')
+    @patch.object(lambda_function, 'process_fulfillment')
+    def test_lambda_handler_lease_mode_claim_error(self, mock_process, mock_table):
+        """Test an order that could not be claimed is never marked FAILED"""
+        event = {'order': self.valid_order}
+        context = MagicMock()
+        
+        mock_table.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'Throttled'}},
+            'UpdateItem'
+        )
+        
+        result = lambda_handler(event, context)
+        
+        self.assertEqual(result['statusCode'], 500)
+        mock_table.update_item.assert_called_once()
+        mock_process.assert_not_called()
+
+    @patch.object(lambda_function, 'STATUS_WRITE_MODE', 'lease')
+    @patch.object(lambda_function, 'orders_table')
+    @patch.object(lambda_function, 'process_fulfillment')
+    def test_lambda_handler_lease_mode_unexpected_error(self, mock_process, mock_table):
+        """Test an unexpected error marks the order FAILED under its lease"""
+        event = {'order': self.valid_order}
+        context = MagicMock()
+        
+        mock_process.side_effect = Exception("Payment gateway timeout")
+        
+        result = lambda_handler(event, context)
+        
+        self.assertEqual(result['statusCode'], 500)
+        self.assertEqual(mock_table.update_item.call_count, 2)
+        claim_token = mock_table.update_item.call_args_list[0][1]['ExpressionAttributeValues'][':token']
+        failed_args = mock_table.update_item.call_args_list[1][1]
+        self.assertEqual(failed_args['ConditionExpression'], "lease_token = :token")
+        self.assertEqual(failed_args['ExpressionAttributeValues'][':token'], claim_token)
+        self.assertEqual(failed_args['ExpressionAttributeValues'][':status'], 'FAILED')
+
+    @patch.object(lambda_function, 'STATUS_WRITE_MODE', 'lease')
+    @patch.object(lambda_function, 'orders_table')
+    @patch.object(lambda_function, 'process_fulfillment')
+    def test_lambda_handler_lease_conflict_read_error(self, mock_process, mock_table):
+        """Test a failed status read of a claimed order is retried without writes"""
+        event = {'order': self.valid_order}
+        context = MagicMock()
+        
+        mock_table.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Claimed'}},
+            'UpdateItem'
+        )
+        
+        with patch.object(status_reader, 'get', side_effect=RuntimeError("1 keys unprocessed")):
+            result = lambda_handler(event, context)
+        
+        self.assertEqual(result['statusCode'], 409)
+        mock_table.update_item.assert_called_once()
+        mock_process.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
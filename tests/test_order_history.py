@@ -0,0 +1,133 @@
+import unittest
+import os
+import sys
+from decimal import Decimal
+from unittest.mock import patch
+
+import boto3
+from moto import mock_dynamodb
+
+# Set up environment variables for testing
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['ORDERS_TABLE'] = 'test-orders'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'order-history'))
+
+# Every lambda ships a lambda_function module, load this one afresh
+sys.modules.pop('lambda_function', None)
+import lambda_function
+from lambda_function import (
+    lambda_handler, query_order_history, encode_cursor, history_cache, status_reader
+)
+
+@mock_dynamodb
+class TestOrderHistory(unittest.TestCase):
+
+    def setUp(self):
+        """Create the orders table with its CustomerIndex and a few orders"""
+        client = boto3.client('dynamodb')
+        client.create_table(
+            TableName='test-orders',
+            KeySchema=[{'AttributeName': 'order_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[
+                {'AttributeName': 'order_id', 'AttributeType': 'S'},
+                {'AttributeName': 'customer_id', 'AttributeType': 'S'},
+                {'AttributeName': 'order_date', 'AttributeType': 'S'}
+            ],
+            GlobalSecondaryIndexes=[{
+                'IndexName': 'CustomerIndex',
+                'KeySchema': [
+                    {'AttributeName': 'customer_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'order_date', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        table = boto3.resource('dynamodb').Table('test-orders')
+        for day in range(1, 6):
+            table.put_item(Item={
+                'order_id': f'ORDER{day}',
+                'customer_id': 'CUST001',
+                'order_date': f'2026-01-0{day}T12:00:00',
+                'status': 'FULFILLED',
+                'total_amount': Decimal('10.00'),
+                'items': [{'product_id': 'PROD001', 'quantity': 1}]
+            })
+        table.put_item(Item={'order_id': 'OTHER1', 'customer_id': 'CUST002', 'order_date': '2026-01-03T00:00:00'})
+
+        # Fresh low-level clients for every test, created inside the mock
+        clients = patch.dict('aws_clients._clients', clear=True)
+        clients.start()
+        self.addCleanup(clients.stop)
+        history_cache.clear()
+        status_reader.cache.clear()
+
+    def test_pages_newest_first(self):
+        """Test keyset pagination walks every order once, newest first"""
+        seen = []
+        cursor = None
+        while True:
+            result = lambda_handler({'customer_id': 'CUST001', 'limit': 2, 'cursor': cursor}, None)
+            self.assertEqual(result['statusCode'], 200)
+            seen += [order['order_id'] for order in result['orders']]
+            cursor = result['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, ['ORDER5', 'ORDER4', 'ORDER3', 'ORDER2', 'ORDER1'])
+
+    def test_date_range_and_projection(self):
+        """Test a whole-day range and only the requested attributes are returned"""
+        result = lambda_handler({'queryStringParameters': {
+            'customer_id': 'CUST001', 'from': '2026-01-02', 'to': '2026-01-03', 'fields': 'status'
+        }}, None)
+
+        self.assertEqual([order['order_id'] for order in result['orders']], ['ORDER3', 'ORDER2'])
+        self.assertEqual(set(result['orders'][0]), {'order_id', 'order_date', 'status'})
+
+    def test_pages_cached(self):
+        """Test a repeated request is answered without querying DynamoDB"""
+        first = query_order_history('CUST001')
+        with patch.object(lambda_function, 'orders_table') as mock_table:
+            second = query_order_history('CUST001')
+
+        mock_table.query.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_cached_page_not_shared(self):
+        """Test a caller changing its page does not change the cached one"""
+        first = query_order_history('CUST001')
+        first['orders'].clear()
+        second = query_order_history('CUST001')
+
+        self.assertEqual(len(second['orders']), second['count'])
+        self.assertNotEqual(second['orders'], [])
+
+    def test_status_lookup(self):
+        """Test statuses are returned in request order with unknown IDs listed"""
+        result = lambda_handler({'queryStringParameters': {'order_ids': 'ORDER2,NOPE,ORDER1'}}, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual([order['order_id'] for order in result['orders']], ['ORDER2', 'ORDER1'])
+        self.assertEqual(set(result['orders'][0]), {'order_id', 'status', 'tracking_number', 'updated_at'})
+        self.assertEqual(result['not_found'], ['NOPE'])
+        self.assertEqual(result['unavailable'], [])
+
+    def test_invalid_requests(self):
+        """Test bad parameters and foreign cursors are rejected"""
+        foreign = encode_cursor({'order_id': 'OTHER1', 'customer_id': 'CUST002', 'order_date': '2026-01-03T00:00:00'})
+        for event in (
+            {},
+            {'customer_id': 'CUST001', 'limit': 0},
+            {'customer_id': 'CUST001', 'from': 'yesterday'},
+            {'customer_id': 'CUST001', 'fields': ['password']},
+            {'customer_id': 'CUST001', 'cursor': 'not a cursor'},
+            {'customer_id': 'CUST001', 'cursor': foreign},
+            {'order_ids': []}
+        ):
+            self.assertEqual(lambda_handler(event, None)['statusCode'], 400, event)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'order-validator'))
+
+from order_schema import Field, compile_schema, validate_order_fields
+
+class TestOrderSchema(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.valid_order = {
+            'customer_id': 'CUST123',
+            'items': [{'product_id': 'PROD001', 'quantity': 2, 'price': 29.99}],
+            'total_amount': 59.98
+        }
+
+    def test_valid_order(self):
+        """Test a well-formed order has no errors"""
+        self.assertEqual(validate_order_fields(self.valid_order), [])
+
+    def test_valid_optional_fields(self):
+        """Test optional fields are accepted when well-formed"""
+        order = dict(
+            self.valid_order,
+            shipping_address={'line1': '1 George St', 'city': 'Sydney', 'country': 'AU'},
+            currency='AUD',
+            coupons=['WELCOME10']
+        )
+        self.assertEqual(validate_order_fields(order), [])
+
+    def test_collects_every_field_error(self):
+        """Test all failing fields are reported together"""
+        order = {
+            'customer_id': '  ',
+            'items': [],
+            'total_amount': None,
+            'currency': 'aud'
+        }
+
+        errors = validate_order_fields(order)
+
+        self.assertEqual(errors, [
+            ('customer_id', 'Invalid customer_id'),
+            ('items', 'Order must contain at least one item'),
+            ('total_amount', 'Invalid total_amount'),
+            ('currency', 'Invalid currency')
+        ])
+
+    def test_missing_required_fields(self):
+        """Test missing required fields are reported by name"""
+        errors = validate_order_fields({'coupons': ['']})
+
+        self.assertEqual(errors, [
+            ('customer_id', 'Missing required field: customer_id'),
+            ('items', 'Missing required field: items'),
+            ('total_amount', 'Missing required field: total_amount'),
+            ('coupons', 'Invalid coupons')
+        ])
+
+    def test_collects_every_item_error(self):
+        """Test bad order lines are all reported with their line numbers"""
+        order = dict(self.valid_order, items=[
+            {'product_id': 'PROD001', 'quantity': 2, 'price': 29.99},
+            'PROD002',
+            {'product_id': 'PROD003', 'price': None},
+            {'product_id': ['PROD004'], 'quantity': '1', 'price': '5.00'}
+        ])
+
+        errors = validate_order_fields(order)
+
+        self.assertEqual(errors, [
+            ('items[2]', 'Each item must be an object'),
+            ('items[3].quantity', 'Missing required field: quantity'),
+            ('items[3].price', 'Invalid price'),
+            ('items[4].product_id', 'Invalid product_id')
+        ])
+
+    def test_non_dict_payload(self):
+        """Test a payload that is not an object is rejected"""
+        self.assertEqual(validate_order_fields(['CUST123']), [('order', 'Order must be an object')])
+
+    def test_compile_custom_schema(self):
+        """Test custom schemas compile with their own messages"""
+        validate = compile_schema({
+            'amount': Field(Decimal, check=lambda value: value > 0, message='Amount must be positive'),
+            'note': Field(str, required=False)
+        })
+
+        self.assertEqual(validate({'amount': Decimal('1.00')}), [])
+        self.assertEqual(validate({'amount': Decimal('-1'), 'note': 5}), [
+            ('amount', 'Amount must be positive'),
+            ('note', 'Invalid note')
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+import boto3
+from moto import mock_dynamodb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from aws_clients import DynamoDB
+from order_status import OrderStatus, OrderStatusReader, batch_get_orders
+from ttl_cache import TtlCache
+
+@mock_dynamodb
+class TestOrderStatusReader(unittest.TestCase):
+
+    def setUp(self):
+        """Create an orders table with a few orders"""
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+        boto3.client('dynamodb').create_table(
+            TableName='test-orders',
+            KeySchema=[{'AttributeName': 'order_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'order_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        table = boto3.resource('dynamodb').Table('test-orders')
+        for n in range(150):
+            table.put_item(Item={
+                'order_id': f'ORDER{n}',
+                'status': 'FULFILLED',
+                'tracking_number': f'TRK{n}',
+                'updated_at': '2026-01-01T00:00:00',
+                'items': [{'product_id': 'PROD001', 'quantity': 1}]
+            })
+
+        # Fresh low-level clients for every test, created inside the mock
+        clients = patch.dict('aws_clients._clients', clear=True)
+        clients.start()
+        self.addCleanup(clients.stop)
+        self.reader = OrderStatusReader(DynamoDB(), 'test-orders', TtlCache(ttl_seconds=60))
+
+    def test_get_many_projects_status_only(self):
+        """Test lookups span several batches and never read the items"""
+        order_ids = [f'ORDER{n}' for n in range(150)] + ['MISSING']
+
+        statuses = self.reader.get_many(order_ids)
+
+        self.assertEqual(len(statuses), 151)
+        self.assertIsNone(statuses['MISSING'])
+        self.assertEqual(statuses['ORDER7'], OrderStatus('ORDER7', 'FULFILLED', 'TRK7', '2026-01-01T00:00:00'))
+        self.assertNotIn('items', statuses['ORDER7'].to_dict())
+
+    def test_cache_and_invalidation(self):
+        """Test cached statuses are reused until invalidated or read consistently"""
+        self.reader.get('ORDER1')
+        boto3.resource('dynamodb').Table('test-orders').update_item(
+            Key={'order_id': 'ORDER1'}, UpdateExpression='SET #s = :s',
+            ExpressionAttributeNames={'#s': 'status'}, ExpressionAttributeValues={':s': 'FAILED'}
+        )
+
+        self.assertEqual(self.reader.get('ORDER1').status, 'FULFILLED')
+        self.assertEqual(self.reader.get('ORDER1', consistent_read=True).status, 'FAILED')
+        self.reader.invalidate(['ORDER1'])
+        self.assertEqual(self.reader.get('ORDER1').status, 'FAILED')
+
+    def test_batch_get_orders_reads_whole_items(self):
+        """Test full orders are read consistently across batches, missing ones left out"""
+        order_ids = [f'ORDER{n}' for n in range(120)] + ['MISSING']
+
+        items, unprocessed = batch_get_orders(DynamoDB(), 'test-orders', order_ids, consistent_read=True)
+
+        self.assertEqual(unprocessed, set())
+        self.assertEqual(len(items), 120)
+        self.assertEqual(items['ORDER7']['items'], [{'product_id': 'PROD001', 'quantity': 1}])
+
+class TestOrderStatusRetries(unittest.TestCase):
+
+    @patch('order_status.time.sleep')
+    def test_unprocessed_keys_retried(self, mock_sleep):
+        """Test unprocessed keys are read again, and left out once retries run out"""
+        dynamodb = MagicMock()
+        item = {'order_id': 'ORDER2', 'status': 'PROCESSING'}
+        unprocessed = {'test-orders': {'Keys': [{'order_id': 'ORDER2'}]}}
+        dynamodb.batch_get_item.side_effect = [
+            {'Responses': {'test-orders': [{'order_id': 'ORDER1', 'status': 'FULFILLED'}]}, 'UnprocessedKeys': unprocessed},
+            {'Responses': {'test-orders': [item]}, 'UnprocessedKeys': {}}
+        ]
+        reader = OrderStatusReader(dynamodb, 'test-orders')
+
+        statuses = reader.get_many(['ORDER1', 'ORDER2'])
+
+        self.assertEqual(statuses['ORDER2'].status, 'PROCESSING')
+        self.assertEqual(dynamodb.batch_get_item.call_count, 2)
+
+        dynamodb.batch_get_item.side_effect = None
+        dynamodb.batch_get_item.return_value = {'Responses': {}, 'UnprocessedKeys': unprocessed}
+        self.assertEqual(reader.get_many(['ORDER2']), {})
+
+if __name__ == '__main__':
+    unittest.main()
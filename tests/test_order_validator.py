@@ -2,17 +2,25 @@
 import unittest
 import json
 import os
+import sys
 from unittest.mock import patch, MagicMock
 from decimal import Decimal
 
 # Set up environment variables for testing
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
 os.environ['ORDERS_TABLE'] = 'test-orders'
 os.environ['ORDER_QUEUE_URL'] = 'https://sqs.us-east-1.amazonaws.com/123456789/test-queue'
 
-# Import the lambda function after setting environment variables
-from src.lambda.order_validator.lambda_function import (
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'order-validator'))
+
+# Import the lambda function after setting environment variables; every
+# lambda ships a lambda_function module, so load this one afresh
+sys.modules.pop('lambda_function', None)
+import lambda_function
+from lambda_function import (
     lambda_handler, validate_order, store_order, queue_order,
-    OrderValidationError
+    validate_items, validate_items_columnar, send_batches, OrderValidationError
 )
 
 class TestOrderValidator(unittest.TestCase):
@@ -45,6 +53,7 @@ class TestOrderValidator(unittest.TestCase):
         self.assertEqual(result['status'], 'VALIDATED')
         self.assertEqual(len(result['items']), 2)
         self.assertEqual(result['total_amount'], Decimal('75.48'))
+        self.assertEqual(result['order_date'], result['created_at'])
 
     def test_validate_order_missing_customer_id(self):
         """Test validation failure when customer_id is missing"""
@@ -96,8 +105,70 @@ class TestOrderValidator(unittest.TestCase):
 
         self.assertIn('Item price must be positive', str(context.exception))
 
-    @patch('src.lambda.order_validator.lambda_function.orders_table')
-    @patch('src.lambda.order_validator.lambda_function.sqs')
+    def test_validate_items_columnar_matches_row_path(self):
+        """Test the columnar validator gives identical results"""
+        items = [
+            {'product_id': f'PROD{i:03d}', 'quantity': i % 7 + 1, 'price': [29.99, 15.5, 0.125, 100][i % 4]}
+            for i in range(250)
+        ]
+
+        columnar_items, columnar_total = validate_items_columnar(items)
+        row_items, row_total = validate_items(items)
+
+        self.assertEqual(columnar_items, row_items)
+        self.assertEqual(str(columnar_total), str(row_total))
+        self.assertEqual([str(i['total']) for i in columnar_items], [str(i['total']) for i in row_items])
+
+    def test_validate_items_columnar_reports_all_lines(self):
+        """Test every failing line is reported at once"""
+        items = [{'product_id': 'PROD001', 'quantity': 1, 'price': 10.00} for _ in range(5)]
+        items[1]['quantity'] = 0
+        items[3]['quantity'] = 'two'
+        items[4]['price'] = -1
+
+        with self.assertRaises(OrderValidationError) as context:
+            validate_items_columnar(items)
+
+        self.assertIn('Item quantity must be positive (lines 2, 4)', str(context.exception))
+        self.assertIn('Item price must be positive (lines 5)', str(context.exception))
+        self.assertEqual([e['line'] for e in context.exception.errors], [2, 4, 5])
+
+    def test_validate_order_rejects_unconvertible_values_on_both_paths(self):
+        """Test bad quantities and prices give the same errors below and above the columnar threshold"""
+        cases = [
+            ('quantity', 'two', 'Item quantity must be positive'),
+            ('quantity', float('inf'), 'Item quantity must be positive'),
+            ('price', 'NaN', 'Item price must be positive'),
+            ('price', 'ten', 'Item price must be positive'),
+            ('price', float('inf'), 'Item price must be positive')
+        ]
+        for line_count in (1, lambda_function.COLUMNAR_VALIDATION_THRESHOLD):
+            for field, value, message in cases:
+                with self.subTest(lines=line_count, field=field, value=value):
+                    items = [{'product_id': f'PROD{i:03d}', 'quantity': 1, 'price': 10.00} for i in range(line_count)]
+                    items[0][field] = value
+                    order = dict(self.valid_order, items=items, total_amount=10.00 * line_count)
+
+                    with self.assertRaises(OrderValidationError) as context:
+                        validate_order(order)
+
+                    self.assertIn(message, str(context.exception))
+
+    @patch.object(lambda_function, 'orders_table')
+    def test_store_order_keeps_decimals(self, mock_table):
+        """Test validated orders are stored without a JSON round trip"""
+        order = validate_order(self.valid_order)
+        mock_table.put_item.return_value = {}
+
+        result = store_order(order)
+
+        self.assertEqual(result, order)
+        item = mock_table.put_item.call_args[1]['Item']
+        self.assertEqual(item['total_amount'], Decimal('75.48'))
+        self.assertIsInstance(item['items'][0]['price'], Decimal)
+
+    @patch.object(lambda_function, 'orders_table')
+    @patch.object(lambda_function, 'sqs')
     def test_lambda_handler_success(self, mock_sqs, mock_table):
         """Test successful lambda handler execution"""
         event = {
@@ -118,8 +189,8 @@ class TestOrderValidator(unittest.TestCase):
         self.assertIn('order', result)
         self.assertEqual(result['message'], 'Order validated and queued for processing')
 
-    @patch('src.lambda.order_validator.lambda_function.orders_table')
-    @patch('src.lambda.order_validator.lambda_function.sqs')
+    @patch.object(lambda_function, 'orders_table')
+    @patch.object(lambda_function, 'sqs')
     def test_lambda_handler_validation_failure(self, mock_sqs, mock_table):
         """Test lambda handler with validation failure"""
         event = {
@@ -137,5 +208,90 @@ class TestOrderValidator(unittest.TestCase):
         self.assertEqual(result['status'], 'VALIDATION_FAILED')
         self.assertIn('error', result)
 
+    @patch.object(lambda_function, 'RETRY_BASE_DELAY', 0)
+    @patch.object(lambda_function, 'dynamodb')
+    @patch.object(lambda_function, 'sqs')
+    def test_lambda_handler_batch(self, mock_sqs, mock_dynamodb):
+        """Test bulk ingestion chunks writes and sends and reports per order"""
+        invalid_order = {'customer_id': 'CUST123', 'items': [], 'total_amount': 0}
+        orders = [dict(self.valid_order) for _ in range(30)]
+        orders.insert(5, invalid_order)
+        event = {'orders': orders}
+        context = MagicMock()
+
+        # First chunk leaves one item unprocessed, which succeeds on retry
+        def batch_write_item(RequestItems):
+            requests = RequestItems['test-orders']
+            if len(requests) == 25:
+                return {'UnprocessedItems': {'test-orders': requests[:1]}}
+            return {'UnprocessedItems': {}}
+        mock_dynamodb.batch_write_item.side_effect = batch_write_item
+
+        # One entry of the first send fails permanently
+        mock_sqs.send_message_batch.side_effect = [
+            {'Failed': [{'Id': '0', 'SenderFault': True, 'Message': 'Bad'}]},
+            {}, {}
+        ]
+
+        result = lambda_handler(event, context)
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(result['total'], 31)
+        self.assertEqual(result['validated'], 29)
+        self.assertEqual(mock_dynamodb.batch_write_item.call_count, 3)
+        self.assertEqual(mock_sqs.send_message_batch.call_count, 3)
+        self.assertEqual(result['results'][5]['status'], 'VALIDATION_FAILED')
+        self.assertEqual(result['results'][0]['status'], 'ERROR')
+        self.assertEqual(result['results'][0]['error'], 'Failed to queue order')
+        self.assertEqual(result['results'][1]['status'], 'VALIDATED')
+
+    @patch.object(lambda_function, 'dynamodb')
+    @patch.object(lambda_function, 'sqs')
+    @patch.object(lambda_function, 'claim_check')
+    def test_lambda_handler_batch_offload_failure(self, mock_claim_check, mock_sqs, mock_dynamodb):
+        """Test an order whose message cannot be built fails alone"""
+        event = {'orders': [dict(self.valid_order) for _ in range(3)]}
+        context = MagicMock()
+
+        mock_dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+        mock_sqs.send_message_batch.return_value = {}
+        mock_claim_check.offload.side_effect = [
+            'body-0', ConnectionError('S3 unreachable'), 'body-2'
+        ]
+
+        result = lambda_handler(event, context)
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(result['validated'], 2)
+        self.assertEqual(result['results'][1]['status'], 'ERROR')
+        self.assertEqual(result['results'][1]['error'], 'Failed to queue order')
+        entries = mock_sqs.send_message_batch.call_args[1]['Entries']
+        self.assertEqual([entry['MessageBody'] for entry in entries], ['body-0', 'body-2'])
+
+    @patch.object(lambda_function, 'ORDER_MESSAGE_MODE', 'thin')
+    @patch.object(lambda_function, 'sqs')
+    def test_queue_order_thin(self, mock_sqs):
+        """Test thin mode queues only the order ID and routing attributes"""
+        order = validate_order(self.valid_order)
+
+        queue_order(order)
+
+        kwargs = mock_sqs.send_message.call_args[1]
+        self.assertEqual(json.loads(kwargs['MessageBody']), {'order_id': order['order_id']})
+        self.assertEqual(kwargs['MessageAttributes']['message_mode']['StringValue'], 'thin')
+        self.assertEqual(kwargs['MessageAttributes']['customer_id']['StringValue'], 'CUST123')
+
+    def test_send_batches_respect_payload_limit(self):
+        """Test large bodies split batches before the 256 KiB SendMessageBatch limit"""
+        orders = [{'order_id': f'ORDER{i}'} for i in range(12)]
+        bodies = ['x' * 100 * 1024] * 3 + ['{}'] * 9
+
+        messages = [(body, {}) for body in bodies]
+
+        batches = send_batches(orders, messages)
+
+        self.assertEqual([len(chunk) for chunk, _ in batches], [2, 10])
+        self.assertEqual([message for _, chunk_messages in batches for message in chunk_messages], messages)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'order-fulfillment'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from saga import DynamoDBCheckpointStore, InMemoryCheckpointStore, Saga, SagaStep
+
+class TestSaga(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.calls = []
+        self.store = InMemoryCheckpointStore()
+
+    def step(self, name, success=True, compensate=True):
+        def action(context):
+            self.calls.append(name)
+            return {'success': success, 'error': f'{name} failed'}
+
+        def compensation(context):
+            self.calls.append(f'undo {name}')
+
+        return SagaStep(name, action, compensation if compensate else None)
+
+    def test_failure_compensates_completed_steps(self):
+        """Test a failed step undoes the completed ones and clears checkpoints"""
+        saga = Saga([self.step('reserve'), self.step('pay'), self.step('ship', success=False)], self.store)
+
+        outcome = saga.run('ORDER1', {})
+
+        self.assertEqual(outcome['step'], 'ship')
+        self.assertEqual(outcome['result']['error'], 'ship failed')
+        self.assertEqual(self.calls[:3], ['reserve', 'pay', 'ship'])
+        self.assertEqual(sorted(self.calls[3:]), ['undo pay', 'undo reserve'])
+        self.assertEqual(self.store.load('ORDER1'), {})
+
+    def test_resume_skips_completed_steps(self):
+        """Test a saga interrupted by an exception resumes after its last checkpoint"""
+        attempts = []
+
+        def flaky(context):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError('timed out')
+            return {'success': True, 'tracking_number': 'TRK1'}
+
+        saga = Saga([self.step('reserve'), SagaStep('ship', flaky)], self.store)
+
+        with self.assertRaises(ConnectionError):
+            saga.run('ORDER1', {})
+        outcome = saga.run('ORDER1', {})
+
+        self.assertTrue(outcome['success'])
+        self.assertEqual(outcome['results']['ship']['tracking_number'], 'TRK1')
+        self.assertEqual(self.calls, ['reserve'])
+
+    def test_failed_compensation_stays_checkpointed(self):
+        """Test abort keeps steps whose compensation raised"""
+        def broken(context):
+            raise RuntimeError('refund service down')
+
+        saga = Saga([self.step('reserve'), SagaStep('pay', lambda context: {'success': True}, broken)], self.store)
+        self.store.save('ORDER1', {'reserve': {'success': True}, 'pay': {'success': True}})
+
+        saga.abort('ORDER1', {})
+
+        self.assertEqual(self.calls, ['undo reserve'])
+        self.assertEqual(self.store.load('ORDER1'), {'pay': {'success': True}})
+
+    def test_independent_steps_run_concurrently(self):
+        """Test steps sharing a dependency overlap and the join waits for both"""
+        # Neither step gets past the barrier unless the other runs at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def parallel(name):
+            def action(context):
+                barrier.wait()
+                self.calls.append(name)
+                return {'success': True}
+            return action
+
+        saga = Saga([
+            self.step('check'),
+            SagaStep('reserve', parallel('reserve'), depends_on=['check']),
+            SagaStep('pay', parallel('pay'), depends_on=['check']),
+            SagaStep('ship', self.step('ship').action, depends_on=['reserve', 'pay'])
+        ], self.store)
+
+        outcome = saga.run('ORDER1', {})
+
+        self.assertTrue(outcome['success'])
+        self.assertEqual(self.calls[0], 'check')
+        self.assertEqual(sorted(self.calls[1:3]), ['pay', 'reserve'])
+        self.assertEqual(self.calls[3], 'ship')
+        self.assertEqual(sorted(self.store.load('ORDER1')), ['check', 'pay', 'reserve', 'ship'])
+
+    def test_concurrent_failure_compensates_running_steps(self):
+        """Test a step still running when its sibling fails is compensated once it completes"""
+        def slow_reserve(context):
+            time.sleep(0.05)
+            self.calls.append('reserve')
+            return {'success': True}
+
+        saga = Saga([
+            SagaStep('reserve', slow_reserve, lambda context: self.calls.append('undo reserve'), depends_on=[]),
+            SagaStep('pay', lambda context: {'success': False, 'error': 'declined'}, depends_on=[]),
+            self.step('ship')
+        ], self.store)
+
+        outcome = saga.run('ORDER1', {})
+
+        self.assertEqual((outcome['step'], outcome['result']['error']), ('pay', 'declined'))
+        self.assertEqual(self.calls, ['reserve', 'undo reserve'])
+        self.assertEqual(self.store.load('ORDER1'), {})
+
+    def test_dependencies_must_be_declared_first(self):
+        """Test a step cannot depend on a later or unknown step"""
+        with self.assertRaises(ValueError):
+            Saga([SagaStep('ship', lambda context: {}, depends_on=['pay']), self.step('pay')], self.store)
+
+    def test_memory_store_bounded(self):
+        """Test finished sagas are evicted from the in-memory store past max_size"""
+        store = InMemoryCheckpointStore(max_size=2)
+        saga = Saga([self.step('reserve'), self.step('ship')], store)
+        for order_id in ('ORDER1', 'ORDER2', 'ORDER3'):
+            saga.run(order_id, None)
+
+        self.assertEqual(store.load('ORDER1'), {})
+        self.assertEqual(set(store.load('ORDER3')), {'reserve', 'ship'})
+
+    def test_dynamodb_store_round_trip(self):
+        """Test checkpoints are stored as JSON on the order item"""
+        table = MagicMock()
+        store = DynamoDBCheckpointStore(table)
+
+        store.save('ORDER1', {'reserve': {'success': True}})
+        value = table.update_item.call_args[1]['ExpressionAttributeValues'][':checkpoints']
+        table.get_item.return_value = {'Item': {'saga_checkpoints': value}}
+
+        self.assertEqual(store.load('ORDER1'), {'reserve': {'success': True}})
+        store.save('ORDER1', {})
+        self.assertEqual(table.update_item.call_args[1]['UpdateExpression'], 'REMOVE #checkpoints')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from order_codec import encode_message
+from structured_logging import JsonFormatter, LazyJson, bind, log_payload, redact, start_invocation
+
+class TestStructuredLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        handler = logging.StreamHandler(self.stream)
+        handler.setFormatter(JsonFormatter())
+        self.logger = logging.getLogger('test_structured_logging')
+        self.logger.handlers = [handler]
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        start_invocation(MagicMock(aws_request_id='req-123'))
+
+    def records(self):
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_redact_masks_customer_fields(self):
+        """Test customer fields are masked, including inside SQS bodies"""
+        event = {
+            'order': {'order_id': 'ORDER123', 'customer_id': 'CUST123'},
+            'Records': [{'body': json.dumps({'order_id': 'ORDER456', 'shipping_address': {'line1': '1 Main St'}})}]
+        }
+
+        redacted = redact(event)
+
+        self.assertEqual(redacted['order'], {'order_id': 'ORDER123', 'customer_id': '[REDACTED]'})
+        self.assertEqual(redacted['Records'][0]['body'], {'order_id': 'ORDER456', 'shipping_address': '[REDACTED]'})
+        self.assertEqual(event['order']['customer_id'], 'CUST123')
+
+    def test_redact_decodes_binary_bodies(self):
+        """Test binary order bodies are decoded and masked, and undecodable bodies replaced"""
+        order = {
+            'order_id': 'ORDER123',
+            'customer_id': 'CUST123',
+            'items': [{'product_id': 'PROD001', 'quantity': 2, 'price': Decimal('29.99'), 'total': Decimal('59.98')}],
+            'total_amount': Decimal('59.98'),
+            'shipping_address': {'line1': '1 Main St', 'city': 'Springfield', 'country': 'US'}
+        }
+        body, attributes = encode_message(order, compress=True)
+        lambda_attributes = {name: {'stringValue': a['StringValue'], 'dataType': a['DataType']} for name, a in attributes.items()}
+        event = {'Records': [
+            {'body': body, 'messageAttributes': lambda_attributes},
+            {'body': body, 'messageAttributes': {}}
+        ]}
+
+        records = redact(event)['Records']
+
+        self.assertEqual(records[0]['body']['order_id'], 'ORDER123')
+        self.assertEqual(records[0]['body']['customer_id'], '[REDACTED]')
+        self.assertEqual(records[0]['body']['shipping_address'], '[REDACTED]')
+        self.assertEqual(records[1]['body'], '[REDACTED]')
+        self.assertNotIn('CUST123', str(LazyJson(records)))
+
+    def test_formatter_adds_correlation_fields(self):
+        """Test records carry the request id, bound fields and extras"""
+        bind(order_id='ORDER123')
+
+        self.logger.info("Updated order %s status to %s", 'ORDER123', 'FULFILLED', extra={'step': 'shipment'})
+
+        record = self.records()[0]
+        self.assertEqual(record['message'], 'Updated order ORDER123 status to FULFILLED')
+        self.assertEqual(record['level'], 'INFO')
+        self.assertEqual(record['request_id'], 'req-123')
+        self.assertEqual(record['order_id'], 'ORDER123')
+        self.assertEqual(record['step'], 'shipment')
+
+    def test_start_invocation_clears_bound_fields(self):
+        """Test fields bound in one invocation do not leak into the next"""
+        bind(order_id='ORDER123')
+        start_invocation(MagicMock(aws_request_id='req-456'))
+
+        self.logger.info("Processing")
+
+        record = self.records()[0]
+        self.assertEqual(record['request_id'], 'req-456')
+        self.assertNotIn('order_id', record)
+
+    def test_worker_thread_fields_cleared_between_invocations(self):
+        """Test a pool thread reused by the next invocation does not keep the previous order_id"""
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(bind, order_id='ORDER123').result()
+            start_invocation(MagicMock(aws_request_id='req-456'))
+            executor.submit(self.logger.info, "Reserving inventory").result()
+
+        record = self.records()[0]
+        self.assertEqual(record['request_id'], 'req-456')
+        self.assertNotIn('order_id', record)
+
+    def test_async_tasks_bind_their_own_fields(self):
+        """Test concurrent orders on one event loop each log their own order_id"""
+        async def fulfill(order_id):
+            bind(order_id=order_id)
+            await asyncio.sleep(0)
+            self.logger.info("Fulfilling")
+
+        async def main():
+            await asyncio.gather(fulfill('ORDER1'), fulfill('ORDER2'))
+
+        asyncio.run(main())
+
+        self.assertEqual([record['order_id'] for record in self.records()], ['ORDER1', 'ORDER2'])
+
+    def test_log_payload_sampled_per_invocation(self):
+        """Test every payload of a sampled invocation is logged, and none of an unsampled one"""
+        with patch('random.random', return_value=0.5):
+            start_invocation(MagicMock(aws_request_id='req-456'))
+        for order_id in ('ORDER1', 'ORDER2'):
+            log_payload(self.logger, "Processing order", {'order_id': order_id}, sample_rate=0.6)
+        self.assertEqual(len(self.records()), 2)
+
+        with patch('random.random', return_value=0.7):
+            start_invocation(MagicMock(aws_request_id='req-789'))
+        for order_id in ('ORDER1', 'ORDER2'):
+            log_payload(self.logger, "Processing order", {'order_id': order_id}, sample_rate=0.6)
+        self.assertEqual(len(self.records()), 2)
+
+    def test_log_payload_sampling(self):
+        """Test payloads are logged only for sampled calls"""
+        log_payload(self.logger, "Processing order", {'order_id': 'ORDER123'}, sample_rate=0)
+        self.assertEqual(self.records(), [])
+
+        log_payload(self.logger, "Processing order", {'order_id': 'ORDER123', 'customer_id': 'CUST123'}, sample_rate=1)
+        record = self.records()[0]
+        self.assertEqual(
+            record['message'],
+            'Processing order: {"order_id": "ORDER123", "customer_id": "[REDACTED]"}'
+        )
+
+    def test_filtered_records_are_not_formatted(self):
+        """Test arguments are not serialized when the level is filtered out"""
+        payload = MagicMock(spec=LazyJson)
+        self.logger.setLevel(logging.WARNING)
+
+        self.logger.info("Processing order: %s", payload)
+        log_payload(self.logger, "Processing order", {'order_id': 'ORDER123'}, sample_rate=1)
+
+        payload.__str__.assert_not_called()
+        self.assertEqual(self.records(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda', 'shared'))
+
+from ttl_cache import TtlCache
+
+class TestTtlCache(unittest.TestCase):
+
+    @patch('ttl_cache.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        """Test entries are reused until their TTL passes"""
+        mock_monotonic.return_value = 100
+        cache = TtlCache(ttl_seconds=5)
+        cache.put('key', 'value')
+
+        mock_monotonic.return_value = 104
+        self.assertEqual(cache.get('key'), 'value')
+        mock_monotonic.return_value = 105
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.take_stats(), {'hits': 1, 'misses': 1})
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently read entry goes first past max_size"""
+        cache = TtlCache(ttl_seconds=60, max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_invalidate_and_disabled(self):
+        """Test invalidated keys are dropped and a zero TTL caches nothing"""
+        cache = TtlCache(ttl_seconds=60)
+        cache.put('a', 1)
+        cache.invalidate(['a', 'missing'])
+        self.assertIsNone(cache.get('a'))
+
+        disabled = TtlCache(ttl_seconds=0)
+        disabled.put('a', 1)
+        self.assertIsNone(disabled.get('a'))
+
+    @patch('ttl_cache.time.monotonic')
+    def test_entry_ttl_override(self, mock_monotonic):
+        """Test an entry can be cached for its own lifetime"""
+        mock_monotonic.return_value = 100
+        cache = TtlCache(ttl_seconds=60)
+        cache.put('short', 1, ttl_seconds=2)
+        cache.put('expired', 2, ttl_seconds=-1)
+
+        mock_monotonic.return_value = 102
+        self.assertIsNone(cache.get('short'))
+        self.assertIsNone(cache.get('expired'))
+
+if __name__ == '__main__':
+    unittest.main()